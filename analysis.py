@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# analysis.py – 곡 하나를 한 번에 분석 (bpm.py · build_tag_csv.py · features.py · beatgrid.py 공용)
+#   · 디코딩 1번 → STFT 1번 → mel · onset 포락선 1번 → tempogram 1번, 나머지는 모두 여기서 파생
+#       tempo · 비트 위치   beat_track(y=…) 와 같은 값 (예전 BPM 캐시 그대로 유효)
+#       tempo 신뢰도        tempo 추정에 쓴 tempogram 의 평균 자기상관, tempo 위치 값 (0~1)
+#       음량                RMS 평균 dBFS
+#       특징 벡터           features.py (onset · spectral centroid/contrast · RMS)
+#   · 단계별 소요 시간(timings, 초)을 같이 돌려줌
+#   · store_analysis = 캐시(analysis · features · measures 표) + beat grid 저장소에 한 번에 기록
+#
+#   python analysis.py "C:/DJMUSIC/.../01 - La Cumparsita.flac" --compare
+
+from __future__ import annotations
+import argparse, sys, time
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from analysis_cache import AnalysisCache, fingerprint
+from beatgrid import BEAT_PARAMS, HOP, BeatGrid, grid_store, make_grid
+from features import FEATURE_NAMES, FEATURE_PARAMS, extract_features
+
+# 캐시 키에 들어가는 분석 조건 – 바꾸면 기존 캐시와 별개로 다시 계산됨
+BPM_PARAMS     = {"algo": "beat_track", "sr": 22050, "duration": None}
+MEASURE_PARAMS = {"algo": "measures-v1", "sr": 22050, "hop": HOP}
+AC_SIZE        = 8.0           # tempogram 창 (초) – librosa tempo 기본값과 같아야 tempo 가 같음
+
+
+class TrackAnalysis(NamedTuple):
+    tempo: float
+    tempo_conf: float          # 0~1, 낮으면 tempo(또는 ×2·½) 가 애매한 곡
+    loudness: float            # RMS 평균 dBFS
+    features: np.ndarray       # FEATURE_NAMES 순서
+    grid: BeatGrid
+    timings: Dict[str, float]  # 단계 → 초
+
+
+def analyse_track(path: str | Path, sr: int = BPM_PARAMS["sr"]) -> TrackAnalysis:
+    """곡 전체를 한 번 디코딩해 모든 값을 계산."""
+    import librosa
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal t0
+        now = time.perf_counter()
+        timings[stage] = now - t0
+        t0 = now
+
+    y, sr = librosa.load(str(path), mono=True, sr=sr, duration=BPM_PARAMS["duration"])
+    lap("decode")
+    S = np.abs(librosa.stft(y, hop_length=HOP))
+    lap("stft")
+    mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=sr))
+    onset_med  = librosa.onset.onset_strength(S=mel_db, sr=sr, aggregate=np.median)  # beat_track 용
+    onset_mean = librosa.onset.onset_strength(S=mel_db, sr=sr)                       # 특징 벡터 용
+    lap("onset")
+    win = librosa.time_to_frames(AC_SIZE, sr=sr, hop_length=HOP).item()
+    tg  = librosa.feature.tempogram(onset_envelope=onset_med, sr=sr, hop_length=HOP, win_length=win)
+    lap("tempogram")
+    tempo, frames = 0.0, np.empty(0, dtype=int)        # onset 이 하나도 없으면 beat_track 도 0
+    if onset_med.any():
+        tempo = float(librosa.feature.tempo(onset_envelope=onset_med, sr=sr, hop_length=HOP, tg=tg)[0])
+        _, frames = librosa.beat.beat_track(onset_envelope=onset_med, sr=sr, hop_length=HOP, bpm=tempo)
+    grid = make_grid(frames, onset_med, sr)
+    lap("beats")
+    ac   = tg.mean(axis=1)
+    conf = 0.0
+    if tempo > 0:
+        lag  = int(round(60.0 * sr / (HOP * tempo)))
+        conf = float(np.clip(ac[max(lag - 1, 1):lag + 2].max(initial=0.0), 0.0, 1.0))
+    lap("confidence")
+    rms = librosa.feature.rms(S=S)[0]
+    loudness = float(20 * np.log10(max(rms.mean(), 1e-10)))
+    lap("rms")
+    vec = extract_features(y, sr, tempo, S=S, onset=onset_mean, rms=rms)
+    lap("spectral")
+    return TrackAnalysis(tempo, conf, loudness, vec, grid, timings)
+
+
+def store_analysis(path: str | Path, cache: AnalysisCache, res: TrackAnalysis,
+                   tempo: bool = True) -> None:
+    """분석 결과를 캐시·beat grid 저장소에 기록 (tempo=False → tempo 는 호출한 쪽이 저장)."""
+    fp = fingerprint(path)
+    if tempo:
+        cache.put(fp, BPM_PARAMS, res.tempo)
+    cache.put_features(fp, FEATURE_PARAMS, res.features)
+    cache.put_measures(fp, MEASURE_PARAMS, res.tempo_conf, res.loudness)
+    grid_store(cache).put(fp, BEAT_PARAMS, res.grid)
+
+
+# ─── 예전 방식 (단계마다 따로 디코딩·STFT) – --compare 용 ────────────────
+def _separate_passes(path: str | Path) -> Dict[str, float]:
+    import librosa
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    y, sr = librosa.load(str(path), mono=True, sr=BPM_PARAMS["sr"])
+    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+    timings["bpm"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    y, sr = librosa.load(str(path), mono=True, sr=FEATURE_PARAMS["sr"])
+    extract_features(y, sr)
+    timings["features"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    y, sr = librosa.load(str(path), mono=True, sr=BPM_PARAMS["sr"])
+    librosa.feature.rms(y=y)
+    librosa.feature.tempogram(y=y, sr=sr)
+    timings["rms+tempogram"] = time.perf_counter() - t0
+    return timings
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="곡 분석 (한 번 디코딩) + 단계별 소요 시간")
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--compare", action="store_true",
+                    help="단계마다 따로 디코딩하던 예전 방식과 시간 비교")
+    args = ap.parse_args()
+
+    totals: Dict[str, float] = {}
+    old:    Dict[str, float] = {}
+    done: List[str] = []
+    for f in args.files:
+        try:
+            res = analyse_track(f)
+            if args.compare:
+                for k, v in _separate_passes(f).items():
+                    old[k] = old.get(k, 0.0) + v
+        except Exception as e:
+            print(f"❌ {f}: {e}", file=sys.stderr)
+            continue
+        done.append(f)
+        for k, v in res.timings.items():
+            totals[k] = totals.get(k, 0.0) + v
+        rms_mean = res.features[FEATURE_NAMES.index("rms_mean")]
+        print(f"✅ {Path(f).name}  tempo {res.tempo:.1f} (신뢰도 {res.tempo_conf:.2f}) · "
+              f"비트 {len(res.grid.beats)} · 음량 {res.loudness:.1f} dBFS (RMS {rms_mean:.3f})  "
+              f"{sum(res.timings.values()):.2f}초")
+    if not done:
+        sys.exit(1)
+
+    n = len(done)
+    print(f"\n⏱️  단계별 평균 ({n}곡)")
+    for k, v in totals.items():
+        print(f"   {k:<11} {v / n * 1000:8.1f} ms")
+    print(f"   {'합계':<11} {sum(totals.values()) / n * 1000:8.1f} ms")
+    if old:
+        print(f"   예전 방식    {sum(old.values()) / n * 1000:8.1f} ms  "
+              + " · ".join(f"{k} {v / n * 1000:.0f}" for k, v in old.items()))
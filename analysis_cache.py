@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# analysis_cache.py – 오디오 분석 결과 캐시 (bpm.py · build_tag_csv.py 공용)
+#   · 키 = 파일 내용 fingerprint (크기 + 앞/뒤 64KB 해시) + 분석 파라미터
+#     → 파일 이름을 바꾸거나 폴더를 옮겨도 캐시 결과 유지
+#   · SQLite(WAL) 한 파일 → 여러 워커 프로세스가 동시에 읽고 써도 안전
+#   · features 표 = 곡별 특징 벡터 (features.py – 비슷한 곡 찾기용, float32 BLOB)
+#   · beatgrid 표 = 곡별 비트·onset 포락선의 위치 색인 (beatgrid.py – 데이터는 옆의 .beats.f32)
+#   · measures 표 = tempo 신뢰도 · 음량(dBFS) (analysis.py – 한 번 분석에서 같이 나오는 값)
+
+from __future__ import annotations
+import hashlib, json, os, sqlite3, time
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+CACHE_DB   = Path("analysis_cache.sqlite")
+HASH_BYTES = 64 * 1024      # 앞/뒤 64KB 만 읽음
+
+
+def fingerprint(path: str | Path) -> str:
+    """'<크기>-<blake2b(앞 64KB + 뒤 64KB)>' – 전체를 읽지 않는 내용 지문."""
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as fh:
+        h.update(fh.read(HASH_BYTES))
+        if size > HASH_BYTES:
+            fh.seek(max(size - HASH_BYTES, HASH_BYTES))
+            h.update(fh.read(HASH_BYTES))
+    return f"{size}-{h.hexdigest()}"
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+class AnalysisCache:
+    """fingerprint + 분석 파라미터 → raw tempo.
+
+    연결은 프로세스마다 처음 쓸 때 열림 (pickle 시 경로만 전달)."""
+
+    def __init__(self, path: str | Path = CACHE_DB):
+        self.path  = Path(path)
+        self._conn: sqlite3.Connection | None = None
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path, self._conn = state["path"], None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis ("
+                " fingerprint TEXT NOT NULL,"
+                " params      TEXT NOT NULL,"
+                " tempo       REAL NOT NULL,"
+                " created     REAL NOT NULL,"
+                " PRIMARY KEY (fingerprint, params))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS features ("
+                " fingerprint TEXT NOT NULL,"
+                " params      TEXT NOT NULL,"
+                " vec         BLOB NOT NULL,"
+                " created     REAL NOT NULL,"
+                " PRIMARY KEY (fingerprint, params))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS beatgrid ("
+                " fingerprint TEXT NOT NULL,"
+                " params      TEXT NOT NULL,"
+                " offset      INTEGER NOT NULL,"   # .beats.f32 안 시작 위치 (float32 단위)
+                " n_beats     INTEGER NOT NULL,"
+                " n_onset     INTEGER NOT NULL,"
+                " onset_hop   REAL NOT NULL,"
+                " created     REAL NOT NULL,"
+                " PRIMARY KEY (fingerprint, params))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS measures ("
+                " fingerprint TEXT NOT NULL,"
+                " params      TEXT NOT NULL,"
+                " tempo_conf  REAL NOT NULL,"
+                " loudness    REAL NOT NULL,"
+                " created     REAL NOT NULL,"
+                " PRIMARY KEY (fingerprint, params))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, fp: str, params: Dict[str, Any]) -> float | None:
+        row = self._db().execute(
+            "SELECT tempo FROM analysis WHERE fingerprint=? AND params=?",
+            (fp, params_key(params)),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, fp: str, params: Dict[str, Any], tempo: float) -> None:
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?)",
+            (fp, params_key(params), float(tempo), time.time()),
+        )
+        db.commit()
+
+    def get_features(self, fp: str, params: Dict[str, Any]) -> np.ndarray | None:
+        row = self._db().execute(
+            "SELECT vec FROM features WHERE fingerprint=? AND params=?",
+            (fp, params_key(params)),
+        ).fetchone()
+        return None if row is None else np.frombuffer(row[0], dtype=np.float32)
+
+    def put_features(self, fp: str, params: Dict[str, Any], vec: np.ndarray) -> None:
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?)",
+            (fp, params_key(params), np.asarray(vec, dtype=np.float32).tobytes(), time.time()),
+        )
+        db.commit()
+
+    def get_measures(self, fp: str, params: Dict[str, Any]) -> Dict[str, float] | None:
+        row = self._db().execute(
+            "SELECT tempo_conf, loudness FROM measures WHERE fingerprint=? AND params=?",
+            (fp, params_key(params)),
+        ).fetchone()
+        return None if row is None else {"tempo_conf": row[0], "loudness": row[1]}
+
+    def put_measures(self, fp: str, params: Dict[str, Any],
+                     tempo_conf: float, loudness: float) -> None:
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO measures VALUES (?, ?, ?, ?, ?)",
+            (fp, params_key(params), float(tempo_conf), float(loudness), time.time()),
+        )
+        db.commit()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# beatgrid.py – 곡별 비트 위치 + onset 포락선 저장소
+#   · analysis.py 가 tempo 를 구하며 같이 나오는 beat frame · onset 포락선을 버리지 않고 저장
+#     (beat_track(y=…) 와 같은 계산 → tempo 값·BPM 캐시는 그대로)
+#   · 데이터 = float32 한 파일 (analysis_cache.beats.f32), 곡마다 [비트 시각(초)… | 포락선…]
+#     을 끝에 덧붙이기만 함 → 읽을 때는 np.memmap 으로 필요한 구간만 (복사·디코딩 없음)
+#   · 색인 = analysis_cache.sqlite 의 beatgrid 표 (fingerprint → 시작 위치 · 비트 수 · 포락선 길이)
+#     쓰기는 BEGIN IMMEDIATE 로 한 번에 한 프로세스만 → 덧붙이기가 섞이지 않음
+#     데이터를 다 쓴 뒤 색인을 commit → 읽는 쪽은 완성된 곡만 보게 됨 (동시 읽기 안전)
+#   · 포락선은 hop 512 를 4칸씩 max 로 묶어 ≈ 93ms 간격 (3분 곡 ≈ 8KB)
+#
+#   python beatgrid.py music_library_full.csv C:/DJMUSIC --workers 0   (이미 BPM 캐시에 있어
+#   beat grid 가 없는 곡만 디코딩해 채움)
+
+from __future__ import annotations
+import argparse, os, sys, time
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from analysis_cache import AnalysisCache, CACHE_DB, fingerprint, params_key
+
+HOP        = 512
+ONSET_POOL = 4                 # 포락선 저장 간격 = HOP × ONSET_POOL 샘플
+BEAT_PARAMS = {"algo": "beat_track", "sr": 22050, "hop": HOP, "onset_pool": ONSET_POOL}
+
+
+class BeatGrid(NamedTuple):
+    beats: np.ndarray          # 비트 시각 (초, float32)
+    onset: np.ndarray          # onset 세기 포락선 (float32, onset_hop 초 간격)
+    onset_hop: float
+
+
+# ─── 계산 ────────────────────────────────────────────────────────
+def make_grid(frames: np.ndarray, onset: np.ndarray, sr: int) -> BeatGrid:
+    """beat_track 의 beat frame + onset 포락선(hop HOP) → BeatGrid (포락선은 ONSET_POOL 칸씩 max)."""
+    beats = (np.asarray(frames, dtype=np.float64) * HOP / sr).astype(np.float32)
+    pad   = -len(onset) % ONSET_POOL
+    env   = np.pad(onset, (0, pad)).reshape(-1, ONSET_POOL).max(axis=1).astype(np.float32)
+    return BeatGrid(beats, env, HOP * ONSET_POOL / sr)
+
+
+# ─── 저장소 ──────────────────────────────────────────────────────
+class BeatGridStore:
+    """fingerprint → BeatGrid. 색인은 AnalysisCache DB, 데이터는 옆의 .beats.f32 파일.
+
+    pickle 시 경로만 전달 (AnalysisCache 와 같음) → 워커 프로세스마다 따로 연결·매핑."""
+
+    def __init__(self, cache: AnalysisCache, data: str | Path | None = None):
+        self.cache = cache
+        self.data  = Path(data) if data else cache.path.with_suffix(".beats.f32")
+        self._mm: np.memmap | None = None
+
+    def __getstate__(self):
+        return {"cache": self.cache, "data": self.data}
+
+    def __setstate__(self, state):
+        self.cache, self.data, self._mm = state["cache"], state["data"], None
+
+    def _view(self, end: int) -> np.memmap:
+        """end 위치까지 보이는 매핑 (그 뒤에 다른 프로세스가 덧붙였으면 다시 매핑)."""
+        if self._mm is None or len(self._mm) < end:
+            self._mm = np.memmap(self.data, dtype=np.float32, mode="r")
+        return self._mm
+
+    def get(self, fp: str, params: Dict = BEAT_PARAMS) -> BeatGrid | None:
+        row = self.cache._db().execute(
+            "SELECT offset, n_beats, n_onset, onset_hop FROM beatgrid"
+            " WHERE fingerprint=? AND params=?", (fp, params_key(params)),
+        ).fetchone()
+        if row is None:
+            return None
+        off, nb, no, hop = row
+        mm = self._view(off + nb + no)
+        return BeatGrid(mm[off:off + nb], mm[off + nb:off + nb + no], hop)
+
+    def __contains__(self, fp: str) -> bool:
+        return self.cache._db().execute(
+            "SELECT 1 FROM beatgrid WHERE fingerprint=? AND params=?",
+            (fp, params_key(BEAT_PARAMS)),
+        ).fetchone() is not None
+
+    def put(self, fp: str, params: Dict, grid: BeatGrid) -> None:
+        blob = np.concatenate([grid.beats, grid.onset]).astype("<f4").tobytes()
+        db = self.cache._db()
+        db.execute("BEGIN IMMEDIATE")          # 쓰기 잠금 → 다른 프로세스와 덧붙이기가 섞이지 않음
+        try:
+            with open(self.data, "ab") as fh:
+                end = fh.seek(0, os.SEEK_END)
+                if end % 4:                    # 중간에 죽은 쓰기의 찌꺼기 → float32 경계 맞춤
+                    end += fh.write(b"\0" * (4 - end % 4))
+                fh.write(blob)
+            db.execute(
+                "INSERT OR REPLACE INTO beatgrid VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (fp, params_key(params), end // 4, len(grid.beats), len(grid.onset),
+                 float(grid.onset_hop), time.time()),
+            )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+    def stats(self) -> Tuple[int, int]:
+        """(저장된 곡 수, 데이터 파일 크기 bytes)."""
+        n = self.cache._db().execute("SELECT COUNT(*) FROM beatgrid").fetchone()[0]
+        return n, self.data.stat().st_size if self.data.exists() else 0
+
+
+_stores: Dict[Path, BeatGridStore] = {}
+
+def grid_store(cache: AnalysisCache) -> BeatGridStore:
+    """캐시 DB 하나당 저장소 하나 (프로세스 안에서 매핑 재사용)."""
+    if cache.path not in _stores:
+        _stores[cache.path] = BeatGridStore(cache)
+    return _stores[cache.path]
+
+
+def cached_grid(path: str | Path, cache: AnalysisCache) -> BeatGrid:
+    """저장소 조회 → 없으면 analysis.py 로 한 번 분석 (tempo·특징 벡터도 같이 저장)."""
+    hit = grid_store(cache).get(fingerprint(path))
+    if hit is not None:
+        return hit
+    from analysis import analyse_track, store_analysis
+    res = analyse_track(path)
+    store_analysis(path, cache, res)
+    return res.grid
+
+
+def _fill(path: str, cache: AnalysisCache) -> int:
+    return len(cached_grid(path, cache).beats)
+
+
+if __name__ == "__main__":
+    from library_frame import load_library
+    from parallel import default_workers, run_chunked
+
+    ap = argparse.ArgumentParser(description="beat grid 저장소 채우기")
+    ap.add_argument("csv", help="music_library_full.csv")
+    ap.add_argument("root", help="음악 폴더 루트")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help=f"분석 프로세스 수 (0 = 자동, {default_workers()}개)")
+    ap.add_argument("--cache", default=str(CACHE_DB), metavar="FILE",
+                    help="분석 결과 캐시 (bpm.py 와 공유, 데이터는 옆의 .beats.f32)")
+    args = ap.parse_args()
+
+    lib   = load_library(args.csv, args.root)
+    cache = AnalysisCache(args.cache)
+    store = grid_store(cache)
+    t0    = time.perf_counter()
+    fps   = {p: fingerprint(p) for p in lib.df["Path"].tolist() if Path(p).is_file()}
+    todo: List[str] = [p for p, fp in fps.items() if fp not in store]
+    results = run_chunked(partial(_fill, cache=cache), todo, workers=args.workers or default_workers(),
+                          desc="beats", stage="beats")
+    failed = sum(1 for r, err in results if err or r is None)
+    n, size = store.stats()
+    print(f"✅ beat grid {n:,}곡 (새로 {len(todo) - failed:,} · 실패 {failed:,}) "
+          f"→ {store.data}  {size / 2**20:.1f} MB  ({time.perf_counter() - t0:.1f}초)")
+
+    t0 = time.perf_counter()
+    beats = sum(len(g.beats) for fp in fps.values() if (g := store.get(fp)) is not None)
+    print(f"   읽기: {len(fps):,}곡 · 비트 {beats:,}개  {(time.perf_counter() - t0) * 1000:.0f} ms")
+    if failed and failed == len(todo):
+        sys.exit(1)
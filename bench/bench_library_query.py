@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# bench/bench_library_query.py – 2페이지 필터 지연 시간 (ms / 질의)
+#   · before = 예전 방식 (df.copy() 후 조건마다 전체 boolean mask)
+#   · after  = library_query.LibraryIndex.query (이진 탐색 + 비트맵 교차)
+#   · counts = LibraryIndex.facet_counts (사이드바 곡 수)
+#   · 합성 라이브러리 10k · 100k · 1M 곡, 두 방식 결과가 같은지도 확인
+#
+#   python bench/bench_library_query.py --sizes 10000 100000 1000000
+
+from __future__ import annotations
+import argparse, statistics, sys, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from library_query import LibraryIndex  # noqa: E402
+
+FACETS = ["Orchestra", "GenreKey", "AlbumFolder"]
+RANGES = ["RecordingYear", "BPM"]
+
+
+def synth(n: int, seed: int = 0) -> pd.DataFrame:
+    """악단 120 · 앨범 n/30 · 장르 4종, BPM·연도 5% 비어 있음."""
+    rng = np.random.default_rng(seed)
+    orch = [f"Orquesta {i:03d}" for i in range(120)]
+    albs = [f"Album {i:05d}" for i in range(max(n // 30, 10))]
+    df = pd.DataFrame({
+        "Orchestra":     pd.Categorical.from_codes(rng.integers(0, len(orch), n), orch),
+        "GenreKey":      pd.Categorical.from_codes(rng.integers(0, 4, n), ["", "milonga", "tango", "vals"]),
+        "AlbumFolder":   pd.Categorical.from_codes(rng.integers(0, len(albs), n), albs),
+        "RecordingYear": rng.integers(1927, 1960, n).astype("float32"),
+        "BPM":           rng.uniform(55, 130, n).round(1).astype("float32"),
+    })
+    for c in RANGES:
+        df.loc[rng.random(n) < 0.05, c] = np.nan
+    return df
+
+
+def queries(df: pd.DataFrame, k: int, seed: int = 1):
+    """사이드바에서 나올 법한 조합 k 개 – (facets, ranges)."""
+    rng  = np.random.default_rng(seed)
+    orch = df["Orchestra"].cat.categories
+    albs = df["AlbumFolder"].cat.categories
+    out  = []
+    for _ in range(k):
+        y0 = float(rng.integers(1927, 1950))
+        b0 = float(rng.integers(55, 100))
+        out.append((
+            {"Orchestra":   orch[rng.integers(len(orch))] if rng.random() < 0.6 else None,
+             "GenreKey":    rng.choice(["tango", "vals", "milonga"]) if rng.random() < 0.7 else None,
+             "AlbumFolder": albs[rng.integers(len(albs))] if rng.random() < 0.1 else None},
+            {"RecordingYear": (y0, y0 + 10, False) if rng.random() < 0.5 else None,
+             "BPM":           (b0, b0 + 25, False) if rng.random() < 0.5 else None},
+        ))
+    return out
+
+
+def pandas_filter(df: pd.DataFrame, facets, ranges) -> np.ndarray:
+    f = df.copy()
+    for c, v in facets.items():
+        if v is not None:
+            f = f[f[c] == v]
+    for c, r in ranges.items():
+        if r is not None:
+            f = f[f[c].between(r[0], r[1]) | (r[2] & f[c].isna())]
+    return f.index.to_numpy()
+
+
+def timed(fn, qs) -> tuple[float, list]:
+    """(질의당 중앙값 ms, 결과 목록)."""
+    times, out = [], []
+    for q in qs:
+        t0 = time.perf_counter()
+        out.append(fn(*q))
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="2페이지 필터 인덱스 마이크로 벤치마크")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--queries", type=int, default=50, metavar="N", help="크기마다 질의 수 (기본 50)")
+    args = ap.parse_args()
+
+    print(f"{'곡 수':>10} {'인덱스 생성':>10} {'before':>9} {'after':>9} {'counts':>9} {'배속':>7}  일치")
+    bad = 0
+    for n in args.sizes:
+        df = synth(n)
+        qs = queries(df, args.queries)
+        t0 = time.perf_counter()
+        ix = LibraryIndex(df, FACETS, RANGES)
+        build = (time.perf_counter() - t0) * 1000
+        before, ref = timed(lambda fa, ra: pandas_filter(df, fa, ra), qs)
+        after,  got = timed(ix.query, qs)
+        counts, _   = timed(ix.facet_counts, qs)
+        same = sum(np.array_equal(a, b) for a, b in zip(ref, got))
+        bad += same != len(qs)
+        print(f"{n:>10,} {build:>8.1f}ms {before:>7.2f}ms {after:>7.3f}ms "
+              f"{counts:>7.2f}ms {before / after:>6.0f}×  {same}/{len(qs)}")
+    sys.exit(1 if bad else 0)
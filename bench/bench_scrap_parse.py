@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# bench/bench_scrap_parse.py – scrap.py HTML 추출 속도 비교 (pages/sec)
+#   · before = 예전 방식 (페이지 전체 BeautifulSoup + 칸마다 get_text)
+#   · after  = scrap.parse_search / parse_listing (listing 표만 lxml XPath)
+#   · fixtures/tango_info 의 저장된 페이지 전부로 측정, 두 방식 결과가 같은지도 확인
+#
+#   python bench/bench_scrap_parse.py --repeat 5
+
+from __future__ import annotations
+import argparse, sys, time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import scrap  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures" / "tango_info"
+HINT     = ("Juan D'Arienzo", "Alberto Echague")
+
+
+# ─── 예전 구현 (비교 기준) ───────────────────────────────────────
+def bs4_search(html: str) -> str | None:
+    a = BeautifulSoup(html, "lxml").select_one("table.listing tbody a[href^='/T']")
+    return f"{scrap.BASE_URL}{a['href']}" if a else None
+
+
+def bs4_listing(html: str, orchestra_hint: str, vocalist_hint: str | None = None):
+    rows = BeautifulSoup(html, "lxml").select("table.listing tbody tr")
+    best, best_score = None, -1.0
+    for tr in rows:
+        tds = [td.get_text(strip=True) for td in tr.select("td")]
+        if len(tds) < 7:
+            continue
+        genre_cell, orch_name, vocalist, date_cell = tds[2], tds[3], tds[4], tds[6]
+        score = 0.7 * scrap.similarity(orch_name, orchestra_hint) + \
+                0.3 * scrap.similarity(vocalist, vocalist_hint)
+        if score <= best_score:
+            continue
+        m_full = scrap._DATE_FULL.search(date_cell)
+        m_year = scrap._DATE_YEAR.search(date_cell)
+        rec_date = m_full.group(0) if m_full else (m_year.group(0) if m_year else "")
+        best = (rec_date, genre_cell.capitalize(), vocalist or "inst")
+        best_score = score
+    return best
+
+
+# ─── 측정 ────────────────────────────────────────────────────────
+def run(search_fn, listing_fn, search_pages, work_pages, repeat):
+    """(pages/sec, 결과 목록) – repeat 회 중 가장 빠른 회차 기준."""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0  = time.perf_counter()
+        res = [search_fn(h) for h in search_pages] + \
+              [listing_fn(h, *HINT) for h in work_pages]
+        best = min(best, time.perf_counter() - t0)
+        out  = res
+    return (len(search_pages) + len(work_pages)) / best, out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="scrap.py HTML 추출 마이크로 벤치마크")
+    ap.add_argument("--repeat", type=int, default=5, metavar="N",
+                    help="반복 횟수, 가장 빠른 회차 사용 (기본 5)")
+    ap.add_argument("--fixtures", default=str(FIXTURES), metavar="DIR")
+    args = ap.parse_args()
+
+    root   = Path(args.fixtures)
+    search = [p.read_text("utf-8") for p in sorted((root / "search").glob("*.html"))]
+    work   = [p.read_text("utf-8") for p in sorted((root / "work").glob("*.html"))]
+    if not search and not work:
+        sys.exit(f"❌ {root} 에 페이지 없음")
+    print(f"📄 검색 {len(search)} · work {len(work)} 페이지  (×{args.repeat})")
+
+    before, ref = run(bs4_search, bs4_listing, search, work, args.repeat)
+    after,  got = run(scrap.parse_search, scrap.parse_listing, search, work, args.repeat)
+    same = sum(a == b for a, b in zip(ref, got))
+
+    print(f"  before (BeautifulSoup) : {before:8.1f} pages/s")
+    print(f"  after  (lxml listing)  : {after:8.1f} pages/s   ×{after / before:.1f}")
+    print(f"  결과 일치 {same}/{len(ref)}")
+    if same != len(ref):
+        sys.exit(1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# bench/tango_info_stub.py – 저장해 둔 tango.info 페이지를 돌려주는 로컬 대역 서버
+#   · /search?q=<제목>&c=work → fixtures/tango_info/search/<slug>.html (없으면 빈 결과)
+#   · /T0123456789            → fixtures/tango_info/work/T0123456789.html
+#   · --delay / --fail-rate 로 느린 응답·503 을 흉내 내 재시도·동시성 확인
+#   · 200 응답에 ETag, If-None-Match 가 같으면 304 (캐시 재검증 확인)
+#
+#   python bench/tango_info_stub.py --port 8765 --delay 0.2 --fail-rate 0.1
+#   python scrap.py --async --base-url http://127.0.0.1:8765
+
+from __future__ import annotations
+import argparse, hashlib, random, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = Path(__file__).parent / "fixtures" / "tango_info"
+EMPTY_SEARCH = ("<html><body><table class='listing'><thead><tr><th>TIWC</th></tr>"
+                "</thead><tbody></tbody></table></body></html>")
+
+
+def slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", text.lower())
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    delay     = 0.0
+    fail_rate = 0.0
+    hits      = 0
+    lock      = threading.Lock()
+
+    def do_GET(self):
+        with StubHandler.lock:
+            StubHandler.hits += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            return self._send(503, "busy")
+
+        url = urlsplit(self.path)
+        if url.path == "/search":
+            q    = parse_qs(url.query).get("q", [""])[0]
+            page = FIXTURES / "search" / f"{slug(q)}.html"
+            return self._send(200, page.read_text("utf-8") if page.exists() else EMPTY_SEARCH)
+        page = FIXTURES / "work" / f"{url.path.strip('/')}.html"
+        if re.fullmatch(r"/T\d+", url.path) and page.exists():
+            return self._send(200, page.read_text("utf-8"))
+        self._send(404, "not found")
+
+    def _send(self, status: int, body: str):
+        data = body.encode("utf-8")
+        etag = f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if status == 200:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):    # 요청마다 로그 출력하지 않음
+        pass
+
+
+def serve(port: int = 0, delay: float = 0.0, fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """백그라운드 스레드로 서버 시작 → server.server_address 로 포트 확인."""
+    handler = type("Handler", (StubHandler,), {"delay": delay, "fail_rate": fail_rate})
+    server  = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="tango.info 로컬 대역 서버")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--delay", type=float, default=0.0, metavar="SEC",
+                    help="응답마다 지연 (기본 0)")
+    ap.add_argument("--fail-rate", type=float, default=0.0, metavar="P",
+                    help="이 확률로 503 응답 (기본 0)")
+    args = ap.parse_args()
+
+    srv = serve(args.port, args.delay, args.fail_rate)
+    print(f"🧪 stub tango.info → http://127.0.0.1:{srv.server_address[1]}  (Ctrl-C 종료)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
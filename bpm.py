@@ -2,9 +2,10 @@
 # bpm.py – 라이브러리 BPM 채우기 (2025-06-25)
 
 from __future__ import annotations
-import argparse, re, sys, unicodedata
+import argparse, random, re, sys, time, unicodedata
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
@@ -12,14 +13,22 @@ import librosa
 from rapidfuzz import process, fuzz
 from tqdm import tqdm
 
+from parallel import Result, run_chunked, default_workers
+from checkpoint import Checkpoint
+from analysis_cache import AnalysisCache, CACHE_DB, fingerprint
+from analysis import BPM_PARAMS, analyse_track, store_analysis
+from library_store import LibraryStore
+from file_index import FileIndex
+
 ##############################################################################
 # 기본 경로
 ##############################################################################
 CSV_IN  = Path("music_library_tags.csv")
 CSV_OUT = Path("music_library_tags_bpm.csv")
 FAILLOG = Path("bpm_failures.log")
+AMBLOG  = Path("bpm_ambiguous.log")
+CKPT    = Path("bpm_checkpoint.csv")     # 실행 도중 분석이 끝난 파일 (정상 종료 시 삭제)
 
-AUDIO_EXTS = {".mp3", ".flac", ".m4a", ".wav", ".ogg"}
 
 ##############################################################################
 # BPM 범위 테이블
@@ -58,32 +67,221 @@ def slug_candidates(title: str) -> List[str]:
 ##############################################################################
 # 오디오 파일 인덱스
 ##############################################################################
-def build_audio_index(root: Path, debug: bool=False) -> Dict[str, Path]:
-    index: Dict[str, Path] = {}
-    all_files = [p for p in root.rglob("*") if p.suffix.lower() in AUDIO_EXTS]
+def build_audio_index(root: Path, debug: bool=False) -> Dict[str, List[Path]]:
+    """slug → 후보 경로 전체 (중복 slug 도 모두 보관, 경로순).
+
+    디스크 탐색은 file_index 가 담당 – 바뀐 폴더만 다시 읽음."""
+    files = FileIndex.load(root).refresh()
+    all_files = [files.abspath(rel) for rel in files.files]
 
     if debug:
-        print(f"🔍  오디오 파일 인덱싱 중 …\n   → {len(all_files):,} 개 파일 인덱스 완료")
+        print(f"🔍  오디오 파일 인덱싱 중 …\n   → {len(all_files):,} 개 파일 인덱스 완료"
+              f" (새로 읽은 폴더 {files.rescanned:,})")
 
+    index: Dict[str, List[Path]] = {}
     for p in all_files:
         stem = p.stem
         keys = {slugify(stem), slugify(base_title_from_stem(stem))}
         for k in keys:
-            index[k] = p     # 중복 slug ⇒ 마지막 값 유지
+            index.setdefault(k, []).append(p)
 
     return index
 
+def pick_candidate(cands: List[Path],
+                   orchestra: str | None = None,
+                   album: str | None = None) -> Tuple[Path, List[Path]]:
+    """같은 slug 후보 중 악단 → 앨범 폴더가 맞는 파일 선택.
+    → (선택 경로, 끝까지 구분되지 않은 후보들 – 하나면 애매하지 않음)"""
+    pool = cands
+    for hint, folder in ((orchestra, lambda p: p.parent.parent.name),
+                         (album,     lambda p: p.parent.name)):
+        if len(pool) == 1 or not isinstance(hint, str) or not hint.strip():
+            continue
+        narrowed = [p for p in pool if slugify(folder(p)) == slugify(hint)]
+        if narrowed:
+            pool = narrowed
+    return pool[0], pool
+
+def short_path(p: Path) -> str:
+    return f"{p.parent.parent.name}/{p.parent.name}/{p.name}"
+
+##############################################################################
+# 퍼지 매칭 (bigram 블로킹 → cdist 일괄 채점)
+##############################################################################
+FUZZY_CUTOFF = 85           # fuzz.ratio 기준 (%)
+FUZZY_CHUNK  = 256          # cdist 한 번에 채점할 질의 수 (메모리 상한)
+
+def bigrams(text: str) -> set:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+class FuzzyMatcher:
+    """audio_index 키에 대한 일괄 퍼지 매칭.
+
+    ratio ≥ cutoff 가 가능한 키만 후보로 남기는 필터 두 가지:
+      · 길이: |la-lb| ≤ (1-cutoff)·(la+lb)
+      · bigram: indel 1회는 고유 bigram 을 최대 2개 없앰
+               → 공유 bigram ≥ |bigrams(q)| - 2·d_max
+    두 필터 모두 안전(놓치는 후보 없음) → extractOne 전체 탐색과 같은 결과."""
+
+    def __init__(self, keys: List[str], cutoff: int = FUZZY_CUTOFF):
+        self.keys   = list(keys)
+        self.cutoff = cutoff
+        self.lens   = np.array([len(k) for k in self.keys])
+        post: Dict[str, List[int]] = {}
+        for i, k in enumerate(self.keys):
+            for g in bigrams(k):
+                post.setdefault(g, []).append(i)
+        self.post = {g: np.array(v, dtype=np.int32) for g, v in post.items()}
+
+    def candidates(self, q: str) -> np.ndarray:
+        slack = (1 - self.cutoff / 100) * (len(q) + self.lens)
+        d_max = np.floor(slack + 1e-9)
+        ok    = np.abs(self.lens - len(q)) <= d_max
+        grams = bigrams(q)
+        hits  = [self.post[g] for g in grams if g in self.post]
+        shared = (np.bincount(np.concatenate(hits), minlength=len(self.keys))
+                  if hits else np.zeros(len(self.keys), dtype=int))
+        ok &= shared >= len(grams) - 2 * d_max
+        return np.flatnonzero(ok)
+
+    def match(self, queries: List[str], top_k: int = 3) -> List[List[Tuple[str, float]]]:
+        """질의마다 [(키, 점수), …] (점수 내림차순, cutoff 이상, 최대 top_k)."""
+        out: List[List[Tuple[str, float]]] = [[] for _ in queries]
+        # 길이순으로 묶어야 chunk 별 후보 합집합(= cdist 열 수)이 작아짐
+        order = sorted(range(len(queries)), key=lambda i: len(queries[i]))
+        for s in range(0, len(order), FUZZY_CHUNK):
+            idx   = order[s:s + FUZZY_CHUNK]
+            chunk = [queries[i] for i in idx]
+            union = np.unique(np.concatenate([self.candidates(q) for q in chunk]))
+            if union.size == 0:
+                continue
+            choices = [self.keys[i] for i in union]
+            scores  = process.cdist(chunk, choices, scorer=fuzz.ratio,
+                                    score_cutoff=self.cutoff, workers=-1,
+                                    dtype=np.float64)
+            for i, row in zip(idx, scores):
+                best = np.argsort(-row, kind="stable")[:top_k]
+                out[i] = [(choices[j], float(row[j])) for j in best
+                          if row[j] >= self.cutoff]
+        return out
+
 ##############################################################################
 # BPM 계산 + 보정
 ##############################################################################
-def detect_bpm(filepath: Path) -> float | None:
+# full 모드 캐시 키(BPM_PARAMS)는 analysis.py 에 – 한 번 분석에서 tempo 와 나머지 값을 같이 계산
+
+# fast 모드 기본값: 곡 전체에 고르게 흩어진 20초 창 3개를 11.025kHz 로 분석
+FAST_WINDOWS    = 3
+FAST_WINDOW_SEC = 20.0
+FAST_SR         = 11025
+
+def _beat_tempo(y: np.ndarray, sr: int) -> float:
+    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+    return float(np.atleast_1d(tempo)[0])
+
+def _cached_tempo(filepath: Path,
+                  cache: AnalysisCache | None,
+                  params: Dict,
+                  analyse: Callable[[Path], Tuple[float, bool]]) -> float | None:
+    """캐시 조회 → 없으면 analyse(path) = (tempo, 캐시저장여부) 실행."""
+    fp = None
+    if cache is not None:
+        try:
+            fp = fingerprint(filepath)
+        except OSError:
+            return None
+        hit = cache.get(fp, params)
+        if hit is not None:
+            return round(hit, 1)
     try:
-        y, sr = librosa.load(str(filepath), mono=True)
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        tempo_f = float(np.atleast_1d(tempo)[0])
-        return round(tempo_f, 1)
+        tempo_f, complete = analyse(filepath)
     except Exception:
         return None
+    if cache is not None and complete:
+        cache.put(fp, params, tempo_f)
+    return round(tempo_f, 1)
+
+def _analyse_full(filepath: Path, cache: AnalysisCache | None = None) -> Tuple[float, bool]:
+    res = analyse_track(filepath)       # 디코딩·STFT 한 번 → tempo + 특징 벡터 · beat grid · 음량
+    if cache is not None:               # tempo 는 _cached_tempo 가 저장
+        try:
+            store_analysis(filepath, cache, res, tempo=False)
+        except Exception:
+            pass
+    return res.tempo, True
+
+def detect_bpm(filepath: Path, cache: AnalysisCache | None = None) -> float | None:
+    return _cached_tempo(filepath, cache, BPM_PARAMS, partial(_analyse_full, cache=cache))
+
+def window_offsets(duration: float, windows: int, window_sec: float) -> List[float]:
+    """곡 길이를 windows+1 등분한 지점을 중심으로 하는 창 시작 위치들."""
+    if duration <= windows * window_sec:
+        return [0.0]                       # 짧은 곡 → 한 번에 전체
+    last = duration - window_sec
+    return [min(max(duration * (i + 1) / (windows + 1) - window_sec / 2, 0.0), last)
+            for i in range(windows)]
+
+def detect_bpm_fast(filepath: Path,
+                    cache: AnalysisCache | None = None,
+                    windows: int = FAST_WINDOWS,
+                    window_sec: float = FAST_WINDOW_SEC,
+                    sr: int = FAST_SR,
+                    budget: float | None = None) -> float | None:
+    """짧은 창 몇 개만 디코딩해 tempo 의 중앙값을 사용.
+
+    budget(초)을 넘기면 남은 창은 건너뜀 (최소 1개는 분석). 이렇게 잘린
+    결과는 캐시에 저장하지 않음."""
+    params = {"algo": "beat_track-windows", "sr": sr,
+              "windows": windows, "window_sec": window_sec}
+
+    def analyse(path: Path) -> Tuple[float, bool]:
+        t0 = time.perf_counter()
+        offsets = window_offsets(librosa.get_duration(path=str(path)),
+                                 windows, window_sec)
+        tempos: List[float] = []
+        for off in offsets:
+            dur = None if len(offsets) == 1 else window_sec
+            y, sr_ = librosa.load(str(path), mono=True, sr=sr, offset=off, duration=dur)
+            tempos.append(_beat_tempo(y, sr_))
+            if budget is not None and time.perf_counter() - t0 > budget:
+                break
+        return float(np.median(tempos)), len(tempos) == len(offsets)
+
+    return _cached_tempo(filepath, cache, params, analyse)
+
+##############################################################################
+# fast ↔ full 정확도/속도 비교
+##############################################################################
+def octave_delta(fast: float, full: float) -> float:
+    """×½·×2 차이를 무시한 BPM 차이 (장르 보정으로 흡수되는 오차)."""
+    return min(abs(fast * k - full) for k in (0.5, 1.0, 2.0))
+
+def compare_modes(paths: List[Path], **fast_kwargs) -> pd.DataFrame:
+    """샘플 파일마다 full / fast 를 캐시 없이 모두 측정해 차이·소요시간 표로 반환."""
+    rows = []
+    for p in tqdm(paths, desc="compare", unit="trk"):
+        t0 = time.perf_counter(); full = detect_bpm(p)
+        t1 = time.perf_counter(); fast = detect_bpm_fast(p, **fast_kwargs)
+        t2 = time.perf_counter()
+        if full is None or fast is None:
+            continue
+        rows.append(dict(file=p.name, full=full, fast=fast,
+                         delta=abs(fast - full), delta_oct=octave_delta(fast, full),
+                         t_full=t1 - t0, t_fast=t2 - t1))
+    return pd.DataFrame(rows)
+
+def print_comparison(res: pd.DataFrame) -> None:
+    if res.empty:
+        print("비교할 수 있는 트랙이 없습니다")
+        return
+    n = len(res)
+    print(f"\n📏  fast vs full  ({n}곡)")
+    print(f"   평균 |Δ| BPM          : {res['delta'].mean():.2f}  (중앙값 {res['delta'].median():.2f}, 최대 {res['delta'].max():.1f})")
+    print(f"   ±1 BPM 이내            : {(res['delta'] <= 1).mean():.0%}")
+    print(f"   ±2 BPM 이내            : {(res['delta'] <= 2).mean():.0%}")
+    print(f"   옥타브 무시 ±2 BPM 이내 : {(res['delta_oct'] <= 2).mean():.0%}")
+    print(f"   평균 시간 full / fast   : {res['t_full'].mean():.2f}s / {res['t_fast'].mean():.2f}s"
+          f"  (×{res['t_full'].sum() / max(res['t_fast'].sum(), 1e-9):.1f} 빠름)")
 
 def normalise_genre(raw: str) -> str:
     raw = (raw or "").lower().strip()
@@ -97,6 +295,8 @@ def normalise_genre(raw: str) -> str:
 
 def adjust_bpm(bpm: float, genre_key: str) -> Tuple[float, bool]:
     lo, hi = GENRE_RANGES.get(genre_key, GENRE_RANGES["tango"])
+    if not np.isfinite(bpm):               # inf·NaN → 보정 불가 (반복문이 끝나지 않음)
+        return bpm, False
     adj_bpm = bpm
     # 너무 느리면 ×2, 너무 빠르면 ÷2 을 반복
     while adj_bpm < lo and adj_bpm > 1:
@@ -110,17 +310,38 @@ def adjust_bpm(bpm: float, genre_key: str) -> Tuple[float, bool]:
         return bpm, False
     return adj_bpm, changed
 
+def adjust_bpm_array(raw: np.ndarray, genre_keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """adjust_bpm 의 배열 버전 – (보정 BPM, 보정 여부). NaN 은 그대로."""
+    lo = np.array([GENRE_RANGES.get(g, GENRE_RANGES["tango"])[0] for g in genre_keys], dtype=float)
+    hi = np.array([GENRE_RANGES.get(g, GENRE_RANGES["tango"])[1] for g in genre_keys], dtype=float)
+    adj = raw.astype(float).copy()
+    fin = np.isfinite(adj)                 # inf 는 ×2·÷2 로 끝나지 않음 → 보정하지 않음
+    # 반복 대신 옥타브 수를 바로 계산 (2의 거듭제곱 곱셈은 정확 → 반복문과 같은 결과)
+    up = fin & (adj < lo) & (adj > 1)
+    k  = np.ceil(np.log2(lo[up] / adj[up]))
+    k -= adj[up] * 2.0 ** (k - 1) >= lo[up]          # log2 반올림 오차 보정
+    k += adj[up] * 2.0 ** k < lo[up]
+    adj[up] *= 2.0 ** k
+    down = fin & (adj > hi)
+    k  = np.ceil(np.log2(adj[down] / hi[down]))
+    k -= adj[down] / 2.0 ** (k - 1) <= hi[down]
+    k += adj[down] / 2.0 ** k > hi[down]
+    adj[down] /= 2.0 ** k
+    adj = np.round(adj, 1)
+    changed = ~np.isclose(adj, raw)
+    bad = (adj < lo) | (adj > hi)          # 여전히 범위 밖 → 원본 유지
+    adj[bad], changed[bad] = raw[bad], False
+    return adj, changed & ~np.isnan(raw)
+
 ##############################################################################
 # 행 보강
 ##############################################################################
-def enrich_row(row: pd.Series,
-               audio_index: Dict[str, Path],
-               fuzzy_keys: List[str],
-               audio_root: Path,
-               debug: bool=False) -> pd.Series:
-
-    row = row.copy()
-    title = row["Title"]
+def resolve_path(title: str,
+                 audio_index: Dict[str, List[Path]],
+                 fuzzy_keys: List[str],
+                 debug: bool=False,
+                 orchestra: str | None = None,
+                 album: str | None = None) -> Path | None:
     slugs = slug_candidates(title)
 
     if debug:
@@ -128,17 +349,31 @@ def enrich_row(row: pd.Series,
         print(f"   – slug candidates   : {slugs}")
 
     # ── 파일 매칭 ─────────────────────────────────────────────────────────
-    path = next((audio_index[s] for s in slugs if s in audio_index), None)
+    cands = next((audio_index[s] for s in slugs if s in audio_index), None)
 
-    if path is None:
+    if cands is None:
         match, score, _ = process.extractOne(
             slugify(title), fuzzy_keys, scorer=fuzz.ratio
         )
-        if score >= 85:
-            path = audio_index[match]
+        if score >= FUZZY_CUTOFF:
+            cands = audio_index[match]
             if debug:
                 print(f"   → fuzzy match      : {match} ({score}%)")
+    if cands is None:
+        return None
 
+    path, left = pick_candidate(cands, orchestra, album)
+    if debug and len(left) > 1:
+        print(f"   → 후보 {len(left)}개      : {[short_path(p) for p in left]}")
+    return path
+
+def apply_bpm(row: pd.Series,
+              path: Path | None,
+              raw_bpm: float | None,
+              audio_root: Path,
+              debug: bool=False) -> pd.Series:
+
+    row = row.copy()
     if path is None:
         row["BPM"]     = ""
         row["BPMNote"] = "file-not-found"
@@ -146,8 +381,7 @@ def enrich_row(row: pd.Series,
             print("   → file             : (미검색)\n")
         return row
 
-    # ── BPM 측정 & 보정 ─────────────────────────────────────────────────
-    raw_bpm = detect_bpm(path)
+    # ── BPM 보정 ────────────────────────────────────────────────────────
     if raw_bpm is None:
         row["BPM"]     = ""
         row["BPMNote"] = "no-bpm"
@@ -166,6 +400,115 @@ def enrich_row(row: pd.Series,
 
     return row
 
+def enrich_row(row: pd.Series,
+               audio_index: Dict[str, List[Path]],
+               fuzzy_keys: List[str],
+               audio_root: Path,
+               debug: bool=False,
+               cache: AnalysisCache | None = None,
+               detect: Callable[[Path], float | None] | None = None) -> pd.Series:
+
+    detect  = detect or partial(detect_bpm, cache=cache)
+    path    = resolve_path(row["Title"], audio_index, fuzzy_keys, debug=debug,
+                           orchestra=row.get("Orchestra"), album=row.get("AlbumFolder"))
+    raw_bpm = detect(path) if path is not None else None
+    return apply_bpm(row, path, raw_bpm, audio_root, debug=debug)
+
+def resolve_paths(titles: List[str],
+                  audio_index: Dict[str, List[Path]],
+                  matcher: FuzzyMatcher,
+                  orchestras: List[str] | None = None,
+                  albums: List[str] | None = None,
+                  top_k: int = 3) -> Tuple[List[Path | None], Dict[str, List[str]]]:
+    """제목 목록 → 파일 경로 목록 + 애매한 매칭 {제목: 대안 설명들}.
+
+    정확한 slug 가 없으면 고유 slug 별로 한 번만 FuzzyMatcher 로 일괄 채점.
+    같은 slug 의 파일이 여럿이면 악단·앨범 폴더로 고름."""
+    n = len(titles)
+    orchestras = orchestras or [None] * n
+    albums     = albums or [None] * n
+
+    cands: List[List[Path] | None] = []
+    misses: Dict[str, None] = {}
+    for t in titles:
+        c = next((audio_index[s] for s in slug_candidates(t) if s in audio_index), None)
+        cands.append(c)
+        if c is None:
+            misses[slugify(t)] = None
+
+    queries = list(misses)
+    found   = dict(zip(queries, matcher.match(queries, top_k=top_k)))
+
+    paths: List[Path | None] = [None] * n
+    ambiguous: Dict[str, List[str]] = {}
+    for i, t in enumerate(titles):
+        hits = []
+        if cands[i] is None:
+            hits = found.get(slugify(t), [])
+            if not hits:
+                continue
+            cands[i] = audio_index[hits[0][0]]
+        paths[i], left = pick_candidate(cands[i], orchestras[i], albums[i])
+        if len(left) > 1:
+            ambiguous[t] = [short_path(p) for p in left]
+        elif len({pick_candidate(audio_index[k], orchestras[i], albums[i])[0]
+                  for k, _ in hits}) > 1:
+            ambiguous[t] = [f"{k} ({sc:.0f}%)" for k, sc in hits]
+    return paths, ambiguous
+
+def enrich_frame(df: pd.DataFrame,
+                 audio_index: Dict[str, List[Path]],
+                 matcher: FuzzyMatcher,
+                 audio_root: Path,
+                 detect: Callable[[Path], float | None],
+                 workers: int = 1,
+                 known: Dict[Path, Result] | None = None,
+                 on_result: Callable[[Path, Result], None] | None = None
+                 ) -> Tuple[pd.DataFrame, pd.Series, Dict]:
+    """프레임 전체를 한 번에 보강
+    → (BPM·BPMNote 열이 채워진 사본, 트랙별 분석 에러, 애매한 퍼지 매칭).
+
+    파일 매칭 → 고유 파일별 BPM 분석(프로세스 풀) → 열 단위 보정·대입.
+    known = 이미 분석이 끝난 파일 {경로: (raw, 에러)} → 다시 분석하지 않음.
+    on_result(경로, (raw, 에러)) 는 파일 하나가 끝날 때마다 호출 (체크포인트용)."""
+    col = lambda c: df[c].tolist() if c in df.columns else None
+    found, ambiguous = resolve_paths(df["Title"].tolist(), audio_index, matcher,
+                                     col("Orchestra"), col("AlbumFolder"))
+    paths = pd.Series(found, index=df.index, dtype=object)
+    uniq    = sorted({p for p in paths if p is not None})
+    known   = known or {}
+    todo    = [p for p in uniq if p not in known]
+    hook    = (lambda i, r: on_result(todo[i], r)) if on_result else None
+    results = dict(zip(todo, run_chunked(detect, todo, workers=workers, desc="BPM",
+                                         unit="trk", stage="bpm", on_result=hook)))
+    results.update((p, known[p]) for p in uniq if p in known)
+    raw_of  = {p: np.nan if r is None else r for p, (r, _) in results.items()}
+    err_of  = {p: e for p, (_, e) in results.items() if e}
+    rel_of  = {p: p.relative_to(audio_root).as_posix() for p in uniq}
+
+    found = paths.notna().to_numpy()
+    raw   = paths.map(raw_of).astype(float).to_numpy()
+    genre = (df["Genre"] if "Genre" in df.columns else pd.Series("", index=df.index))
+    adj, changed = adjust_bpm_array(raw, genre.map(normalise_genre).to_numpy())
+
+    note = np.where(changed, " (adj)", " (raw)")
+    note = paths.map(rel_of).fillna("").to_numpy(dtype=object) + note
+    note = np.where(~found, "file-not-found", np.where(np.isnan(raw), "no-bpm", note))
+
+    out = df.copy()
+    out["BPM"]     = adj
+    out["BPMNote"] = note
+    errors = pd.Series([err_of.get(p, "") for p in paths], index=df.index, dtype=object)
+    return out, errors, ambiguous
+
+def failure_lines(df: pd.DataFrame, errors: pd.Series) -> List[str]:
+    """결과 열에서 실패 행만 골라 로그 줄로 (제목<TAB>사유[<TAB>에러])."""
+    fail = df["BPMNote"].astype(str).str.startswith(("file-not", "no-bpm", "out-of-range"))
+    sub  = df.loc[fail, ["Title", "BPMNote"]].astype(str)
+    err  = errors[fail].astype(str)
+    line = sub["Title"] + "\t" + sub["BPMNote"]
+    return line.where(err == "", line + "\t" + err).tolist()
+
 ##############################################################################
 # 메인
 ##############################################################################
@@ -177,46 +520,134 @@ if __name__ == "__main__":
                     help="제목이 포함된 첫 트랙만 테스트")
     ap.add_argument("--debug", action="store_true",
                     help="slug, 매칭 파일 경로 등을 출력")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help=f"BPM 분석 프로세스 수 (0 = 자동, {default_workers()}개)")
+    ap.add_argument("--cache", default=str(CACHE_DB), metavar="FILE",
+                    help="분석 결과 캐시 (build_tag_csv.py 와 공유)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="캐시를 쓰지 않고 항상 새로 분석")
+    ap.add_argument("--mode", choices=("full", "fast"), default="full",
+                    help="full = 곡 전체 분석 / fast = 짧은 창 몇 개만 분석")
+    ap.add_argument("--fast-windows", type=int, default=FAST_WINDOWS, metavar="N",
+                    help=f"fast 모드 창 개수 (기본 {FAST_WINDOWS})")
+    ap.add_argument("--fast-window-sec", type=float, default=FAST_WINDOW_SEC, metavar="SEC",
+                    help=f"fast 모드 창 길이 (기본 {FAST_WINDOW_SEC:g}초)")
+    ap.add_argument("--fast-sr", type=int, default=FAST_SR, metavar="HZ",
+                    help=f"fast 모드 샘플레이트 (기본 {FAST_SR})")
+    ap.add_argument("--time-budget", type=float, metavar="SEC",
+                    help="fast 모드 트랙당 분석 시간 상한")
+    ap.add_argument("--compare-fast", type=int, metavar="N",
+                    help="N곡 샘플로 fast ↔ full 오차·속도만 비교하고 종료")
+    ap.add_argument("--store", metavar="FILE",
+                    help="CSV 대신 라이브러리 저장소(SQLite)를 읽고 씀")
+    ap.add_argument("--resume", action="store_true",
+                    help=f"중단된 실행 이어서 ({CKPT} 에 있는 파일은 다시 분석 안 함)")
+    ap.add_argument("--retry-failed", action="store_true",
+                    help=f"{FAILLOG} 에 있는 제목만 다시 처리 (지난 결과 위에 덮어씀)")
     args = ap.parse_args()
+    workers = args.workers or default_workers()
+    cache   = None if args.no_cache else AnalysisCache(args.cache)
+    fast_kwargs = dict(windows=args.fast_windows, window_sec=args.fast_window_sec,
+                       sr=args.fast_sr, budget=args.time_budget)
+    detect  = (partial(detect_bpm_fast, cache=cache, **fast_kwargs)
+               if args.mode == "fast" else partial(detect_bpm, cache=cache))
 
     audio_root = Path(args.audio_root).expanduser().resolve()
     if not audio_root.exists():
         sys.exit(f"❌ {audio_root} 이(가) 존재하지 않습니다")
 
-    if not CSV_IN.exists():
-        sys.exit(f"❌ {CSV_IN} 을(를) 찾을 수 없습니다")
+    store = LibraryStore(args.store) if args.store else None
+    src   = CSV_OUT if args.retry_failed else CSV_IN   # 실패만 다시 = 지난 결과 위에서
+    if store is None and not src.exists() and not args.compare_fast:
+        sys.exit(f"❌ {src} 을(를) 찾을 수 없습니다")
+    if args.retry_failed and not FAILLOG.exists():
+        sys.exit(f"❌ {FAILLOG} 을(를) 찾을 수 없습니다")
 
     # ── 인덱스 ────────────────────────────────────────────────────────────
     audio_index = build_audio_index(audio_root, debug=args.debug)
     fuzzy_keys  = list(audio_index.keys())
 
-    # ── CSV 로드 & 열 준비 ────────────────────────────────────────────────
-    df = pd.read_csv(CSV_IN)
+    if args.compare_fast:
+        files  = sorted({p for ps in audio_index.values() for p in ps})
+        sample = random.Random(0).sample(files, min(args.compare_fast, len(files)))
+        print_comparison(compare_modes(sample, **fast_kwargs))
+        sys.exit(0)
+
+    # ── CSV(또는 저장소) 로드 & 열 준비 ──────────────────────────────────
+    df = (store.read(["Title", "Orchestra", "AlbumFolder", "Genre", "BPM", "BPMNote"])
+          if store is not None
+          else pd.read_csv(src))
     for col in ("BPM", "BPMNote"):
         if col not in df.columns:
             df[col] = ""
 
+    # ── 처리할 행 / 이미 분석한 파일 ────────────────────────────────────
+    ckpt   = Checkpoint(CKPT, "File", ["RawBPM", "Error"])
+    record = not (args.single or args.retry_failed)     # 체크포인트는 전체 실행에서만
+    todo   = pd.Series(True, index=df.index)
+    known: Dict[Path, Result] = {}
+    if args.retry_failed:
+        titles = {ln.split("\t", 1)[0]
+                  for ln in FAILLOG.read_text(encoding="utf-8").splitlines() if ln.strip()}
+        todo = df["Title"].astype(str).isin(titles)
+        print(f"🔁  {FAILLOG} 의 제목 {len(titles)}개 → {int(todo.sum())}행 다시 시도")
+    elif args.resume and record:
+        ckpt.load()
+        known = {audio_root.joinpath(*rel.split("/")):
+                 (float(v["RawBPM"]) if v["RawBPM"] else None, v["Error"] or None)
+                 for rel, v in ckpt.rows.items()}
+        print(f"⏯️  체크포인트 {len(known)}개 파일 분석 결과 재사용")
+    elif record:
+        ckpt.clear()
+
+    def save_file(path: Path, res: Result) -> None:
+        raw, err = res
+        ckpt.add(path.relative_to(audio_root).as_posix(), {"RawBPM": raw, "Error": err or ""})
+
     # ── 처리 ────────────────────────────────────────────────────────────
-    if args.single:
-        mask = df["Title"].str.contains(args.single, case=False, regex=False, na=False)
-        if mask.sum() == 0:
-            sys.exit("❌ 해당 제목 없음")
-
-        idx = mask.idxmax()
-        df.loc[idx] = enrich_row(df.loc[idx], audio_index, fuzzy_keys,
-                                 audio_root, debug=args.debug)
+    try:
+        if args.single:
+            mask = df["Title"].str.contains(args.single, case=False, regex=False, na=False)
+            if mask.sum() == 0:
+                sys.exit("❌ 해당 제목 없음")
+
+            idx = mask.idxmax()
+            df.loc[idx] = enrich_row(df.loc[idx], audio_index, fuzzy_keys,
+                                     audio_root, debug=args.debug, detect=detect)
+            todo = df.index == idx
+        else:
+            res, errs, ambiguous = enrich_frame(df[todo], audio_index, FuzzyMatcher(fuzzy_keys),
+                                                audio_root, detect, workers=workers,
+                                                known=known,
+                                                on_result=save_file if record else None)
+            if args.retry_failed:   # 다시 시도한 행만 지난 결과 위에 반영
+                for col in ("BPM", "BPMNote"):
+                    df[col] = df[col].astype(object)
+                    df.loc[res.index, col] = res[col]
+                errors = pd.Series("", index=df.index, dtype=object)
+                errors[res.index] = errs
+            else:
+                df, errors = res, errs
+                # 후보가 여러 파일로 갈리는 제목: 제목<TAB>대안1<TAB>대안2…
+                AMBLOG.write_text("".join(
+                    f"{t}\t" + "\t".join(alts) + "\n"
+                    for t, alts in ambiguous.items()), encoding="utf-8")
+                if ambiguous:
+                    print(f"🔀  애매한 퍼지 매칭 {len(ambiguous)}건 → {AMBLOG}")
+            lines = failure_lines(df, errors)
+            FAILLOG.write_text("".join(f"{ln}\n" for ln in lines), encoding="utf-8")
+    except KeyboardInterrupt:
+        ckpt.flush()
+        sys.exit(f"⏸️  중단 – 분석이 끝난 {len(ckpt.rows)}개 파일은 {CKPT} 에 저장, "
+                 f"--resume 으로 이어서")
+    ckpt.flush()
+
+    if store is not None:   # BPM 열만 upsert
+        store.upsert(df[todo], ["BPM", "BPMNote"])
+        print(f"✅  Done – saved → {store.path}")
     else:
-        with FAILLOG.open("w", encoding="utf-8") as flog:
-            for idx in tqdm(df.index, desc="BPM", unit="trk"):
-                before = df.loc[idx, ["BPM", "BPMNote"]].copy()
-                df.loc[idx] = enrich_row(df.loc[idx], audio_index, fuzzy_keys,
-                                         audio_root)
-                after = df.loc[idx, ["BPM", "BPMNote"]]
-                if (after["BPMNote"].startswith("file-not") or
-                    after["BPMNote"].startswith("no-bpm")     or
-                    after["BPMNote"].startswith("out-of-range")):
-                    flog.write(f"{df.loc[idx,'Title']}\t{after['BPMNote']}\n")
-
-    df.to_csv(CSV_OUT, index=False, encoding="utf-8-sig")
-    print(f"✅  Done – saved → {CSV_OUT}")
+        df.to_csv(CSV_OUT, index=False, encoding="utf-8-sig")
+        print(f"✅  Done – saved → {CSV_OUT}")
+    if record:
+        ckpt.clear()
     print(f"⚠️  실패/누락 로그 → {FAILLOG}")
@@ -4,104 +4,278 @@
 build_tags_csv.py
  └─ (1) DJMusic ▸ 악단 ▸ 앨범 ▸ 파일명 4단계 폴더 구조
      (2) MP3 ID3 태그 (Title, Artist, Album)
-     (3) BPM (librosa, 130↑ → ÷2 보정)
+     (3) BPM (librosa, 130↑ → ÷2 보정 · bpm.py 와 분석 캐시 공유)
+         기본 = 곡 전체에 흩어진 짧은 창 몇 개만 분석 (bpm.py --mode fast 와 같음, 디코딩 ≈ 60초 분량)
+         --full-analysis = 곡 전체 분석 (analysis.py – 특징 벡터 · beat grid · 음량도 같이 저장)
+     (4) 길이·비트레이트·샘플레이트 (태그와 같이 읽는 mutagen 헤더 – 디코딩 없음)
  모두 합쳐 CSV로 저장 → <루트>/music_library_tags.csv
+ 재실행 시 <루트>/music_library_manifest.json 과 비교해
+ 새로 추가·변경된 파일만 다시 읽고, 나머지 행은 기존 CSV에서 그대로 가져옴
+ --store 지정 시 CSV 대신 라이브러리 저장소(SQLite)에 바뀐 행만 upsert
 """
 
-import os, sys, time, librosa, pandas as pd
+import os, time, json, argparse, pandas as pd
+from functools import partial
 from mutagen.easyid3 import EasyID3
 from mutagen.mp3 import MP3
 from mutagen import File
-from tqdm import tqdm
+
+from parallel import run_chunked, default_workers
+from analysis_cache import AnalysisCache, CACHE_DB, fingerprint
+from bpm import detect_bpm, detect_bpm_fast
+from library_store import LibraryStore, KEY, track_key, track_id
+from file_index import FileIndex
+
+CSV_NAME      = "music_library_tags.csv"
+MANIFEST_NAME = "music_library_manifest.json"
+COLUMNS = [
+    "Root", "Orchestra", "AlbumFolder", "FileName",
+    "Title", "TrackArtist", "AlbumTag", "BPM", "TrackID",
+    "Duration", "Bitrate", "SampleRate"
+]
+HEADER_COLS = ["Duration", "Bitrate", "SampleRate"]   # 나중에 추가된 열 (없으면 다시 스캔)
+
+# ──────────── 매니페스트 (path → size, mtime, hash) ──────────
+def load_manifest(root: str) -> dict:
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), encoding="utf-8") as fh:
+            return json.load(fh).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(root: str, files: dict):
+    path = os.path.join(root, MANIFEST_NAME)
+    tmp  = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"version": 1, "files": files}, fh, ensure_ascii=False)
+    os.replace(tmp, path)   # 중간에 끊겨도 이전 매니페스트 유지
+
+def load_previous_rows(csv_path: str) -> dict:
+    """기존 CSV → {'악단/앨범/파일': row dict} (값은 문자열 그대로 보존)"""
+    if not os.path.exists(csv_path):
+        return {}
+    try:
+        old = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    except Exception:
+        return {}
+    if not set(COLUMNS) - {"TrackID", *HEADER_COLS} <= set(old.columns):
+        return {}
+    for c in HEADER_COLS:               # 길이 열 이전 CSV → 빈 값 (scan_plan 이 다시 스캔)
+        if c not in old.columns:
+            old[c] = ""
+    if "TrackID" not in old.columns:    # TrackID 이전 CSV → 경로로 계산해 채움
+        old["TrackID"] = [track_id(track_key(o, a, f)) for o, a, f in
+                          zip(old["Orchestra"], old["AlbumFolder"], old["FileName"])]
+    return {
+        track_key(r["Orchestra"], r["AlbumFolder"], r["FileName"]): r
+        for r in old[COLUMNS].to_dict("records")
+    }
+
+def is_unchanged(old: dict | None, sig: dict, path: str, use_hash: bool) -> bool:
+    """size·mtime 이 같으면 변경 없음. mtime 만 다르면 (--hash 시) 내용 해시로 재확인."""
+    if not old or old.get("size") != sig["size"]:
+        return False
+    if old.get("mtime") == sig["mtime"]:
+        if old.get("hash"):
+            sig["hash"] = old["hash"]
+        return True
+    if use_hash and old.get("hash"):
+        sig["hash"] = fingerprint(path)
+        return sig["hash"] == old["hash"]
+    return False
 
 # ──────────── MP3 태그 로딩 ─────────────────────────────
-def load_tags(path: str):
+def load_audio(path: str):
+    """mutagen 객체 (태그 + 헤더 정보) – 못 읽으면 None."""
     try:
-        return MP3(path, ID3=EasyID3).tags
+        return MP3(path, ID3=EasyID3)
     except Exception:
-        audio = File(path, easy=True)
-        return audio.tags if audio else None
+        return File(path, easy=True)
 
-# ──────────── CSV 빌드 메인 ────────────────────────────
-def build_csv(root: str):
+def load_tags(path: str):
+    audio = load_audio(path)
+    return audio.tags if audio else None
+
+def header_info(audio) -> dict:
+    """mutagen 헤더 → 길이(초)·비트레이트(kbps)·샘플레이트(Hz). 모르면 0."""
+    info = getattr(audio, "info", None)
+    return dict(
+        Duration=round(float(getattr(info, "length", 0) or 0), 1),
+        Bitrate=int(getattr(info, "bitrate", 0) or 0) // 1000,
+        SampleRate=int(getattr(info, "sample_rate", 0) or 0),
+    )
+
+# ──────────── 파일 1개 스캔 (태그 + BPM) ─────────────────────
+def read_row(task: tuple) -> dict | None:
+    """(파일경로, [악단, 앨범, 파일명], 루트명) → 태그 열만 채운 행 dict (태그 없으면 None)"""
+    fp, parts, root_name = task
+    orchestra, album, file_name = parts[0], parts[1], parts[2]
+
+    audio = load_audio(fp)
+    tags  = audio.tags if audio else None
+    if tags is None:
+        return None
+
+    def tag(key, default=""):
+        return tags.get(key, [default])[0].strip() if tags.get(key) else default
+
+    return dict(
+        Root=root_name,            # A열
+        Orchestra=orchestra,       # B열
+        AlbumFolder=album,         # C열
+        FileName=file_name,        # D열
+        Title=tag("title", os.path.splitext(file_name)[0]),   # E열
+        TrackArtist=tag("artist"), # F열
+        AlbumTag=tag("album"),     # G열
+        BPM="",                    # H열
+        TrackID=track_id(track_key(orchestra, album, file_name)),  # I열 (경로 기반 고정 ID)
+        **header_info(audio),      # J~L열 (길이·비트레이트·샘플레이트)
+    )
+
+def scan_file(task: tuple, cache: AnalysisCache | None = None,
+              full_analysis: bool = False) -> dict | None:
+    """read_row + BPM. 프로세스 풀 워커에서 실행되므로 모듈 최상위 함수로 둠."""
+    row = read_row(task)
+    if row is None:
+        return None
+
+    # BPM 계산 – bpm.py 와 같은 조건·같은 캐시를 써서 한 번만 분석
+    # (태그 스캔은 가볍게: 기본은 짧은 창만, 곡 전체 분석은 --full-analysis 일 때만)
+    detect = detect_bpm if full_analysis else detect_bpm_fast
+    tempo  = detect(task[0], cache)
+    if tempo is not None:
+        bpm_val    = tempo / 2 if tempo >= 130 else tempo  # 130↑이면 ½로 보정
+        row["BPM"] = int(round(bpm_val))
+    return row
+
+# ──────────── 스캔 계획 (변경된 파일 고르기) ─────────────────
+def scan_plan(root: str, full: bool = False, use_hash: bool = False,
+              store: LibraryStore | None = None) -> dict:
+    """폴더 인덱스·매니페스트 비교 → 다시 읽을 파일 목록 (pipeline.py 와 공용).
+
+    반환 dict: root, root_name, rows('악단/앨범/파일' (NFC) → 기존 행 | None), paths(키 → 파일 경로),
+              to_scan([(파일경로, parts)]), manifest(새 매니페스트), kept, removed"""
     root = os.path.abspath(root)
     root_name = os.path.basename(root.rstrip("/\\"))
-    rows = []
+    rows = {}       # '악단/앨범/파일' → row (폴더 탐색 순서 유지)
 
-    # 지정한 깊이(루트/악단/앨범/파일)만 탐색
-    mp3_files = []
-    for orch in os.listdir(root):
-        o_path = os.path.join(root, orch)
-        if not os.path.isdir(o_path):
-            continue
-        for alb in os.listdir(o_path):
-            a_path = os.path.join(o_path, alb)
-            if not os.path.isdir(a_path):
-                continue
-            mp3_files.extend(
-                os.path.join(a_path, f)
-                for f in os.listdir(a_path)
-                if f.lower().endswith(".mp3")
-            )
+    # 이전 실행 결과 (full 재스캔이면 무시). 저장소 모드에선 기존 행을 DB 에 그대로 둠
+    old_manifest = {} if full else load_manifest(root)
+    old_rows     = {} if full or store else load_previous_rows(os.path.join(root, CSV_NAME))
+    previous     = set() if full else set(store.keys()) if store else set(old_rows)
+    # 길이 열이 비어 있는 기존 행 (열 추가 이전 스캔) → 헤더만 다시 읽도록 변경으로 취급
+    if full:
+        stale = set()
+    elif store:
+        have  = store.read(["Duration"])
+        stale = set(have.loc[have["Duration"].isna(), KEY])
+    else:
+        stale = {k for k, r in old_rows.items() if r.get("Duration", "") == ""}
+    new_manifest = {}
+
+    # 공용 파일 인덱스 갱신 (바뀐 폴더만 다시 읽음) → 루트/악단/앨범/파일 깊이의 MP3
+    index = FileIndex.load(root).refresh()
+    mp3_files = [
+        os.path.join(root, *rel.split("/"))
+        for rel in index.files
+        if rel.count("/") == 2 and rel.lower().endswith(".mp3")
+    ]
 
     print(f"총 MP3 파일 수: {len(mp3_files)}")
 
-    for fp in tqdm(mp3_files, desc="Scanning"):
+    # 변경 없는 파일은 기존 행을 그대로 사용 → 새/변경 파일만 스캔
+    to_scan, kept = [], 0
+    paths = {}      # 키(NFC) → 실제 파일 경로 (디스크의 파일명은 NFD 일 수도 있음)
+    for fp in mp3_files:
         parts = fp[len(root):].lstrip("/\\").split(os.sep)
         if len(parts) < 3:  # 악단/앨범/파일 구조가 아니면 건너뜀
             continue
-        orchestra, album, file_name = parts[0], parts[1], parts[2]
-
-        tags = load_tags(fp)
-        if tags is None:
+        key = track_key(*parts[:3])
+        paths[key] = fp
+        try:
+            st = os.stat(fp)
+        except OSError:
             continue
+        sig = {"size": st.st_size, "mtime": st.st_mtime_ns}
+        if (key in previous and key not in stale
+                and is_unchanged(old_manifest.get(key), sig, fp, use_hash)):
+            rows[key] = dict(old_rows.get(key, {}), Root=root_name)
+            kept += 1
+        else:
+            rows[key] = None
+            to_scan.append((fp, parts))
+        if use_hash and not sig.get("hash"):
+            sig["hash"] = fingerprint(fp)
+        new_manifest[key] = sig
 
-        def tag(key, default=""):
-            return tags.get(key, [default])[0].strip() if tags.get(key) else default
+    removed = len(previous - set(new_manifest))
+    print(f"변경 없음: {kept}  / 새로 스캔: {len(to_scan)}  / 삭제됨: {removed}")
+    return dict(root=root, root_name=root_name, rows=rows, to_scan=to_scan, paths=paths,
+                manifest=new_manifest, kept=kept, removed=removed)
 
-        title  = tag("title", os.path.splitext(file_name)[0])
-        artist = tag("artist")
-        albtag = tag("album")
+# ──────────── CSV 빌드 메인 ────────────────────────────
+def build_csv(root: str, full: bool = False, use_hash: bool = False,
+              workers: int = 1, cache: AnalysisCache | None = None,
+              store: LibraryStore | None = None, full_analysis: bool = False):
+    plan = scan_plan(root, full, use_hash, store)
+    root, root_name, rows, to_scan = plan["root"], plan["root_name"], plan["rows"], plan["to_scan"]
+    out_csv = os.path.join(root, CSV_NAME)
 
-        # BPM 계산 (파일 전체가 오래 걸릴 수 있어 60초만 분석)
-        try:
-            y, sr = librosa.load(fp, mono=True, duration=60)
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-            bpm_val = tempo / 2 if tempo >= 130 else tempo  # 130↑이면 ½로 보정
-            bpm     = int(round(bpm_val))
-        except Exception:
-            bpm = ""
-
-        rows.append(
-            dict(
-                Root=root_name,            # A열
-                Orchestra=orchestra,       # B열
-                AlbumFolder=album,         # C열
-                FileName=file_name,        # D열
-                Title=title,               # E열
-                TrackArtist=artist,        # F열
-                AlbumTag=albtag,           # G열
-                BPM=bpm                    # H열
-            )
-        )
+    results = run_chunked(partial(scan_file, cache=cache, full_analysis=full_analysis), [(fp, parts, root_name) for fp, parts in to_scan],
+                          workers=workers, desc="Scanning", unit="file", stage="scan")
+    failed, scanned = [], []
+    for (fp, parts), (row, err) in zip(to_scan, results):
+        if err:
+            failed.append(f"{fp}\t{err}")
+        if row is not None:
+            rows[track_key(*parts[:3])] = row
+            scanned.append(row)
+
+    if failed:   # 워커에서 실패한 파일은 건너뛰고 목록만 출력
+        print(f"⚠️  스캔 실패 {len(failed)}개:")
+        print("\n".join(failed))
+
+    if store is not None:
+        # 새로 스캔한 행의 태그 열만 upsert + 사라진 파일 행 삭제
+        new_df = pd.DataFrame(scanned, columns=COLUMNS)
+        new_df.insert(0, KEY, [track_key(o, a, f) for o, a, f in
+                               zip(new_df["Orchestra"], new_df["AlbumFolder"], new_df["FileName"])])
+        store.upsert(new_df, COLUMNS)
+        store.retain(k for k, r in rows.items() if r is not None)
+        save_manifest(root, plan["manifest"])
+        print(f"\n✅ 저장소 갱신 완료 → {store.path}  (갱신 {len(new_df)} 곡)")
+        return
 
     # DataFrame → CSV
-    df = pd.DataFrame(rows,
-        columns=[
-            "Root", "Orchestra", "AlbumFolder", "FileName",
-            "Title", "TrackArtist", "AlbumTag", "BPM"
-        ]
-    )
-    out_csv = os.path.join(root, "music_library_tags.csv")
+    df = pd.DataFrame([r for r in rows.values() if r is not None], columns=COLUMNS)
     df.to_csv(out_csv, index=False, encoding="utf-8")
+    save_manifest(root, plan["manifest"])   # CSV 저장 후에 갱신해야 다음 실행과 일치
     print(f"\n✅ CSV 저장 완료 → {out_csv}  (총 {len(df)} 곡)")
 
 # ──────────── 실행부 ───────────────────────────────────
 if __name__ == "__main__":
-    if len(sys.argv) >= 2:
-        root_dir = sys.argv[1]
-    else:
-        root_dir = r"C:/DJMusic"   # 기본값
+    ap = argparse.ArgumentParser(description="폴더 → 태그 CSV 생성기")
+    ap.add_argument("root", nargs="?", default=r"C:/DJMusic",
+                    help="음악 루트 폴더 (기본값 C:/DJMusic)")
+    ap.add_argument("--full", action="store_true",
+                    help="매니페스트를 무시하고 전체 파일을 다시 스캔")
+    ap.add_argument("--hash", action="store_true",
+                    help="mtime 만 바뀐 파일은 빠른 내용 해시로 변경 여부 확인")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help=f"태그·BPM 분석 프로세스 수 (0 = 자동, {default_workers()}개)")
+    ap.add_argument("--cache", default=str(CACHE_DB), metavar="FILE",
+                    help="분석 결과 캐시 (bpm.py 와 공유)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="캐시를 쓰지 않고 항상 새로 분석")
+    ap.add_argument("--store", metavar="FILE",
+                    help="CSV 대신 라이브러리 저장소(SQLite)에 기록")
+    ap.add_argument("--full-analysis", action="store_true",
+                    help="BPM 을 곡 전체로 분석 (특징 벡터·beat grid 도 저장, 훨씬 느림)")
+    args = ap.parse_args()
     t0 = time.time()
-    build_csv(root_dir)
+    build_csv(args.root, full=args.full, use_hash=args.hash,
+              workers=args.workers or default_workers(),
+              cache=None if args.no_cache else AnalysisCache(args.cache),
+              store=LibraryStore(args.store) if args.store else None,
+              full_analysis=args.full_analysis)
     print(f"소요 시간: {time.time() - t0:.1f}초")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# checkpoint.py – 긴 실행 중간 저장 (scrap.py · bpm.py 공용)
+#   · 끝난 항목을 키 → 값 dict 로 모아 두고 interval 초마다 CSV 로 원자적 저장
+#     (임시 파일에 쓴 뒤 os.replace → 도중에 죽어도 이전 체크포인트는 온전)
+#   · --resume 이면 load() 로 읽어 끝난 항목은 건너뜀
+#   · 실행이 정상 종료되면 clear() 로 삭제
+
+from __future__ import annotations
+import os, time
+from pathlib import Path
+from typing import Dict, Sequence
+
+import pandas as pd
+
+
+class Checkpoint:
+    def __init__(self, path: str | Path, key: str, columns: Sequence[str],
+                 interval: float = 30.0):
+        self.path     = Path(path)
+        self.key      = key
+        self.columns  = list(columns)
+        self.interval = interval
+        self.rows: Dict[str, dict] = {}
+        self._dirty   = False
+        self._last    = time.monotonic()
+
+    def load(self) -> int:
+        """저장된 체크포인트 읽기 → 끝난 항목 수 (없으면 0). 값은 문자열 ('' = 빈 값)."""
+        if not self.path.exists():
+            return 0
+        df = pd.read_csv(self.path, dtype=str, keep_default_na=False)
+        cols = [c for c in self.columns if c in df.columns]
+        self.rows = {k: dict(zip(cols, vals)) for k, *vals in
+                     df[[self.key] + cols].itertuples(index=False, name=None)}
+        return len(self.rows)
+
+    def add(self, key: str, values: dict) -> None:
+        self.rows[key] = {c: values.get(c) for c in self.columns}
+        self._dirty = True
+        if time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        df  = pd.DataFrame([{self.key: k, **v} for k, v in self.rows.items()],
+                           columns=[self.key] + self.columns)
+        tmp = self.path.with_suffix(".tmp")
+        df.to_csv(tmp, index=False, encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._dirty = False
+        self._last  = time.monotonic()
+
+    def apply(self, df: pd.DataFrame, keys: pd.Series) -> pd.Series:
+        """끝난 행의 값을 df 에 채우고, 끝난 행 마스크 반환."""
+        done = keys.isin(self.rows.keys())
+        for c in self.columns:
+            vals = keys[done].map(lambda k: self.rows[k].get(c, ""))
+            if len(vals):
+                if c not in df.columns:
+                    df[c] = ""
+                df[c] = df[c].astype(object)
+                df.loc[done, c] = vals
+        return done
+
+    def clear(self) -> None:
+        self.rows, self._dirty = {}, False
+        self.path.unlink(missing_ok=True)
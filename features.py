@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# features.py – 곡별 특징 벡터 + 비슷한 곡 찾기 (2페이지용)
+#   · 벡터 = tempo · onset 세기(평균·편차) · spectral centroid(평균·편차)
+#            · spectral contrast 7대역 평균 · RMS(평균·편차)  → float32 14개
+#   · analysis.py 가 BPM 분석과 같은 디코딩·STFT·onset 포락선으로 같이 계산해 analysis_cache 에 저장
+#     → 이미 분석한 곡은 다시 디코딩하지 않음
+#   · 이 스크립트는 라이브러리 CSV 의 TrackID ↔ 벡터를 music_library_features.npz 로 모음
+#     (캐시에 없는 곡만 디코딩, 이전 npz 에 있던 곡은 재사용)
+#   · SimilarIndex = 표준화한 벡터의 BallTree → 곡 하나의 k-최근접 곡을 ms 단위로
+#
+#   python features.py music_library_full.csv C:/DJMUSIC --workers 0
+
+from __future__ import annotations
+import argparse, os, sys, time
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from analysis_cache import AnalysisCache, CACHE_DB, fingerprint
+
+FEATURE_PARAMS = {"algo": "features-v1", "sr": 22050}
+FEATURE_NAMES  = (["tempo", "onset_mean", "onset_std", "centroid_mean", "centroid_std"]
+                  + [f"contrast_{i}" for i in range(7)] + ["rms_mean", "rms_std"])
+FEATURE_WEIGHTS = np.array([2.0] + [1.0] * (len(FEATURE_NAMES) - 1), dtype=np.float32)
+FEATURES_NPZ   = Path("music_library_features.npz")
+
+
+# ─── 특징 계산 ───────────────────────────────────────────────────
+def extract_features(y: np.ndarray, sr: int, tempo: float | None = None,
+                     S: np.ndarray | None = None, onset: np.ndarray | None = None,
+                     rms: np.ndarray | None = None) -> np.ndarray:
+    """디코딩한 모노 오디오 → 특징 벡터 (FEATURE_NAMES 순서).
+
+    S(|STFT|) · onset(평균 onset 포락선) · rms 를 주면 다시 계산하지 않음 (analysis.py)."""
+    import librosa
+    if onset is None:
+        onset = librosa.onset.onset_strength(y=y, sr=sr)
+    if tempo is None:
+        tempo = float(np.atleast_1d(librosa.feature.tempo(onset_envelope=onset, sr=sr))[0])
+    if S is None:
+        S = np.abs(librosa.stft(y))
+    if rms is None:
+        rms = librosa.feature.rms(S=S)[0]
+    centroid = librosa.feature.spectral_centroid(S=S, sr=sr)[0]
+    contrast = librosa.feature.spectral_contrast(S=S, sr=sr).mean(axis=1)
+    return np.array([tempo, onset.mean(), onset.std(), centroid.mean(), centroid.std(),
+                     *contrast, rms.mean(), rms.std()], dtype=np.float32)
+
+
+def cached_features(path: str | Path, cache: AnalysisCache | None = None) -> np.ndarray:
+    """캐시 조회 → 없으면 analysis.py 로 한 번 분석 (tempo·beat grid 도 같이 저장)."""
+    if cache is not None:
+        hit = cache.get_features(fingerprint(path), FEATURE_PARAMS)
+        if hit is not None:
+            return hit
+    from analysis import analyse_track, store_analysis
+    res = analyse_track(path)
+    if cache is not None:
+        store_analysis(path, cache, res)
+    return res.features
+
+
+# ─── TrackID ↔ 벡터 파일 ─────────────────────────────────────────
+def load_vectors(path: str | Path = FEATURES_NPZ) -> Dict[str, np.ndarray]:
+    try:
+        with np.load(path) as z:
+            return dict(zip(z["ids"].tolist(), z["X"]))
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+def save_vectors(vectors: Dict[str, np.ndarray], path: str | Path = FEATURES_NPZ) -> None:
+    ids = np.array(list(vectors), dtype=str)
+    X   = (np.stack(list(vectors.values())) if vectors
+           else np.empty((0, len(FEATURE_NAMES)), dtype=np.float32))
+    tmp = Path(path).with_suffix(".tmp.npz")
+    np.savez(tmp, ids=ids, X=X.astype(np.float32), names=np.array(FEATURE_NAMES))
+    os.replace(tmp, path)
+
+
+def build_vectors(ids: List[str], paths: List[str], cache: AnalysisCache | None = None,
+                  workers: int = 1, out: str | Path = FEATURES_NPZ,
+                  full: bool = False) -> Tuple[int, int, int]:
+    """라이브러리 곡들의 벡터 파일 갱신 → (재사용, 새로 계산, 실패) 곡 수."""
+    from parallel import run_chunked
+
+    prev = {} if full else load_vectors(out)
+    vectors = {i: prev[i] for i in ids if i in prev}
+    todo = [(i, p) for i, p in zip(ids, paths) if i not in vectors and Path(p).is_file()]
+    results = run_chunked(partial(cached_features, cache=cache), [p for _, p in todo],
+                          workers=workers, desc="features", stage="features")
+    failed = 0
+    for (i, _), (vec, err) in zip(todo, results):
+        if err or vec is None:
+            failed += 1
+        else:
+            vectors[i] = vec
+    save_vectors(vectors, out)
+    return len(vectors) - len(todo) + failed, len(todo) - failed, failed
+
+
+# ─── 비슷한 곡 찾기 ──────────────────────────────────────────────
+class SimilarIndex:
+    """표준화(+가중치)한 특징 벡터의 BallTree. 읽기 전용 → 여러 세션이 같이 씀."""
+
+    def __init__(self, ids: List[str], X: np.ndarray):
+        from sklearn.neighbors import BallTree
+        self.ids = list(ids)
+        self.pos = {t: i for i, t in enumerate(self.ids)}
+        X = np.asarray(X, dtype=np.float32)
+        self.mean = X.mean(axis=0) if len(X) else np.zeros(X.shape[1], np.float32)
+        self.std  = X.std(axis=0) if len(X) else np.ones(X.shape[1], np.float32)
+        self.std[self.std == 0] = 1.0
+        self.Z    = (X - self.mean) / self.std * FEATURE_WEIGHTS
+        self.tree = BallTree(self.Z) if len(X) else None
+
+    @classmethod
+    def load(cls, path: str | Path = FEATURES_NPZ) -> "SimilarIndex":
+        vectors = load_vectors(path)
+        X = (np.stack(list(vectors.values())) if vectors
+             else np.empty((0, len(FEATURE_NAMES)), dtype=np.float32))
+        return cls(list(vectors), X)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in self.pos
+
+    def similar(self, track_id: str, k: int = 10) -> List[Tuple[str, float]]:
+        """track_id 와 가까운 곡 k개 [(TrackID, 거리)] (자기 자신 제외)."""
+        i = self.pos.get(track_id)
+        if i is None or self.tree is None:
+            return []
+        dist, idx = self.tree.query(self.Z[i:i + 1], k=min(k + 1, len(self.ids)))
+        return [(self.ids[j], float(d)) for d, j in zip(dist[0], idx[0]) if j != i][:k]
+
+
+if __name__ == "__main__":
+    from library_frame import load_library
+    from parallel import default_workers
+
+    ap = argparse.ArgumentParser(description="비슷한 곡 찾기용 특징 벡터 파일 만들기")
+    ap.add_argument("csv", help="music_library_full.csv")
+    ap.add_argument("root", help="음악 폴더 루트")
+    ap.add_argument("--out", default=str(FEATURES_NPZ), metavar="FILE")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help=f"분석 프로세스 수 (0 = 자동, {default_workers()}개)")
+    ap.add_argument("--cache", default=str(CACHE_DB), metavar="FILE",
+                    help="분석 결과 캐시 (bpm.py 와 공유)")
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--full", action="store_true", help="이전 벡터 파일을 무시하고 전부 다시")
+    args = ap.parse_args()
+
+    lib   = load_library(args.csv, args.root)
+    cache = None if args.no_cache else AnalysisCache(args.cache)
+    t0    = time.perf_counter()
+    kept, new, failed = build_vectors(lib.df["TrackID"].tolist(), lib.df["Path"].tolist(),
+                                      cache, args.workers or default_workers(), args.out,
+                                      args.full)
+    print(f"✅ 벡터 {kept + new:,}곡 (재사용 {kept:,} · 새로 {new:,} · 실패 {failed:,}) "
+          f"→ {args.out}  ({time.perf_counter() - t0:.1f}초)")
+    if kept + new == 0:
+        sys.exit(1)
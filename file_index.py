@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# file_index.py – 음악 폴더 파일 인덱스 (build_tag_csv.py · bpm.py · 페이지 공용)
+#   · <음악 루트>/audio_file_index.json 에 폴더별 mtime·파일·하위폴더 목록 저장
+#   · 새로 고칠 때 mtime 이 그대로인 폴더는 목록을 다시 읽지 않음 (stat 1회)
+#   · 같은 깊이의 폴더들은 스레드 풀에서 병렬 os.scandir
+#
+#   python file_index.py C:/DJMUSIC      # 인덱스 갱신 + 요약 출력
+
+from __future__ import annotations
+import json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+INDEX_NAME = "audio_file_index.json"
+AUDIO_EXTS = {".mp3", ".flac", ".m4a", ".wav", ".ogg"}
+SCAN_THREADS = 8
+
+
+class FileIndex:
+    """폴더 트리의 오디오 파일 목록. 경로는 루트 기준 '/' 구분 상대경로."""
+
+    def __init__(self, root: str | Path, dirs: Dict[str, dict] | None = None):
+        self.root = Path(root)
+        self.dirs: Dict[str, dict] = dirs or {}   # 상대 폴더 → {mtime, files, subdirs}
+        self._by_name: Dict[str, List[str]] | None = None
+        self.rescanned = 0                          # 마지막 refresh 에서 새로 읽은 폴더 수
+
+    # ── 저장 / 불러오기 ───────────────────────────────────────────
+    @classmethod
+    def load(cls, root: str | Path) -> "FileIndex":
+        """디스크를 돌지 않고 저장된 인덱스만 읽음 (없으면 빈 인덱스)."""
+        try:
+            with open(Path(root) / INDEX_NAME, encoding="utf-8") as fh:
+                return cls(root, json.load(fh).get("dirs", {}))
+        except (OSError, ValueError):
+            return cls(root)
+
+    def save(self) -> None:
+        path = self.root / INDEX_NAME
+        tmp  = path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"version": 1, "dirs": self.dirs}, fh, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:      # 읽기 전용 폴더 → 이번 실행에서만 사용
+            pass
+
+    # ── 갱신 ──────────────────────────────────────────────────────
+    def _scan_dir(self, rel: str) -> Tuple[str, dict | None, bool]:
+        """(상대폴더, 항목, 새로 읽었는지). mtime 이 같으면 캐시 항목 재사용."""
+        path = self.root / rel if rel else self.root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return rel, None, False
+        cached = self.dirs.get(rel)
+        if cached and cached.get("mtime") == mtime:
+            return rel, cached, False
+
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            subdirs.append(e.name)
+                        elif os.path.splitext(e.name)[1].lower() in AUDIO_EXTS:
+                            files.append(e.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return rel, None, False
+        return rel, {"mtime": mtime, "files": sorted(files),
+                     "subdirs": sorted(subdirs)}, True
+
+    def refresh(self, threads: int = SCAN_THREADS, save: bool = True) -> "FileIndex":
+        """바뀐 폴더만 다시 읽어 인덱스 갱신 (폴더 단위 BFS, 깊이마다 병렬)."""
+        new: Dict[str, dict] = {}
+        frontier, rescanned = [""], 0
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            while frontier:
+                nxt = []
+                for rel, entry, fresh in ex.map(self._scan_dir, frontier):
+                    if entry is None:
+                        continue
+                    new[rel] = entry
+                    rescanned += fresh
+                    nxt.extend(f"{rel}/{d}" if rel else d for d in entry["subdirs"])
+                frontier = nxt
+        self.dirs, self._by_name = new, None
+        self.rescanned = rescanned
+        if save:
+            self.save()
+        return self
+
+    # ── 조회 ──────────────────────────────────────────────────────
+    @property
+    def files(self) -> List[str]:
+        return sorted(f"{d}/{f}" if d else f
+                      for d, e in self.dirs.items() for f in e["files"])
+
+    def abspath(self, rel: str) -> Path:
+        return self.root.joinpath(*rel.split("/"))
+
+    def contains(self, rel: str) -> bool:
+        d, _, f = rel.rpartition("/")
+        e = self.dirs.get(d)
+        return bool(e) and f in e["files"]
+
+    def locate(self, orchestra: str, album: str, file_name: str) -> Path | None:
+        """악단/앨범/파일명 → 실제 경로. 옮겨진 파일은 같은 이름이 하나뿐일 때만 찾음."""
+        rel = "/".join(p for p in (orchestra, album, file_name) if p)
+        if self.contains(rel):
+            return self.abspath(rel)
+        if self._by_name is None:
+            self._by_name = {}
+            for r in self.files:
+                self._by_name.setdefault(r.rsplit("/", 1)[-1], []).append(r)
+        same = self._by_name.get(file_name, [])
+        return self.abspath(same[0]) if len(same) == 1 else None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python file_index.py <음악 루트>")
+    t0  = time.time()
+    idx = FileIndex.load(sys.argv[1]).refresh()
+    print(f"✅ {len(idx.files):,} 개 파일 / {len(idx.dirs):,} 개 폴더 "
+          f"(새로 읽은 폴더 {idx.rescanned:,}) – {time.time() - t0:.2f}초")
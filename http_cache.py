@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# http_cache.py – scrap.py 용 HTTP 응답 캐시 (SQLite)
+#   · 키 = 쿼리 파라미터까지 정렬해 붙인 URL
+#   · TTL 안이면 네트워크 없이 저장된 본문 사용
+#   · TTL 이 지나면 ETag / Last-Modified 로 조건부 요청 → 304 면 본문 재사용
+#   · 200 응답만 저장 (오류·재시도 응답은 저장 안 함)
+
+from __future__ import annotations
+import sqlite3, time
+from pathlib import Path
+from typing import Dict, Mapping, NamedTuple
+from urllib.parse import urlencode
+
+HTTP_CACHE_DB = Path("scrap_http_cache.sqlite")
+DEFAULT_TTL   = 30 * 24 * 3600      # 30일
+
+
+def cache_key(url: str, params: Mapping[str, str] | None = None) -> str:
+    """requests / httpx 어느 쪽이든 같은 키가 나오도록 파라미터 정렬."""
+    if not params:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{urlencode(sorted(params.items()))}"
+
+
+class CachedResponse(NamedTuple):
+    body:          str
+    etag:          str | None
+    last_modified: str | None
+    fetched:       float
+
+
+class HttpCache:
+    """URL → (본문, ETag, Last-Modified, 받은 시각)."""
+
+    def __init__(self, path: str | Path = HTTP_CACHE_DB, ttl: float = DEFAULT_TTL):
+        self.path  = Path(path)
+        self.ttl   = ttl
+        self._conn: sqlite3.Connection | None = None
+        self.hits = self.revalidated = self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " url           TEXT PRIMARY KEY,"
+                " body          TEXT NOT NULL,"
+                " etag          TEXT,"
+                " last_modified TEXT,"
+                " fetched       REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ── 조회 ──────────────────────────────────────────────────────
+    def get(self, key: str) -> CachedResponse | None:
+        row = self._db().execute(
+            "SELECT body, etag, last_modified, fetched FROM responses WHERE url=?",
+            (key,),
+        ).fetchone()
+        return None if row is None else CachedResponse(*row)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.fetched < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: CachedResponse | None) -> Dict[str, str]:
+        """재검증 요청에 붙일 If-None-Match / If-Modified-Since."""
+        if entry is None:
+            return {}
+        h = {}
+        if entry.etag:
+            h["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            h["If-Modified-Since"] = entry.last_modified
+        return h
+
+    # ── 쓰기 ──────────────────────────────────────────────────────
+    def put(self, key: str, body: str, headers: Mapping[str, str]) -> None:
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (key, body, headers.get("ETag"), headers.get("Last-Modified"), time.time()),
+        )
+        db.commit()
+
+    def touch(self, key: str) -> None:
+        """304 Not Modified → 받은 시각만 갱신 (TTL 다시 시작)."""
+        db = self._db()
+        db.execute("UPDATE responses SET fetched=? WHERE url=?", (time.time(), key))
+        db.commit()
+
+    def summary(self) -> str:
+        return (f"HTTP 캐시: 적중 {self.hits} · 재검증 {self.revalidated} · "
+                f"새로 받음 {self.misses}")
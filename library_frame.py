@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# library_frame.py – 2페이지용 라이브러리 표 (music_library_full.csv → 가벼운 DataFrame)
+#   · 악단·장르·앨범 등 반복 문자열 = category, BPM·녹음 연도 = float32
+#   · 파일 경로(Path)와 필터 선택지(정렬된 고유값·범위)를 열 단위로 한 번에 계산
+#   · 필터 인덱스(library_query.LibraryIndex)도 같이 만들어 둠
+#   · 페이지는 파일 버전(mtime·크기 또는 업로드 내용 해시)을 키로 캐시
+#     → 위젯을 건드릴 때마다 CSV 를 다시 읽지 않음
+#
+#   python library_frame.py music_library_full.csv C:/DJMUSIC   # 읽기 시간·메모리 확인
+#   python library_frame.py --check                              # 중복 TrackID 조회 확인
+
+from __future__ import annotations
+import hashlib, io, os, sys, time
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from file_index import INDEX_NAME, FileIndex
+from library_query import LibraryIndex
+from library_store import frame_keys, track_id
+
+CATEGORY_COLS = ["Root", "Orchestra", "AlbumFolder", "AlbumTag", "Genre",
+                 "Vocalist", "Leader", "TrackArtist"]
+DEFAULTS = {"Genre": "", "BPM": np.nan, "RecordingYear": np.nan,
+            "AlbumFolder": "", "AlbumTag": ""}
+DERIVED  = ["Path", "GenreKey"]          # 저장할 때는 빼는 계산 열
+GENRES   = ["tango", "vals", "milonga"]
+
+
+# ─── 버전 키 ─────────────────────────────────────────────────────
+def file_version(path: str | Path) -> str:
+    """디스크 파일 → 'mtime_ns-크기' (내용이 바뀌면 달라짐)."""
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def bytes_version(data: bytes) -> str:
+    """업로드한 내용 → 해시."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def index_version(audio_root: str | Path) -> str:
+    """파일 인덱스가 갱신되면 경로도 다시 계산하도록 인덱스 mtime 을 키에 포함."""
+    try:
+        return file_version(Path(audio_root) / INDEX_NAME)
+    except OSError:
+        return ""
+
+
+# ─── 경로 계산 (열 단위) ─────────────────────────────────────────
+def _text(s: pd.Series) -> pd.Series:
+    return s.astype("string").fillna("").str.strip()
+
+
+def locate_paths(df: pd.DataFrame, audio_root: str | Path,
+                 index: FileIndex | None = None) -> pd.Series:
+    """악단/앨범/파일명 → 실제 경로 문자열 (FileIndex.locate 와 같은 규칙).
+
+    인덱스에 있으면 그 경로, 옮겨진 파일은 같은 이름이 하나뿐일 때 그 위치,
+    그 외에는 루트/악단/앨범/파일명."""
+    o, a, f = (_text(df[c]) if c in df.columns else pd.Series("", index=df.index, dtype="string")
+               for c in ("Orchestra", "AlbumFolder", "FileName"))
+    rel    = (o + "/" + a + "/" + f).str.replace(r"/+", "/", regex=True).str.strip("/")
+    found  = pd.Series(pd.NA, index=df.index, dtype="string")
+    three  = (o != "") & (a != "") & (f != "")
+    if index is not None and index.dirs:
+        files = pd.Series(index.files, dtype="string")
+        names = files.str.rsplit("/", n=1).str[-1]
+        once  = ~names.duplicated(keep=False)
+        by_name = pd.Series(files[once].to_numpy(), index=names[once].to_numpy())
+        exact = three & rel.isin(set(index.files))
+        found = rel.where(exact, f.map(by_name).where(three))
+    root = str(Path(audio_root)).rstrip("\\/") + os.sep
+    return root + found.fillna(rel).str.replace("/", os.sep, regex=False)
+
+
+# ─── 라이브러리 표 ───────────────────────────────────────────────
+class LibraryFrame:
+    """읽기 전용 라이브러리 표 + 필터 선택지. 캐시에서 여러 세션이 같이 씀 → 수정 금지."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.album_col = "AlbumFolder" if df["AlbumFolder"].notna().any() else "AlbumTag"
+        self.orchestras: List[str] = _options(df["Orchestra"])
+        self.albums:     List[str] = _options(df[self.album_col])
+        self.year_range: Tuple[int, int] = _bounds(df["RecordingYear"], (1900, 2025))
+        self.bpm_range:  Tuple[int, int] = _bounds(df["BPM"], (0, 250))
+        self.index = LibraryIndex(df, ["Orchestra", "GenreKey", self.album_col],
+                                  ["RecordingYear", "BPM"])
+        first      = ~df["TrackID"].duplicated()      # 같은 TrackID 가 여러 행이면 첫 행만 (get_indexer 는 고유 색인만)
+        self._ids  = pd.Index(df["TrackID"][first])
+        self._rows = np.flatnonzero(first.to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def positions(self, ids) -> np.ndarray:
+        """TrackID 목록 → 행 번호 (순서 유지, 없는 ID 는 빠짐, 중복 ID 는 첫 행)."""
+        pos = self._ids.get_indexer(list(ids))
+        return self._rows[pos[pos >= 0]]
+
+    def to_csv(self, out: str | Path) -> None:
+        self.df.drop(columns=DERIVED).to_csv(out, index=False)
+
+
+def _options(s: pd.Series) -> List[str]:
+    vals = s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else s.dropna().unique()
+    return sorted(v for v in vals if v == v and str(v).strip())
+
+
+def _bounds(s: pd.Series, default: Tuple[int, int]) -> Tuple[int, int]:
+    lo, hi = s.min(), s.max()
+    return default if pd.isna(lo) else (int(lo), int(hi))
+
+
+def load_library(src, audio_root: str | Path) -> LibraryFrame:
+    """CSV 경로 / 바이트 / 파일 객체 → LibraryFrame."""
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+    df = pd.read_csv(src, dtype={c: "category" for c in CATEGORY_COLS})
+    for c, d in DEFAULTS.items():
+        if c not in df.columns:
+            df[c] = d
+    for c in ("Genre", "AlbumFolder", "AlbumTag"):
+        if not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+
+    df["BPM"] = pd.to_numeric(df["BPM"], errors="coerce").astype("float32")
+    year = pd.to_numeric(df["RecordingYear"], errors="coerce")
+    if year.isna().all() and "RecordingDate" in df.columns:
+        year = pd.to_numeric(df["RecordingDate"].astype(str).str[:4], errors="coerce")
+    df["RecordingYear"] = year.astype("float32")
+
+    # 소문자 장르 (필터용) – 카테고리 이름만 바꾸므로 행 수와 무관
+    cats = [str(c).strip().lower() for c in df["Genre"].cat.categories]
+    df["GenreKey"] = (df["Genre"].cat.rename_categories(cats) if len(set(cats)) == len(cats)
+                      else df["Genre"].astype("string").str.strip().str.lower().astype("category"))
+
+    if "TrackID" not in df.columns or df["TrackID"].isna().any():   # TrackID 이전 CSV
+        ids = frame_keys(df.astype({c: object for c in ("Orchestra", "AlbumFolder")})).map(track_id)
+        df["TrackID"] = df["TrackID"].fillna(ids) if "TrackID" in df.columns else ids
+
+    df["Path"] = locate_paths(df, audio_root, FileIndex.load(audio_root)).astype(object)
+    return LibraryFrame(df)
+
+
+def _check() -> None:
+    """악단·앨범·파일명이 같은 두 행 (→ 같은 TrackID) 에서도 조회가 되는지 확인."""
+    csv = b"Orchestra,AlbumFolder,FileName,Title\nA,X,01.flac,t1\nA,X,01.flac,t2\nB,Y,02.flac,t3\n"
+    lib = load_library(csv, ".")
+    tid = lib.df["TrackID"].tolist()
+    assert tid[0] == tid[1] and len(lib.positions([])) == 0
+    assert lib.positions([tid[2], "없는 ID", tid[0]]).tolist() == [2, 0]
+    print("✅ 중복 TrackID 조회 확인")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--check"]:
+        sys.exit(_check())
+    if len(sys.argv) < 3:
+        sys.exit("usage: python library_frame.py <music_library_full.csv> <음악 루트>")
+    t0  = time.perf_counter()
+    lib = load_library(sys.argv[1], sys.argv[2])
+    mem = lib.df.memory_usage(deep=True).sum() / 2**20
+    print(f"✅ {len(lib):,} 곡 – {time.perf_counter() - t0:.3f}초, {mem:.1f} MB")
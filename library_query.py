@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# library_query.py – 라이브러리 필터 인덱스 (2페이지 필터용)
+#   · 범위 열(녹음 연도·BPM) = 값으로 정렬한 행 번호 배열 → 이진 탐색으로 구간만 잘라냄
+#   · 항목 열(악단·장르·앨범) = 값별 행 번호 목록 + 비트맵(np.packbits, 행당 1비트)
+#     → 여러 조건은 비트맵 AND 로 교차, 조건이 하나면 행 목록을 그대로 사용
+#   · 항목별 개수(facet count) = 나머지 조건으로 거른 행의 코드 bincount
+#   · 정렬 = 열마다 한 번 계산한 순위(rank)로 결과 행만 argsort (값 없는 곡은 항상 뒤)
+#   · 인덱스는 한 번 만들고 2페이지 캐시에서 여러 세션(스레드)이 같이 씀
+#     바뀌는 것은 항목 열의 비트맵 캐시뿐 → 잠금 아래에서만 넣고 버림
+#
+#   python bench/bench_library_query.py      # 10k·100k·1M 곡 지연 시간 비교
+
+from __future__ import annotations
+import threading
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+BITMAP_CACHE = 32                    # 항목 열마다 보관할 비트맵 수 (1M 곡 = 개당 125 KB)
+Range = Tuple[float, float, bool]     # (최소, 최대, 값 없는 행 포함 여부)
+
+
+class RangeIndex:
+    """숫자 열 하나 – 값 순서로 정렬한 행 번호 (NaN 은 뒤쪽에 따로)."""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values = np.asarray(values, dtype=np.float64)
+        self.order  = np.argsort(values, kind="stable")       # NaN 은 맨 뒤로 감
+        self.valid  = int(np.count_nonzero(~np.isnan(values)))
+        self.sorted = values[self.order[:self.valid]]
+
+    def rows(self, lo: float, hi: float, with_nan: bool = False) -> np.ndarray:
+        """lo ≤ 값 ≤ hi 인 행 번호 (정렬 안 됨)."""
+        i = np.searchsorted(self.sorted, lo, side="left")
+        j = np.searchsorted(self.sorted, hi, side="right")
+        if with_nan and self.valid < len(self.order):
+            return np.concatenate([self.order[i:j], self.order[self.valid:]])
+        return self.order[i:j]
+
+    def keep(self, rows: np.ndarray, lo: float, hi: float, with_nan: bool = False) -> np.ndarray:
+        """rows 중 조건에 맞는 것만 (rows 순서 유지)."""
+        v  = self.values[rows]
+        ok = (v >= lo) & (v <= hi)
+        return rows[ok | np.isnan(v)] if with_nan else rows[ok]
+
+
+class FacetIndex:
+    """항목 열 하나 – 값(카테고리 코드)별 행 번호 목록 + 필요할 때 만드는 비트맵."""
+
+    def __init__(self, series: pd.Series):
+        cat = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+        self.labels: List[str] = [str(c) for c in cat.cat.categories]
+        self.code   = {v: i for i, v in enumerate(self.labels)}
+        self.codes  = cat.cat.codes.to_numpy()                  # -1 = 값 없음
+        self.perm   = np.argsort(self.codes, kind="stable")
+        counts      = np.bincount(self.codes + 1, minlength=len(self.labels) + 1)
+        self.bounds = np.cumsum(counts)                         # 코드 c 의 행 = perm[bounds[c]:bounds[c+1]]
+        self._bits: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def rows(self, value: str) -> np.ndarray:
+        c = self.code.get(value)
+        if c is None:
+            return self.perm[:0]
+        return self.perm[self.bounds[c]:self.bounds[c + 1]]
+
+    def keep(self, rows: np.ndarray, value: str) -> np.ndarray:
+        return rows[self.codes[rows] == self.code.get(value, -2)]
+
+    def bitmap(self, value: str, n: int) -> np.ndarray:
+        c  = self.code.get(value, -2)
+        bm = self._bits.get(c)          # 지역 변수로 들고 있음 → 다른 세션이 버려도 그대로 반환
+        if bm is None:
+            bm = _pack(self.rows(value), n)
+            with self._lock:
+                while len(self._bits) >= BITMAP_CACHE:     # 오래된 것부터 버림 (앨범처럼 값이 많은 열)
+                    self._bits.pop(next(iter(self._bits)))
+                self._bits[c] = bm
+        return bm
+
+    def counts(self, rows: np.ndarray | None = None) -> Dict[str, int]:
+        codes = self.codes if rows is None else self.codes[rows]
+        hist  = np.bincount(codes[codes >= 0], minlength=len(self.labels))
+        return {v: int(k) for v, k in zip(self.labels, hist) if k}
+
+
+def _pack(rows: np.ndarray, n: int) -> np.ndarray:
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+
+class LibraryIndex:
+    """필터 조건 → 행 번호. facets={열: 값}, ranges={열: (최소, 최대, NaN 포함)}."""
+
+    def __init__(self, df: pd.DataFrame, facets: Sequence[str], ranges: Sequence[str]):
+        self.n      = len(df)
+        self.df     = df
+        self._rank: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.facets = {c: FacetIndex(df[c]) for c in facets}
+        self.ranges = {c: RangeIndex(df[c].to_numpy()) for c in ranges}
+
+    def _parts(self, facets: Mapping[str, str | None], ranges: Mapping[str, Range | None],
+               skip: str | None = None) -> List[Tuple[str, object]]:
+        """적용할 조건 목록 [(종류, 인자)] – None 이거나 skip 열이면 빠짐."""
+        parts = [("facet", (c, v)) for c, v in facets.items() if v is not None and c != skip]
+        parts += [("range", (c, r)) for c, r in ranges.items() if r is not None and c != skip]
+        return parts
+
+    def _rows(self, kind: str, arg) -> np.ndarray:
+        col, val = arg
+        return self.facets[col].rows(val) if kind == "facet" else self.ranges[col].rows(*val)
+
+    def _bitmap(self, kind: str, arg) -> np.ndarray:
+        col, val = arg
+        if kind == "facet":
+            return self.facets[col].bitmap(val, self.n)
+        return _pack(self.ranges[col].rows(*val), self.n)
+
+    def _select(self, parts) -> np.ndarray | None:
+        """조건들의 교집합 → 오름차순 행 번호 (조건이 없으면 None = 전체)."""
+        if not parts:
+            return None
+        if len(parts) == 1:
+            return np.sort(self._rows(*parts[0]))
+        # 가장 좁은 조건이 전체의 1/64 보다 작으면 비트맵 대신 그 행만 값으로 확인
+        cands = [self._rows(*p) for p in parts]
+        small = int(np.argmin([len(r) for r in cands]))
+        if len(cands[small]) * 64 < self.n:
+            rows = np.sort(cands[small])
+            for i, (kind, (col, val)) in enumerate(parts):
+                if i != small:
+                    rows = (self.facets[col].keep(rows, val) if kind == "facet"
+                            else self.ranges[col].keep(rows, *val))
+            return rows
+        acc = self._bitmap(*parts[0]).copy()
+        for p in parts[1:]:
+            np.bitwise_and(acc, self._bitmap(*p), out=acc)
+        return np.flatnonzero(np.unpackbits(acc, count=self.n))
+
+    def query(self, facets: Mapping[str, str | None] | None = None,
+              ranges: Mapping[str, Range | None] | None = None) -> np.ndarray:
+        """조건을 모두 만족하는 행 번호 (원래 순서)."""
+        rows = self._select(self._parts(facets or {}, ranges or {}))
+        return np.arange(self.n) if rows is None else rows
+
+    def _ranks(self, col: str) -> Tuple[np.ndarray, np.ndarray]:
+        """열의 (순위, 값 없음 여부) – 처음 정렬할 때 한 번만 계산. 값 없음 = n."""
+        if col not in self._rank:
+            s     = self.df[col].reset_index(drop=True)
+            order = s.sort_values(kind="stable", na_position="last").index.to_numpy()
+            dense, _ = pd.factorize(s.iloc[order], sort=False)   # 정렬 순서대로 0,1,2… (같은 값 = 같은 순위)
+            rank  = np.empty(self.n, dtype=np.int64)
+            rank[order] = np.where(dense < 0, self.n, dense)
+            self._rank[col] = (rank, s.isna().to_numpy())
+        return self._rank[col]
+
+    def sort(self, rows: np.ndarray, col: str, descending: bool = False) -> np.ndarray:
+        """rows 를 col 값 순서로 (같은 값은 원래 순서, 값 없는 곡은 맨 뒤)."""
+        rank, na = self._ranks(col)
+        key = rank[rows]
+        if descending:
+            key = np.where(na[rows], key, -key)
+        return rows[np.argsort(key, kind="stable")]
+
+    def facet_counts(self, facets: Mapping[str, str | None] | None = None,
+                     ranges: Mapping[str, Range | None] | None = None) -> Dict[str, Dict[str, int]]:
+        """항목 열마다 {값: 곡 수} – 자기 열의 선택은 빼고 나머지 조건으로 셈."""
+        return {c: idx.counts(self._select(self._parts(facets or {}, ranges or {}, skip=c)))
+                for c, idx in self.facets.items()}
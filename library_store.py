@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# library_store.py – 음악 라이브러리 단일 저장소 (SQLite, 열 타입 지정)
+#   · build_tag_csv.py / scrap.py / bpm.py 가 각자 자기 열만, 처리한 행만 upsert
+#   · 키 = TrackKey ('악단/앨범/파일명'), TrackID = 그 경로의 짧은 해시 (스캔 때 부여, 고유)
+#   · 사용자용 CSV 는 export 로 한 번만 생성 (저장소가 바뀌었을 때만 다시 씀)
+#
+#   python library_store.py export music_library_full.csv
+#   python library_store.py import music_library_full.csv   (기존 CSV → 저장소)
+
+from __future__ import annotations
+import argparse, hashlib, os, sqlite3, sys, time, unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+import pandas as pd
+
+STORE_DB = Path("music_library.sqlite")
+KEY      = "TrackKey"
+
+# 열 → SQLite 타입 (새 열은 여기에 추가하면 기존 DB 에도 자동 ALTER)
+COLUMN_TYPES: Dict[str, str] = {
+    # build_tag_csv.py
+    "TrackID": "TEXT",
+    "Root": "TEXT", "Orchestra": "TEXT", "AlbumFolder": "TEXT", "FileName": "TEXT",
+    "Title": "TEXT", "TrackArtist": "TEXT", "AlbumTag": "TEXT", "BPM": "REAL",
+    "Duration": "REAL", "Bitrate": "INTEGER", "SampleRate": "INTEGER",
+    # bpm.py
+    "BPMNote": "TEXT",
+    # scrap.py
+    "RecordingDate": "TEXT", "Genre": "TEXT", "Vocalist": "TEXT",
+    "Leader": "TEXT", "ScrapNote": "TEXT",
+}
+
+# music_library_full.csv 열 순서 (기존 make_full_csv 결과 + 맨 앞 TrackID)
+FULL_COLUMNS = [
+    "TrackID", "Root", "Orchestra", "AlbumFolder", "FileName", "Title", "TrackArtist",
+    "AlbumTag", "BPM", "BPMNote", "Genre", "Vocalist", "Leader",
+    "RecordingDate", "RecordingYear", "Duration", "Bitrate", "SampleRate",
+]
+
+
+def norm_key(key: str) -> str:
+    """TrackKey 는 NFC 로 통일 (맥 NFD / 윈도우 NFC 파일명이 같은 키·같은 TrackID 가 되도록)."""
+    return unicodedata.normalize("NFC", key)
+
+
+def track_key(orchestra: str, album: str, file_name: str) -> str:
+    return norm_key(f"{orchestra}/{album}/{file_name}")
+
+
+def track_id(key: str) -> str:
+    """TrackKey → 16자리 ID. 경로가 같으면 항상 같은 값 (NFC 정규화 → 맥/윈도우 동일)."""
+    return hashlib.blake2b(norm_key(key).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def frame_keys(df: pd.DataFrame) -> pd.Series:
+    """행마다 TrackKey (저장소에서 읽었으면 그대로, CSV 면 악단/앨범/파일명으로)."""
+    if KEY in df.columns:
+        return df[KEY].astype(str)
+    return pd.Series([track_key(o, a, f) for o, a, f in
+                      zip(df["Orchestra"], df["AlbumFolder"], df["FileName"])],
+                     index=df.index, dtype=object)
+
+
+def _sql_value(v, sql_type: str):
+    """pandas 값 → SQLite 값 (NaN·빈 숫자 → NULL)."""
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    if sql_type in ("REAL", "INTEGER"):
+        if isinstance(v, str):
+            v = v.strip()
+            if not v:
+                return None
+            try:
+                return float(v) if sql_type == "REAL" else int(float(v))
+            except ValueError:
+                return None
+        return float(v) if sql_type == "REAL" else int(v)
+    return v if isinstance(v, str) else str(v)
+
+
+class LibraryStore:
+    def __init__(self, path: str | Path = STORE_DB):
+        self.path  = Path(path)
+        self._conn: sqlite3.Connection | None = None
+
+    # ── 연결 & 스키마 ──────────────────────────────────────────────
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            cols = ", ".join(f'"{c}" {t}' for c, t in COLUMN_TYPES.items())
+            conn.execute(f'CREATE TABLE IF NOT EXISTS tracks ("{KEY}" TEXT PRIMARY KEY, {cols})')
+            have = {r[1] for r in conn.execute("PRAGMA table_info(tracks)")}
+            for c, t in COLUMN_TYPES.items():
+                if c not in have:
+                    conn.execute(f'ALTER TABLE tracks ADD COLUMN "{c}" {t}')
+            # NFC 가 아닌 키로 저장된 예전 행 → 정규화 (TrackID 가 유일하므로 키 충돌 없음)
+            renamed = [(norm_key(k), k) for (k,) in conn.execute(f'SELECT "{KEY}" FROM tracks')
+                       if norm_key(k) != k]
+            conn.executemany(f'UPDATE tracks SET "{KEY}"=? WHERE "{KEY}"=?', renamed)
+            # TrackID 가 없던 예전 저장소 → 한 번 채움
+            missing = [(track_id(k), k) for (k,) in
+                       conn.execute(f'SELECT "{KEY}" FROM tracks WHERE "TrackID" IS NULL')]
+            conn.executemany(f'UPDATE tracks SET "TrackID"=? WHERE "{KEY}"=?', missing)
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS tracks_id ON tracks("TrackID")')
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ── 읽기 ──────────────────────────────────────────────────────
+    def changed_at(self) -> float:
+        """마지막으로 upsert/retain 이 행을 바꾼 시각 (없으면 0)."""
+        row = self._db().execute("SELECT value FROM meta WHERE name='changed'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def _touch(self, db: sqlite3.Connection) -> None:
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('changed', ?)", (time.time(),))
+
+    def keys(self) -> List[str]:
+        return [r[0] for r in self._db().execute(f'SELECT "{KEY}" FROM tracks')]
+
+    def read(self, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        """KEY + 지정 열 (없으면 전체) 을 DataFrame 으로."""
+        cols = list(columns) if columns else list(COLUMN_TYPES)
+        sel  = ", ".join(f'"{c}"' for c in [KEY] + [c for c in cols if c != KEY])
+        return pd.read_sql_query(f"SELECT {sel} FROM tracks ORDER BY rowid", self._db())
+
+    # ── 쓰기 ──────────────────────────────────────────────────────
+    def upsert(self, df: pd.DataFrame, columns: Sequence[str]) -> int:
+        """df 의 행들에 대해 columns 만 갱신 (없는 행은 새로 추가). 다른 열은 그대로.
+        TrackID 는 키에서 계산해 항상 함께 기록. 값이 같은 행은 쓰지 않음 → 실제로 바뀐 행 수."""
+        if df.empty:
+            return 0
+        keys  = [norm_key(str(k)) for k in df[KEY]]
+        df    = df.assign(**{KEY: keys, "TrackID": [track_id(k) for k in keys]})
+        cols  = ["TrackID"] + [c for c in columns if c not in (KEY, "TrackID")]
+        names = ", ".join(f'"{c}"' for c in [KEY] + cols)
+        marks = ", ".join("?" * (len(cols) + 1))
+        sets  = ", ".join(f'"{c}"=excluded."{c}"' for c in cols)
+        differs  = " OR ".join(f'"{c}" IS NOT excluded."{c}"' for c in cols)
+        conflict = f"DO UPDATE SET {sets} WHERE {differs}"
+        types = [COLUMN_TYPES[c] for c in cols]
+        data  = [
+            (key, *(_sql_value(v, t) for v, t in zip(vals, types)))
+            for key, *vals in df[[KEY] + cols].itertuples(index=False, name=None)
+        ]
+        db = self._db()
+        with db:
+            before = db.total_changes
+            db.executemany(
+                f'INSERT INTO tracks ({names}) VALUES ({marks}) '
+                f'ON CONFLICT("{KEY}") {conflict}',
+                data,
+            )
+            changed = db.total_changes - before
+            if changed:
+                self._touch(db)
+        return changed
+
+    def retain(self, keys: Iterable[str]) -> int:
+        """keys 에 없는 행 삭제 (디스크에서 사라진 파일)."""
+        drop = set(self.keys()) - {norm_key(k) for k in keys}
+        db = self._db()
+        with db:
+            db.executemany(f'DELETE FROM tracks WHERE "{KEY}"=?', [(k,) for k in drop])
+            if drop:
+                self._touch(db)
+        return len(drop)
+
+    # ── CSV 내보내기 / 가져오기 ───────────────────────────────────
+    def export_csv(self, out: str | Path, if_changed: bool = False) -> pd.DataFrame | None:
+        """저장소 → CSV. if_changed 면 CSV 가 마지막 변경보다 새로우면 건너뜀 (None)."""
+        out = Path(out)
+        if if_changed and out.exists() and out.stat().st_mtime >= self.changed_at():
+            return None
+        df = self.read()
+        df["RecordingYear"] = pd.to_numeric(
+            df["RecordingDate"].astype(str).str[:4], errors="coerce"
+        ).astype("Int64")
+        df = df[FULL_COLUMNS]
+        df.to_csv(out, index=False)
+        return df
+
+    def backup(self, dest: str | Path) -> None:
+        """WAL 내용까지 포함한 일관된 사본 (파일 복사는 -wal 을 빠뜨려 예전·깨진 사본이 될 수 있음)."""
+        dest = Path(dest)
+        tmp  = dest.with_name(dest.name + ".tmp")
+        out  = sqlite3.connect(tmp)
+        try:
+            self._db().backup(out)
+        finally:
+            out.close()
+        os.replace(tmp, dest)
+
+    def import_csv(self, src: str | Path) -> int:
+        df = pd.read_csv(src)
+        df[KEY] = frame_keys(df)
+        return self.upsert(df, [c for c in COLUMN_TYPES if c in df.columns])
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="라이브러리 저장소 ↔ CSV")
+    ap.add_argument("action", choices=("export", "import"))
+    ap.add_argument("csv", metavar="CSV")
+    ap.add_argument("--store", default=str(STORE_DB), metavar="FILE",
+                    help=f"저장소 파일 (기본 {STORE_DB})")
+    args = ap.parse_args()
+
+    store = LibraryStore(args.store)
+    if args.action == "export":
+        n = len(store.export_csv(args.csv))
+        print(f"✅ {args.store} → {args.csv}  ({n} 곡)")
+    else:
+        if not Path(args.csv).exists():
+            sys.exit(f"❌ {args.csv} not found")
+        n = store.import_csv(args.csv)
+        print(f"✅ {args.csv} → {args.store}  ({n} 곡 갱신)")
@@ -1,21 +1,28 @@
 # pages/1_자동태그정리파일생성(csv).py
 # ─────────────────────────────────────────────────────────────────────────────
 # ① 자동 태그 정리 (CSV) 생성 ― build_tag_csv.py → scrap.py → bpm.py
-#   + 마지막에 music_library_full.csv 통합본 저장
+#   · 각 단계는 music_library.sqlite 저장소에 자기 열만 기록
+#   · '겹쳐서 실행' 이면 pipeline.py 하나로 세 단계를 동시에 진행
+#   + 마지막에 music_library_full.csv 통합본 저장 (저장소 → CSV 한 번)
 # ─────────────────────────────────────────────────────────────────────────────
-import os, sys, subprocess, shutil
+import os, sys, subprocess, shutil, threading, queue, time
 from pathlib import Path
 from collections import deque
 
-import pandas as pd
 import streamlit as st
 
 APP_DIR   = Path(__file__).parent.parent
-CSV_NAMES = [
-    "music_library_tags.csv",
-    "music_library_tags_updated.csv",
-    "music_library_tags_bpm.csv",
-    "music_library_full.csv",   # 통합본도 동기화
+sys.path.insert(0, str(APP_DIR))
+from library_store import LibraryStore, STORE_DB
+from progress import ENV as PROGRESS_ENV, parse as parse_progress
+
+FULL_CSV   = "music_library_full.csv"
+STORE_PATH = APP_DIR / STORE_DB
+REFRESH_SEC = 0.5               # 진행 막대·로그 다시 그리는 간격
+STAGE_NAMES = {"scan": "폴더 스캔", "scrap": "tango.info", "bpm": "BPM 분석"}
+CSV_NAMES  = [
+    STORE_DB.name,              # 라이브러리 저장소
+    FULL_CSV,                   # 통합본도 동기화
 ]
 
 st.set_page_config(page_title="자동 태그 정리(csv) 생성", page_icon="🎼", layout="wide")
@@ -37,16 +44,37 @@ else:
 st.divider()
 
 # ─────────────  단계 선택  ────────────────────────────────────────────────
+# scrap·bpm 은 도중에 끊겨도 체크포인트가 남으므로 이어서 / 실패만 다시 실행 가능
+RUN_MODES = {
+    "처음부터"                : [],
+    "이어서 (중단된 곳부터)"  : ["--resume"],
+    "실패한 곡만 다시"        : ["--retry-failed"],
+}
+run_mode   = st.radio("scrap · bpm 실행 방식", list(RUN_MODES), horizontal=True)
+STORE_ARGS = ["--store", str(STORE_PATH)]
+MODE_ARGS  = RUN_MODES[run_mode]
 ALL_STEPS = {
-    "폴더 → CSV 태그 정리 (build_tag_csv.py)": [sys.executable, "build_tag_csv.py", str(audio_root)],
-    "tango.info 태그 보강 (scrap.py)"        : [sys.executable, "scrap.py"],
-    "BPM 계산 (bpm.py)"                     : [sys.executable, "bpm.py", "--audio-root", str(audio_root)],
+    "폴더 → CSV 태그 정리 (build_tag_csv.py)": [sys.executable, "build_tag_csv.py", str(audio_root), *STORE_ARGS],
+    "tango.info 태그 보강 (scrap.py)"        : [sys.executable, "scrap.py", *STORE_ARGS, *MODE_ARGS],
+    "BPM 계산 (bpm.py)"                     : [sys.executable, "bpm.py", "--audio-root", str(audio_root), *STORE_ARGS, *MODE_ARGS],
+}
+PIPELINE_STEP = {
+    "스캔 · 스크랩 · BPM 동시 실행 (pipeline.py)": [sys.executable, "pipeline.py", str(audio_root),
+                                                   *STORE_ARGS, "--workers", "0"],
 }
 labels  = list(ALL_STEPS.keys())
 checked = st.multiselect("실행할 단계 선택", labels, default=labels)
+overlap = st.checkbox(
+    "세 단계를 겹쳐서 실행 (한 프로세스에서 스캔하는 대로 스크랩·BPM 동시 처리)",
+    value=False, disabled=len(checked) < len(labels) or run_mode != "처음부터",
+    help="세 단계를 모두 선택하고 '처음부터' 실행할 때만 사용할 수 있습니다.",
+)
+if overlap and len(checked) == len(labels) and not MODE_ARGS:
+    ALL_STEPS = PIPELINE_STEP
+    checked   = list(PIPELINE_STEP)
 
 st.caption(
-    "build → scrap → bpm 순으로 실행해 `music_library_tags_bpm.csv` 를 만든 뒤\n"
+    "build → scrap → bpm 순으로 `music_library.sqlite` 저장소를 채운 뒤\n"
     "**music_library_full.csv**(통합본)을 자동 저장합니다."
 )
 
@@ -61,74 +89,90 @@ def sync_csv():
     for n in CSV_NAMES:
         ap, mp = APP_DIR / n, audio_root / n
         if ap.exists() and not mp.exists():
-            shutil.copy2(ap, mp)
+            src, dst = ap, mp
         elif mp.exists() and not ap.exists():
-            shutil.copy2(mp, ap)
+            src, dst = mp, ap
+        else:
+            continue
+        if n == STORE_DB.name:      # WAL 모드 저장소 → -wal 까지 포함해 backup API 로 복사
+            store = LibraryStore(src)
+            store.backup(dst)
+            store.close()
+        else:
+            shutil.copy2(src, dst)
 
 # ─────────────  ★ 통합 CSV 생성 함수  ────────────────────────────────────
 def make_full_csv():
-    bpm_path = APP_DIR / "music_library_tags_bpm.csv"
-    upd_path = APP_DIR / "music_library_tags_updated.csv"
-    if not (bpm_path.exists() and upd_path.exists()):
-        st.warning("통합 CSV 생성: BPM CSV 또는 updated CSV 가 없습니다.")
+    # 각 단계가 저장소에 자기 열만 upsert 해 두었으므로 여기서는 내보내기만
+    store = LibraryStore(STORE_PATH)
+    if not store.keys():
+        st.warning("통합 CSV 생성: 라이브러리 저장소가 비어 있습니다.")
         return
 
-    df_bpm = pd.read_csv(bpm_path)
-    df_upd = pd.read_csv(upd_path)
-
-    # tango.info 에서 가져올 열 매핑
-    col_map = {
-        "RecordingYear": ["RecordingYear", "Year", "RecYear"],
-        "Genre"        : ["Genre"],
-        "Vocalist"     : ["Vocalist"],
-        "Leader"       : ["Leader"],
-    }
-    real_cols = {k: next((c for c in v if c in df_upd.columns), None)
-                 for k, v in col_map.items()}
-    avail = [c for c in real_cols.values() if c]
-
-    # 병합용 서브 DF
-    cols_for_merge = ["FileName", "Orchestra"] + avail
-    if "RecordingDate" in df_upd.columns:
-        cols_for_merge.append("RecordingDate")
-    upd_sub = df_upd[cols_for_merge]
-
-    # FileName + Orchestra 기준 병합
-    df_full = pd.merge(
-        df_bpm, upd_sub,
-        on=["FileName", "Orchestra"],
-        how="left",
-        suffixes=("", "_upd"),
-    )
-
-    # 열별 NaN 보강 / 신규 열 생성
-    for logical, real in real_cols.items():
-        if not real:                         # 해당 컬럼 없음
-            continue
-        upd_col = f"{real}_upd" if real in df_bpm.columns else real
-        if upd_col not in df_full.columns:
-            continue
-        if logical not in df_full.columns:
-            df_full.rename(columns={upd_col: logical}, inplace=True)
-        else:
-            df_full[logical] = df_full[logical].fillna(df_full[upd_col])
-            if upd_col != logical:
-                df_full.drop(columns=upd_col, inplace=True)
-
-    # RecordingDate → RecordingYear 파생 (남은 NaN 포함)
-    if "RecordingDate" in df_full.columns:
-        rec_year = pd.to_numeric(
-            df_full["RecordingDate"].astype(str).str[:4], errors="coerce"
-        )
-        if "RecordingYear" in df_full.columns:
-            df_full["RecordingYear"] = df_full["RecordingYear"].fillna(rec_year)
-        else:
-            df_full["RecordingYear"] = rec_year
-
-    out = APP_DIR / "music_library_full.csv"
-    df_full.to_csv(out, index=False)
+    # 행 단위 upsert 로 바뀐 행이 하나도 없으면 기존 CSV 를 그대로 둠
+    out = APP_DIR / FULL_CSV
+    df  = store.export_csv(out, if_changed=True)
+    store.close()
+    if df is None:
+        st.info(f"변경된 곡이 없어 기존 {out.name} 을(를) 그대로 사용합니다.")
+        return
     shutil.copy2(out, audio_root / out.name)
-    st.success(f"🎉 통합 CSV 저장 완료 → {out.name}")
+    st.success(f"🎉 통합 CSV 저장 완료 → {out.name}  ({len(df)} 곡)")
+
+# ─────────────  진행 표시  ────────────────────────────────────────────────
+def fmt_eta(sec) -> str:
+    if sec is None:
+        return "–"
+    m, s = divmod(int(sec), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+def render_bars(events: dict, slots: dict, area):
+    """단계별 진행 이벤트 → 진행 막대 (처리량·남은 시간·실패 수)."""
+    for stage, ev in events.items():
+        if stage not in slots:
+            slots[stage] = area.empty()
+        total, done = ev["total"], ev["done"]
+        text = (f"{STAGE_NAMES.get(stage, stage)}  {done:,}/{total:,}  ·  "
+                f"{ev['rate']:.1f} {ev.get('unit', 'trk')}/s  ·  남은 시간 {fmt_eta(ev['eta'])}"
+                + (f"  ·  실패 {ev['failures']:,}" if ev["failures"] else ""))
+        slots[stage].progress(min(done / total, 1.0) if total else 1.0, text=text)
+
+def run_step(cmd, env) -> tuple[int, deque]:
+    """하위 프로세스 실행. 출력은 읽기 스레드가 큐에 넣고, 화면은 REFRESH_SEC 마다 갱신."""
+    lines, events, slots = queue.Queue(), {}, {}
+    area, block, last = st.container(), st.empty(), deque(maxlen=10)
+    with subprocess.Popen(cmd, cwd=APP_DIR,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True, encoding="utf-8", errors="replace",
+                          env=env) as p:
+        def pump():
+            for line in p.stdout:
+                lines.put(line)
+            lines.put(None)
+        threading.Thread(target=pump, daemon=True).start()
+
+        ended = False
+        while not ended:
+            deadline = time.monotonic() + REFRESH_SEC
+            while (wait := deadline - time.monotonic()) > 0:
+                try:
+                    line = lines.get(timeout=wait)
+                except queue.Empty:
+                    break
+                if line is None:
+                    ended = True
+                    break
+                ev = parse_progress(line)
+                if ev is not None:
+                    events[ev["stage"]] = ev
+                elif line.strip():
+                    last.append(line.rstrip())
+            render_bars(events, slots, area)
+            if last:
+                block.code("\n".join(last), language="bash")
+        p.wait()
+    return p.returncode, last
 
 # ─────────────  실행 루프  ────────────────────────────────────────────────
 if run_btn:
@@ -136,33 +180,19 @@ if run_btn:
         env = os.environ.copy()
         env["PYTHONUTF8"]       = "1"
         env["PYTHONIOENCODING"] = "utf-8"   # UnicodeEncodeError 방지
+        env[PROGRESS_ENV]       = "json"    # tqdm 대신 진행 이벤트(JSON 줄) 출력
 
         for idx, lbl in enumerate(checked, 1):
             cmd = ALL_STEPS[lbl]
             st.markdown(f"<span style='color:#28a745'>Step {idx}/{len(checked)} ▶ {' '.join(cmd)}</span>",
                         unsafe_allow_html=True)
 
-            block, last, line_no = st.empty(), deque(maxlen=10), 0
-            try:
-                with subprocess.Popen(cmd, cwd=APP_DIR,
-                                      stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                      text=True, encoding="utf-8", errors="replace",
-                                      env=env) as p:
-                    for line in p.stdout:
-                        line_no += 1
-                        last.append(line.rstrip())
-                        if line_no % 3 == 0:
-                            block.code("\n".join(last), language="bash")
-                    p.communicate()
-                    if p.returncode:
-                        raise subprocess.CalledProcessError(p.returncode, cmd)
-            except subprocess.CalledProcessError:
-                block.code("\n".join(last), language="bash")
+            code, _ = run_step(cmd, env)
+            if code:
                 st.error(f"❌ {lbl} 실패 – 이후 단계 중단")
                 stat.update(label="실패", state="error")
                 st.stop()
 
-            block.code("\n".join(last), language="bash")
             sync_csv()
 
         # 통합 CSV 생성 → 동기화
@@ -170,4 +200,4 @@ if run_btn:
         sync_csv()
 
         stat.update(label="✅ 모든 단계 완료!", state="complete")
-        st.success("🎉 music_library_tags_bpm.csv & music_library_full.csv 생성이 끝났습니다.")
+        st.success("🎉 music_library.sqlite & music_library_full.csv 생성이 끝났습니다.")
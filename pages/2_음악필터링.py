@@ -9,9 +9,15 @@ from pathlib import Path
 import io, json, zipfile
 
 import numpy as np
-import pandas as pd
 import streamlit as st
 
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from features import FEATURES_NPZ, SimilarIndex
+from library_frame import GENRES, LibraryFrame, bytes_version, file_version, index_version, load_library
+from preview import MIME as PREVIEW_MIME, make_clip, mime_for
+from tanda_suggest import TANDA_SIZES, suggest
+
 st.set_page_config(page_title="음악 필터링", page_icon="🎛️", layout="wide")
 st.title("② 음악 필터링 🎛️")
 
@@ -31,10 +37,8 @@ st.sidebar.header("📂 CSV 업로드")
 
 csv_default = Path("music_library_full.csv")
 csv_file = st.sidebar.file_uploader("music_library_full.csv", type=["csv"])
-if not csv_file and csv_default.exists():
-    csv_file = csv_default.open("rb")
 
-if not csv_file:
+if not csv_file and not csv_default.exists():
     st.error("music_library_full.csv 파일이 필요합니다.")
     st.stop()
 
@@ -42,51 +46,113 @@ audio_root = Path(
     st.sidebar.text_input("🎧 음악 폴더 루트", "C:/DJMUSIC")
 ).expanduser().resolve()
 
-# ─────────── CSV 로드 & 기본 열 보강 ─────────────────────────────
-df = pd.read_csv(csv_file)
-for c, d in {"Genre": "", "BPM": np.nan, "RecordingYear": np.nan,
-             "AlbumFolder": "", "AlbumTag": ""}.items():
-    df[c] = df.get(c, d)
+# ─────────── CSV 로드 (세션·재실행 간 공유 캐시) ────────────────────
+# 키 = 파일 버전(mtime·크기 / 업로드 해시) + 인덱스 버전 → 내용이 같으면 다시 읽지 않음
+@st.cache_resource(max_entries=4, show_spinner="라이브러리 읽는 중…")
+def get_library(version:str, _src, audio_root:str, idx_ver:str)->LibraryFrame:
+    return load_library(_src, audio_root)
+
+if csv_file:
+    data=csv_file.getvalue(); lib=get_library(bytes_version(data),data,str(audio_root),index_version(audio_root))
+else:
+    lib=get_library(file_version(csv_default),csv_default,str(audio_root),index_version(audio_root))
+df=lib.df   # 공유 객체 → 수정하지 말 것 (필터는 새 DataFrame 을 만듦)
+
+# ─────────── 1. 필터 UI (+ 항목별 곡 수) ─────────────────────────
+y_min,y_max = lib.year_range
+b_min,b_max = lib.bpm_range
+album_col   = lib.album_col
+
+def picked(key):
+    v=st.session_state.get(key,"(all)")
+    return None if v=="(all)" else v
+
+def span(key,lo,hi):
+    """슬라이더 값 → 범위 조건 (전체 범위면 None = 값 없는 곡도 포함)."""
+    v=st.session_state.get(key)
+    if v is not None and not (lo<=v[0]<=v[1]<=hi):   # 다른 CSV 로 바뀜 → 초기화
+        del st.session_state[key]; v=None
+    return None if v is None or tuple(v)==(lo,hi) else (v[0],v[1],False)
+
+def conditions():
+    facets={"Orchestra":picked("f_orch"),"GenreKey":picked("f_genre"),album_col:picked("f_album")}
+    ranges={"RecordingYear":span("f_year",y_min,y_max),"BPM":span("f_bpm",b_min,b_max)}
+    return facets,ranges
 
-if df["RecordingYear"].isna().all() and "RecordingDate" in df.columns:
-    df["RecordingYear"] = pd.to_numeric(df["RecordingDate"].astype(str).str[:4],
-                                        errors="coerce")
+# 곡 수는 캡션으로 표시 (선택지 라벨에 넣으면 위젯 ID 가 바뀌어 선택이 풀림)
+counts=lib.index.facet_counts(*conditions())
+def count_caption(col,sel,unit):
+    c=counts[col]
+    st.caption(f"{sel} {c.get(sel,0):,}곡" if sel!="(all)" else f"해당 {unit} {len(c):,}개 · {sum(c.values()):,}곡")
 
-# ─────────── 1. 필터 UI ─────────────────────────────────────────
 with filter_box:
-    orch_sel  = st.selectbox("악단",  ["(all)"] + sorted(df["Orchestra"].dropna().unique()))
-    yrs       = df["RecordingYear"].dropna()
-    y_min,y_max = (1900,2025) if yrs.empty else (int(yrs.min()),int(yrs.max()))
-    y_range   = st.slider("녹음 연도", y_min, y_max, (y_min, y_max))
-    genre_sel = st.selectbox("장르",   ["(all)", "tango", "vals", "milonga"])
-    bpms      = df["BPM"].dropna()
-    b_min,b_max = (0,250) if bpms.empty else (int(bpms.min()),int(bpms.max()))
-    b_range   = st.slider("BPM 범위", b_min, b_max, (b_min,b_max))
-    album_col = "AlbumFolder" if df["AlbumFolder"].notna().any() else "AlbumTag"
-    album_sel = st.selectbox("앨범", ["(all)"] + sorted(df[album_col].dropna().unique()))
-
-# ─────────── 2. 필터링 ──────────────────────────────────────────
-f = df.copy()
-if orch_sel!="(all)": f=f[f["Orchestra"]==orch_sel]
-full_year = y_range==(y_min,y_max)
-f=f[f["RecordingYear"].between(*y_range)|(full_year & f["RecordingYear"].isna())]
-if genre_sel!="(all)": f=f[f["Genre"].str.lower()==genre_sel]
-full_bpm=b_range==(b_min,b_max)
-f=f[f["BPM"].between(*b_range)|(full_bpm & f["BPM"].isna())]
-if album_sel!="(all)": f=f[f[album_col]==album_sel]
-
-# ─────────── 3. 결과 테이블 ✔ 선택 ──────────────────────────────
-st.subheader(f"🎵 필터 결과 — {len(f)}곡")
-def mk_path(r:pd.Series)->str:
-    parts=[audio_root,r["Orchestra"],r["AlbumFolder"],r["FileName"]]
-    return str(Path(*[p for p in parts if pd.notna(p) and str(p).strip()]))
-
-f=f.copy(); f["Path"]=f.apply(mk_path,axis=1)
-table=f[["Title","Orchestra","RecordingYear","Genre","BPM"]].copy(); table.insert(0,"✔",False)
-edited=st.data_editor(table,hide_index=True,use_container_width=True,
-                      column_config={"✔":st.column_config.CheckboxColumn(required=False)},
-                      key="tracks_select")
-sel_df=f[edited["✔"]].copy()
+    orch_sel  = st.selectbox("악단",  ["(all)"] + lib.orchestras, key="f_orch")
+    count_caption("Orchestra",orch_sel,"악단")
+    y_range   = st.slider("녹음 연도", y_min, y_max, (y_min, y_max), key="f_year")
+    genre_sel = st.selectbox("장르",   ["(all)"] + GENRES, key="f_genre")
+    st.caption(" · ".join(f"{g} {counts['GenreKey'].get(g,0):,}" for g in GENRES))
+    b_range   = st.slider("BPM 범위", b_min, b_max, (b_min,b_max), key="f_bpm")
+    album_sel = st.selectbox("앨범", ["(all)"] + lib.albums, key="f_album")
+    count_caption(album_col,album_sel,"앨범")
+
+# ─────────── 2. 필터링 (인덱스 조회 → 해당 행만) ─────────────────
+rows=lib.index.query(*conditions())
+f=df if len(rows)==len(df) else df.iloc[rows]
+
+# ─────────── 3. 결과 테이블 (정렬·페이지는 서버에서, 선택은 TrackID 로) ──
+SORT_COLS={"원래 순서":None,"제목":"Title","악단":"Orchestra","녹음 연도":"RecordingYear",
+           "장르":"Genre","BPM":"BPM"}
+PAGE_SIZES=[50,100,200,500]
+st.session_state.setdefault("selected_ids",{})   # TrackID → None (선택 순서 유지하는 집합)
+st.session_state.setdefault("select_gen",0)      # 일괄 선택/해제 때 표 위젯 새로 만들기
+
+st.subheader(f"🎵 필터 결과 — {len(f)}곡 · 선택 {len(st.session_state.selected_ids)}곡")
+c_sort,c_dir,c_size,c_page=st.columns([0.3,0.2,0.2,0.3])
+sort_by=c_sort.selectbox("정렬",list(SORT_COLS),key="sort_by")
+desc=c_dir.radio("방향",["오름차순","내림차순"],horizontal=True,key="sort_dir")=="내림차순"
+size=c_size.selectbox("페이지당",PAGE_SIZES,key="page_size")
+pages=max(1,-(-len(rows)//size))
+if st.session_state.get("page_no",1)>pages: st.session_state.page_no=pages
+page_no=c_page.number_input(f"페이지 (/{pages})",1,pages,key="page_no")
+
+if SORT_COLS[sort_by]:
+    rows=lib.index.sort(rows,SORT_COLS[sort_by],desc)
+elif desc:
+    rows=rows[::-1]
+page_rows=rows[(page_no-1)*size:page_no*size]
+page_ids=df["TrackID"].to_numpy()[page_rows].tolist()
+
+def apply_checks(key,ids):
+    """표에서 바뀐 체크 → 선택 집합에 반영 (다른 페이지 선택은 그대로)."""
+    sel=st.session_state.selected_ids
+    for pos,chg in st.session_state[key]["edited_rows"].items():
+        if "✔" in chg:
+            if chg["✔"]: sel.setdefault(ids[int(pos)])
+            else: sel.pop(ids[int(pos)],None)
+
+def select_page(on):
+    sel=st.session_state.selected_ids
+    for i in page_ids:
+        if on: sel.setdefault(i)
+        else: sel.pop(i,None)
+    st.session_state.select_gen+=1
+
+def clear_selection():
+    st.session_state.selected_ids.clear(); st.session_state.select_gen+=1
+
+# 이 페이지의 행만 프런트엔드로 보냄. 위젯 키 = 페이지 내용 → 다른 페이지에 체크가 옮겨가지 않음
+table=df.iloc[page_rows][["Title","Orchestra","RecordingYear","Genre","BPM"]].reset_index(drop=True)
+table.insert(0,"✔",[i in st.session_state.selected_ids for i in page_ids])
+editor_key="tracks_"+bytes_version("|".join(page_ids).encode()+str(st.session_state.select_gen).encode())
+st.data_editor(table,hide_index=True,use_container_width=True,
+               column_config={"✔":st.column_config.CheckboxColumn(required=False)},
+               disabled=["Title","Orchestra","RecordingYear","Genre","BPM"],
+               key=editor_key,on_change=apply_checks,args=(editor_key,page_ids))
+b1,b2,b3=st.columns(3)
+b1.button("☑ 이 페이지 모두 선택",on_click=select_page,args=(True,),disabled=not page_ids)
+b2.button("☐ 이 페이지 선택 해제",on_click=select_page,args=(False,),disabled=not page_ids)
+b3.button("🗑 선택 모두 해제",on_click=clear_selection,disabled=not st.session_state.selected_ids)
+sel_df=df.iloc[lib.positions(st.session_state.selected_ids)]
 
 # ─────────── 4. 선택 곡 순서 조정 ───────────────────────────────
 ordered_paths=[]
@@ -99,11 +165,53 @@ if not sel_df.empty:
         hide_index=True,key="order_editor")
     ordered_paths=seq_edit.sort_values("순서",kind="stable")["Path"].tolist()
 
+# ─────────── 4-1. 비슷한 곡 찾기 (특징 벡터 BallTree) ─────────────────
+@st.cache_resource(max_entries=2)
+def get_similar(version:str)->SimilarIndex:
+    return SimilarIndex.load(FEATURES_NPZ)
+
+def add_to_selection(ids):
+    for i in ids: st.session_state.selected_ids.setdefault(i)
+    st.session_state.select_gen+=1
+
+if not sel_df.empty:
+    with st.expander("🔎 비슷한 곡 찾기"):
+        if not FEATURES_NPZ.exists():
+            st.caption(f"{FEATURES_NPZ} 가 없습니다 → `python features.py music_library_full.csv <음악 루트>` 로 만드세요.")
+        else:
+            sim=get_similar(file_version(FEATURES_NPZ))
+            s1,s2=st.columns([0.75,0.25])
+            def title_of(i):
+                pos=lib.positions([i])   # 라이브러리에 없는 ID → ID 그대로 표시
+                return str(df["Title"].iat[pos[0]]) if len(pos) else str(i)
+            ref=s1.selectbox("기준 곡",sel_df["TrackID"].drop_duplicates().tolist(),format_func=title_of)
+            k=s2.number_input("곡 수",1,50,10)
+            hits=sim.similar(ref,k)
+            near=df.iloc[lib.positions([i for i,_ in hits])][["TrackID","Title","Orchestra","RecordingYear","Genre","BPM"]]
+            if not hits:
+                st.caption("이 곡의 특징 벡터가 없습니다 (BPM 분석 후 features.py 다시 실행).")
+            elif near.empty:   # features.npz 가 지금 라이브러리와 다른 CSV 로 만들어진 경우
+                st.caption("비슷한 곡이 지금 라이브러리에 없습니다 (features.py 다시 실행).")
+            else:
+                near["거리"]=near["TrackID"].map(dict(hits)).round(2)
+                st.dataframe(near.drop(columns="TrackID"),hide_index=True,use_container_width=True)
+                st.button("➕ 모두 선택에 추가",on_click=add_to_selection,args=(near["TrackID"].tolist(),))
+
 # ─────────── 5. 미리듣기 ────────────────────────────────────────
+# 원본 대신 구간 클립(OGG, preview_cache/)을 넘김 → 한 번 만들면 재사용, 메모리에는 작은 클립만 올라감
 if ordered_paths:
-    pick=st.selectbox("🎧 미리 듣기",["(none)"]+ordered_paths)
+    c_pick,c_off,c_len=st.columns([0.6,0.2,0.2])
+    pick=c_pick.selectbox("🎧 미리 듣기",["(none)"]+ordered_paths)
+    p_off=c_off.number_input("시작(초)",0,600,30,step=5)
+    p_len=c_len.number_input("길이(초)",5,120,30,step=5)
     if pick!="(none)" and Path(pick).is_file():
-        st.audio(open(pick,"rb").read(),format="audio/mp3")
+        try:
+            with st.spinner("미리듣기 준비 중…"):
+                clip=make_clip(pick,p_off,p_len)
+            st.audio(str(clip),format=PREVIEW_MIME)
+        except Exception as e:
+            st.warning(f"클립을 만들지 못해 원본을 재생합니다: {e}")
+            st.audio(pick,format=mime_for(pick))
 
 # ─────────── 6. 탄다 빌더 ───────────────────────────────────────
 st.markdown("---"); st.header("🎛️ 탄다 빌더")
@@ -139,6 +247,41 @@ def confirm_tanda():
 st.button("✅ 현재 탄다 확정",disabled=not st.session_state.current_tanda,
           on_click=confirm_tanda)
 
+# ─────────── 6-1. 탄다 자동 제안 (현재 필터 결과에서) ────────────────
+def used_paths()->set:
+    """오늘 밤 이미 쓴 곡 = 확정한 탄다 + 진행 중 탄다."""
+    used=set(st.session_state.current_tanda)
+    for tg in st.session_state.tanda_groups:
+        used.update(tg.get("tracks",[]) if isinstance(tg,dict) else tg)
+    return used
+
+def add_suggestion(i):
+    tg=st.session_state.tanda_suggestions.pop(i)
+    st.session_state.tanda_groups.append({k:tg[k] for k in ("name","type","tracks","ids")})
+    taken=set(tg["tracks"])   # 같은 곡이 든 다른 제안은 빼기
+    st.session_state.tanda_suggestions=[t for t in st.session_state.tanda_suggestions
+                                        if not taken & set(t["tracks"])]
+
+with st.expander("🤖 탄다 자동 제안 (현재 필터 결과에서)"):
+    s1,s2,s3,s4,s5=st.columns(5)
+    sg_genre=s1.selectbox("장르",GENRES,key="sg_genre")
+    sg_size =s2.selectbox("곡 수",[4,3],index=0 if TANDA_SIZES[sg_genre]==4 else 1,key=f"sg_size_{sg_genre}")
+    sg_years=s3.number_input("연도 차 ≤",0,30,5,key="sg_years")
+    sg_bpm  =s4.number_input("BPM 차 ≤",0.0,30.0,4.0,step=0.5,key="sg_bpm")
+    sg_n    =s5.number_input("제안 수",1,500,20,key="sg_n")
+    if st.button("🔍 제안 받기"):
+        st.session_state.tanda_suggestions=suggest(df,sg_genre,pool=rows,exclude=used_paths(),
+                                                   size=sg_size,year_window=sg_years,
+                                                   bpm_tol=sg_bpm,n=sg_n)
+    sugg=st.session_state.get("tanda_suggestions",[])
+    if not sugg:
+        st.caption("조건에 맞는 제안이 없습니다." if "tanda_suggestions" in st.session_state else "")
+    for i,tg in enumerate(sugg):
+        c_txt,c_btn=st.columns([0.85,0.15])
+        titles=df["Title"].to_numpy()[lib.positions(tg["ids"])]
+        c_txt.write(f"**{tg['name']}** · 점수 {tg['score']:.2f}  \n"+" / ".join(map(str,titles)))
+        c_btn.button("➕ 추가",key=f"sg_add_{i}_{tg['ids'][0]}",on_click=add_suggestion,args=(i,))
+
 # ─────────── 7. 탄다 목록 표시 ─────────────────────────────────
 def render_tanda(idx,tg):
     if isinstance(tg,dict):
@@ -198,5 +341,5 @@ st.button("➡ 3단계로 보내기",disabled=not export_groups,on_click=to_step
 # ─────────── 9. CSV 다시 저장 ─────────────────────────────────
 st.sidebar.markdown("---")
 if st.sidebar.button("💾 music_library_full.csv 다시 저장"):
-    df.to_csv("music_library_full.csv",index=False)
+    lib.to_csv("music_library_full.csv")
     st.sidebar.success("music_library_full.csv 로 저장 완료!")
@@ -6,11 +6,18 @@
 # ────────────────────────────────────────────────────────────────
 from __future__ import annotations
 import json, io, zipfile, os
+import datetime as dt
 from pathlib import Path
+import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
 from typing import List
 
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from tanda_registry import EMPTY, TandaRegistry, duration_lookup, schedule_timeline
+from library_frame import file_version
+
 # ───── OpenAI 설정 (AI 의견용) ─────────────────────────────────
 load_dotenv()
 API_KEY = os.getenv("OPENAI_API_KEY")
@@ -57,14 +64,39 @@ st.sidebar.header("📂 탄다 파일 업로드 (선택)")
 up = st.sidebar.file_uploader("tandas.zip / .json / .txt / .m3u",
                               type=["zip", "json", "txt", "m3u"])
 if up:
-    tandas = parse_uploaded(up)
-    st.session_state.tandas_for_step3 = tandas
+    if st.session_state.get("tanda_upload_id") != up.file_id:   # 새 파일일 때만 파싱
+        st.session_state.tandas_for_step3 = parse_uploaded(up)
+        st.session_state.tanda_upload_id  = up.file_id
+    tandas = st.session_state.tandas_for_step3
     st.sidebar.success(f"불러온 탄다: {len(tandas)}개")
 
 if not tandas:
     st.warning("탄다 데이터가 없습니다. 2단계에서 보내거나 파일을 업로드하세요.")
     st.stop()
 
+# 탄다 목록이 바뀔 때만 레지스트리를 다시 만듦 (칸에는 ID 만 저장)
+if st.session_state.get("tanda_registry_src") is not tandas:
+    st.session_state.tanda_registry     = TandaRegistry(tandas)
+    st.session_state.tanda_registry_src = tandas
+reg: TandaRegistry = st.session_state.tanda_registry
+
+# 곡 길이 = music_library_full.csv 의 Duration 열 (스캔 때 기록) → 음악 파일은 열지 않음
+LIBRARY_CSV = Path("music_library_full.csv")
+
+@st.cache_resource(max_entries=2)
+def get_durations(version: str) -> pd.Series:
+    try:
+        head = pd.read_csv(LIBRARY_CSV, nrows=0).columns
+        cols = [c for c in ("Orchestra", "AlbumFolder", "FileName", "Duration") if c in head]
+        return duration_lookup(pd.read_csv(LIBRARY_CSV, usecols=cols, dtype={"FileName": str}))
+    except (OSError, ValueError):
+        return pd.Series(dtype=float)
+
+dur_ver = file_version(LIBRARY_CSV) if LIBRARY_CSV.exists() else ""
+if st.session_state.get("tanda_registry_dur") != (id(reg), dur_ver):
+    reg.set_durations(get_durations(dur_ver))
+    st.session_state.tanda_registry_dur = (id(reg), dur_ver)
+
 # ───── 2. 스케줄 상태 초기화 ───────────────────────────────────
 if "max_col" not in st.session_state:
     st.session_state.max_col = DEFAULT_COLS
@@ -105,12 +137,10 @@ for ridx, row in enumerate(st.session_state.schedule):
     cols = st.columns(st.session_state.max_col + 2)  # 시간 + N + 삭제
     row["time"] = cols[0].text_input("시간", row["time"], key=f"time_{ridx}")
     for cidx in range(st.session_state.max_col):
-        opts = ["(empty)"] + [f"{i+1}. {t['name']}" for i, t in enumerate(tandas)]
-        cur = row["slots"][cidx]
-        idx = tandas.index(cur) + 1 if cur in tandas else 0
-        sel = cols[cidx + 1].selectbox(f"칸{cidx+1}", opts, index=idx,
-                                       key=f"slot_{ridx}_{cidx}")
-        row["slots"][cidx] = None if sel == "(empty)" else tandas[int(sel.split('.')[0]) - 1]
+        cur = reg.normalise(row["slots"][cidx])
+        sel = cols[cidx + 1].selectbox(f"칸{cidx+1}", reg.options, index=reg.index(cur),
+                                       format_func=reg.label, key=f"slot_{ridx}_{cidx}")
+        row["slots"][cidx] = None if sel == EMPTY else sel
     cols[-1].button("❌", key=f"del_{ridx}", on_click=del_row, args=(ridx,))
 
 st.button("➕ 행 추가", on_click=add_row)
@@ -118,11 +148,48 @@ st.button("➕ 행 추가", on_click=add_row)
 # ───── 4. 미리보기 / 트랙 리스트 ──────────────────────────────
 st.markdown("---")
 st.subheader("📝 스케줄 미리보기")
-def lbl(t): return "" if t is None else f"{t['name']} ({len(t['tracks'])}곡)"
+def lbl(tid):
+    t = reg.get(tid)
+    return "" if t is None else f"{t['name']} ({len(t['tracks'])}곡)"
 for r in st.session_state.schedule:
     st.write(" ‖ ".join([r["time"]] + [lbl(t) or "…" for t in r["slots"]]))
 
-track_list = [trk for r in st.session_state.schedule for t in r["slots"] if t for trk in t["tracks"]]
+# ───── 4-1. 타임라인 (탄다별 시작·끝, 한 번에 계산) ───────────────
+def hms(sec: float) -> str:
+    m, s = divmod(int(round(sec)), 60)
+    h, m = divmod(m, 60)
+    return f"{h % 24:02d}:{m:02d}:{s:02d}"
+
+def parse_time(txt: str) -> dt.time | None:
+    try:
+        return dt.datetime.strptime(txt.strip(), "%H:%M").time()
+    except ValueError:
+        return None
+
+slot_ids = [tid for r in st.session_state.schedule for tid in r["slots"] if reg.get(tid)]
+if slot_ids:
+    st.markdown("#### ⏱️ 타임라인")
+    if get_durations(dur_ver).empty:
+        st.caption(f"ℹ️ {LIBRARY_CSV} 에 곡 길이(Duration)가 없습니다 — "
+                   "build_tag_csv.py 로 다시 스캔하면 채워집니다.")
+    t1, t2 = st.columns(2)
+    first  = parse_time(st.session_state.schedule[0]["time"]) or dt.time(21, 0)
+    start  = t1.time_input("시작 시각", first, step=60)
+    gap    = t2.number_input("탄다 사이 간격 (꼬르띠나, 초)", 0, 300, 0, step=5)
+    tl = schedule_timeline(reg, slot_ids, start.hour * 3600 + start.minute * 60, gap)
+    total = tl["end"].iloc[-1] - tl["start"].iloc[0]
+    missing = int(tl["missing"].sum())
+    st.caption(f"탄다 {len(tl)}개 · {int(tl['tracks'].sum())}곡 · 총 {hms(total)} "
+               f"({hms(tl['start'].iloc[0])} → {hms(tl['end'].iloc[-1])})"
+               + (f" · 길이 모르는 곡 {missing}개 (0초로 계산)" if missing else ""))
+    st.dataframe(pd.DataFrame({
+        "탄다": tl["name"], "곡": tl["tracks"], "길이": tl["length"].map(hms),
+        "시작": tl["start"].map(hms), "끝": tl["end"].map(hms),
+        "누락": tl["missing"],
+    }), hide_index=True, use_container_width=True)
+
+track_list = [trk for r in st.session_state.schedule for tid in r["slots"] if reg.get(tid)
+              for trk in reg.get(tid)["tracks"]]
 st.markdown(f"#### 🎧 재생 순서 — {len(track_list)}곡")
 for p in track_list: st.write(p)
 
@@ -131,7 +198,7 @@ def m3u(lst): return "#EXTM3U\n" + "\n".join(lst)
 st.download_button("💾 M3U 저장", m3u(track_list), "playlist.m3u", mime="audio/x-mpegurl")
 st.download_button("💾 TXT 저장", "\n".join(track_list), "playlist.txt", mime="text/plain")
 
-sched_json=[{"time":r["time"],"slots":[t["name"] if t else None for t in r["slots"]]}
+sched_json=[{"time":r["time"],"slots":[reg.get(t)["name"] if reg.get(t) else None for t in r["slots"]]}
             for r in st.session_state.schedule]
 buf=io.StringIO(); json.dump(sched_json, buf, ensure_ascii=False, indent=2)
 st.download_button("💾 스케줄 JSON 저장", buf.getvalue(),
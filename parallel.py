@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# parallel.py – 오디오 분석용 프로세스 풀 (bpm.py · build_tag_csv.py 공용)
+#   · 작업을 chunk 단위로 나눠 워커에 분배 → 결과는 입력 순서 그대로 반환
+#   · 트랙 하나가 실패해도 전체 실행은 계속 (트랙별 에러 문자열 기록)
+#   · 진행률(progress.Progress)은 모든 워커의 완료 개수 기준
+
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from progress import Progress
+
+Result = Tuple[Any, Optional[str]]   # (결과, 에러 메시지 | None)
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _run_chunk(func: Callable[[Any], Any], chunk: Sequence[Any]) -> List[Result]:
+    out: List[Result] = []
+    for item in chunk:
+        try:
+            out.append((func(item), None))
+        except Exception as e:           # 트랙 단위 실패 → 기록만
+            out.append((None, f"{type(e).__name__}: {e}"))
+    return out
+
+
+def run_chunked(func: Callable[[Any], Any],
+                items: Sequence[Any],
+                workers: int = 1,
+                chunk_size: int | None = None,
+                desc: str = "",
+                unit: str = "trk",
+                stage: str | None = None,
+                on_result: Callable[[int, Result], None] | None = None) -> List[Result]:
+    """func(item) 를 items 전체에 적용. workers<=1 이면 현재 프로세스에서 순차 실행.
+
+    func 는 모듈 최상위 함수여야 함 (프로세스 간 pickle).
+    on_result(i, result) 는 i 번째 항목이 끝날 때마다 메인 프로세스에서 호출 (체크포인트용).
+    stage 는 진행 이벤트의 단계 이름 (없으면 desc). 결과 None·에러는 실패로 집계.
+    """
+    items   = list(items)
+    results: List[Result] = [(None, None)] * len(items)
+
+    failed = lambda part: sum(r is None or e is not None for r, e in part)
+
+    with Progress(stage or desc, len(items), desc=desc, unit=unit) as bar:
+        if workers <= 1 or len(items) <= 1:
+            for i, item in enumerate(items):
+                results[i] = _run_chunk(func, [item])[0]
+                if on_result:
+                    on_result(i, results[i])
+                bar.update(1, failed=failed(results[i:i + 1]))
+            return results
+
+        if chunk_size is None:   # 워커당 4덩어리 정도, 너무 크면 진행률이 뭉침
+            chunk_size = max(1, min(16, len(items) // (workers * 4)))
+
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futs = {
+                ex.submit(_run_chunk, func, items[s:s + chunk_size]): s
+                for s in range(0, len(items), chunk_size)
+            }
+            for fut in as_completed(futs):
+                start = futs[fut]
+                n = min(chunk_size, len(items) - start)
+                try:
+                    part = fut.result()
+                except Exception as e:   # 워커 프로세스 자체가 죽은 경우
+                    part = [(None, f"worker-error: {type(e).__name__}: {e}")] * n
+                results[start:start + n] = part
+                if on_result:
+                    for i, r in enumerate(part, start):
+                        on_result(i, r)
+                bar.update(n, failed=failed(part))
+
+    return results
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# pipeline.py – 폴더 스캔 → tango.info 스크랩 → BPM 을 한 프로세스에서 겹쳐 실행
+#   · 스캔 스레드가 트랙을 하나씩 흘려보내면 스크랩(비동기 HTTP)·BPM(프로세스 풀)
+#     단계가 각자 크기 제한 큐에서 받아 동시에 처리 → 전체 시간 ≈ 가장 느린 단계
+#   · 결과는 메인 스레드가 모아 저장소에 묶음 upsert (끊겨도 저장된 만큼은 남음)
+#   · 스크랩 장르와 BPM 이 둘 다 나오면 장르 범위로 BPM 보정 (bpm.py 와 같은 규칙)
+#   · 파일 경로를 스캔에서 바로 넘기므로 bpm.py 의 제목 → 파일 매칭은 필요 없음
+#   · 스크랩은 새로·바뀐 파일과 스크랩 결과가 없거나 실패(FAILED_NOTES)한 트랙만,
+#     BPM 은 새로·바뀐 파일과 BPM 이 비어 있는 트랙만 → 다시 실행해도 라이브러리 전체를 돌지 않음
+#
+#   python pipeline.py C:/DJMUSIC --store music_library.sqlite --workers 0
+
+from __future__ import annotations
+import argparse, asyncio, multiprocessing, os, queue, sys, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+import scrap
+from analysis_cache import AnalysisCache, CACHE_DB
+from bpm import FAILLOG, adjust_bpm, detect_bpm, normalise_genre
+from build_tag_csv import COLUMNS, read_row, save_manifest, scan_plan
+from http_cache import DEFAULT_TTL, HTTP_CACHE_DB, HttpCache
+from library_store import KEY, STORE_DB, LibraryStore, track_key
+from parallel import default_workers
+from progress import Progress
+
+QUEUE_SIZE  = 256       # 단계 사이 큐 크기 (스캔이 너무 앞서 나가지 않게)
+FLUSH_ROWS  = 200       # 이만큼 모이면 저장소에 upsert
+FLUSH_SEC   = 5.0       # … 또는 이 시간마다
+TAG_COLS    = [c for c in COLUMNS if c != "BPM"]   # BPM 은 BPM 단계가 채움
+STOP        = None      # 큐 끝 표시
+
+
+# ─── 단계 1: 스캔 ────────────────────────────────────────────────
+def needs_work(plan: dict, known: pd.DataFrame) -> tuple[set, set]:
+    """(스크랩할 키, BPM 분석할 키) – 새로·바뀐 파일 + 저장소에 결과가 없거나 실패한 트랙."""
+    scanned = {track_key(*parts[:3]) for _, parts in plan["to_scan"]}
+    kept    = [k for k in plan["rows"] if k not in scanned and k in known.index]
+    note    = known["ScrapNote"].reindex(kept).astype(str)
+    retry   = (note == "") | note.isin(scrap.FAILED_NOTES) | note.str.startswith("error")
+    no_bpm  = known["BPM"].reindex(kept).astype(str) == ""
+    return (scanned | set(note.index[retry.to_numpy()]),
+            scanned | set(no_bpm.index[no_bpm.to_numpy()]))
+
+
+def scan_stage(plan: dict, known: pd.DataFrame, scrape_keys: set, bpm_keys: set,
+               scrape_q: queue.Queue, bpm_q: queue.Queue, out_q: queue.Queue) -> None:
+    """바뀐 파일은 태그를 읽고, 나머지는 저장소 값을 써서 할 일이 있는 트랙만 두 큐로 흘려보냄."""
+    todo = {track_key(*parts[:3]): fp for fp, parts in plan["to_scan"]}
+    try:
+        for key in plan["rows"]:
+            fp = todo.get(key)
+            if fp is not None:
+                try:
+                    row = read_row((fp, key.split("/"), plan["root_name"]))
+                except Exception as e:
+                    out_q.put(("error", key, f"{type(e).__name__}: {e}"))
+                    continue
+                if row is None:           # 태그 없는 파일
+                    out_q.put(("skip", key, None))
+                    continue
+                out_q.put(("tags", key, row))
+            elif key in known.index:
+                row = known.loc[key]
+            else:
+                continue
+            fp = fp or plan["paths"].get(key) or os.path.join(plan["root"], *key.split("/"))
+            out_q.put(("track", key, row["Title"]))
+            if key in scrape_keys:
+                scrape_q.put((key, row["Title"], row["Orchestra"], row["TrackArtist"] or ""))
+            if key in bpm_keys:
+                bpm_q.put((key, Path(fp)))
+    finally:
+        scrape_q.put(STOP)
+        bpm_q.put(STOP)
+        out_q.put(("done", "scan", None))
+
+
+# ─── 단계 2: 스크랩 (이벤트 루프 하나에서 비동기 HTTP) ────────────
+async def _scrape(q: queue.Queue, out_q: queue.Queue,
+                  concurrency: int, rate: float, retries: int) -> None:
+    loop    = asyncio.get_running_loop()
+    sem     = asyncio.Semaphore(concurrency)
+    limiter = scrap.HostRateLimiter(rate)
+    searches: dict = {}
+    pages:    dict = {}
+    tasks = set()
+
+    async with scrap.async_client(concurrency) as client:
+        async def one(key, title, orch, voc):
+            try:
+                vals = await scrap.enrich_track_async(client, limiter, title, orch, voc,
+                                                      retries, searches, pages)
+            except Exception as e:
+                vals = {"ScrapNote": f"error: {type(e).__name__}"}
+            finally:
+                sem.release()
+            out_q.put(("scrap", key, vals))
+
+        while True:
+            item = await loop.run_in_executor(None, q.get)
+            if item is STOP:
+                break
+            await sem.acquire()
+            t = asyncio.create_task(one(*item))
+            tasks.add(t)
+            t.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+
+def scrape_stage(q: queue.Queue, out_q: queue.Queue,
+                 concurrency: int, rate: float, retries: int) -> None:
+    try:
+        asyncio.run(_scrape(q, out_q, concurrency, rate, retries))
+    finally:
+        out_q.put(("done", "scrap", None))
+
+
+# ─── 단계 3: BPM (프로세스 풀, 워커 수 ×2 만큼만 미리 제출) ─────────
+def bpm_stage(q: queue.Queue, out_q: queue.Queue,
+              detect: Callable[[Path], float | None], workers: int) -> None:
+    def report(key, path, fut):
+        try:
+            out_q.put(("bpm", key, (path, fut.result(), None)))
+        except Exception as e:
+            out_q.put(("bpm", key, (path, None, f"{type(e).__name__}: {e}")))
+        finally:
+            slots.release()
+
+    slots = threading.Semaphore(max(1, workers) * 2)
+    try:
+        if workers <= 1:
+            while (item := q.get()) is not STOP:
+                key, path = item
+                try:
+                    out_q.put(("bpm", key, (path, detect(path), None)))
+                except Exception as e:
+                    out_q.put(("bpm", key, (path, None, f"{type(e).__name__}: {e}")))
+            return
+        # 다른 스레드가 도는 중이므로 fork 대신 spawn (윈도우와 같은 방식)
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as ex:
+            while (item := q.get()) is not STOP:
+                key, path = item
+                slots.acquire()
+                fut = ex.submit(detect, path)
+                fut.add_done_callback(partial(report, key, path))
+    finally:
+        out_q.put(("done", "bpm", None))
+
+
+# ─── 모으기 & 저장 ───────────────────────────────────────────────
+def run_pipeline(root: str, store: LibraryStore,
+                 full: bool = False, use_hash: bool = False,
+                 workers: int = 1, detect: Callable[[Path], float | None] = detect_bpm,
+                 concurrency: int = 8, rate: float = 4.0, retries: int = 3,
+                 queue_size: int = QUEUE_SIZE) -> None:
+    plan  = scan_plan(root, full, use_hash, store)
+    known = store.read(["Title", "Orchestra", "TrackArtist", "Genre", "ScrapNote", "BPM"]) \
+                 .set_index(KEY).fillna("")
+    scrape_keys, bpm_keys = needs_work(plan, known)
+    audio_root = Path(plan["root"])
+
+    scrape_q = queue.Queue(maxsize=queue_size)
+    bpm_q    = queue.Queue(maxsize=queue_size)
+    out_q    = queue.Queue()
+    stages = [
+        threading.Thread(target=scan_stage, daemon=True,
+                         args=(plan, known, scrape_keys, bpm_keys, scrape_q, bpm_q, out_q)),
+        threading.Thread(target=scrape_stage, daemon=True,
+                         args=(scrape_q, out_q, concurrency, rate, retries)),
+        threading.Thread(target=bpm_stage, daemon=True,
+                         args=(bpm_q, out_q, detect, workers)),
+    ]
+    for t in stages:
+        t.start()
+
+    buf: Dict[str, List[dict]] = {"tags": [], "scrap": [], "bpm": []}
+    cols = {"tags": TAG_COLS, "scrap": scrap.SCRAP_COLS, "bpm": ["BPM", "BPMNote"]}
+    titles: Dict[str, str] = {}
+    genre:  Dict[str, str] = {}                 # 스크랩이 끝난 트랙의 장르
+    waiting: Dict[str, tuple] = {}              # 장르를 기다리는 BPM 결과
+    totals = {"scan": len(plan["rows"]), "scrap": len(scrape_keys), "bpm": len(bpm_keys)}
+    bars   = {name: Progress(name, total, unit="trk", position=i)
+              for i, (name, total) in enumerate(totals.items())}
+    failed: List[str] = []
+    scanned: set = set()
+    done: set = set()
+
+    def flush(force: bool = False) -> None:
+        for kind, rows in buf.items():
+            if rows and (force or len(rows) >= FLUSH_ROWS):
+                # 행마다 실제로 있는 열만 갱신 (스크랩 실패 행은 ScrapNote 만 → 기존 장르 등 유지)
+                groups: Dict[tuple, List[dict]] = {}
+                for r in rows:
+                    groups.setdefault(tuple(c for c in cols[kind] if c in r), []).append(r)
+                for present, part in groups.items():
+                    store.upsert(pd.DataFrame(part), list(present))
+                rows.clear()
+
+    def finish_bpm(key: str) -> None:
+        path, raw, err = waiting.pop(key)
+        if raw is None:
+            note, val = "no-bpm", None
+            failed.append(f"{titles.get(key, key)}\tno-bpm" + (f"\t{err}" if err else ""))
+        else:
+            val, changed = adjust_bpm(raw, normalise_genre(genre.get(key, "")))
+            note = f"{path.relative_to(audio_root).as_posix()} {'(adj)' if changed else '(raw)'}"
+        buf["bpm"].append({KEY: key, "BPM": val, "BPMNote": note})
+
+    t0 = last_flush = time.monotonic()
+    while len(done) < len(stages):
+        try:
+            kind, key, val = out_q.get(timeout=0.5)
+        except queue.Empty:
+            kind = None
+        if kind == "done":
+            done.add(key)
+        elif kind == "tags":
+            scanned.add(key)
+            buf["tags"].append({KEY: key, **val})
+        elif kind == "track":
+            titles[key] = val
+            bars["scan"].update(1)
+        elif kind == "skip":
+            bars["scan"].update(1, failed=1)
+        elif kind == "scrap":
+            bars["scrap"].update(1, failed=val.get("ScrapNote") != "✓")
+            buf["scrap"].append({KEY: key, **val})
+            genre[key] = val.get("Genre") or (known.at[key, "Genre"] if key in known.index else "")
+            if key in waiting:
+                finish_bpm(key)
+        elif kind == "bpm":
+            bars["bpm"].update(1, failed=val[1] is None)
+            waiting[key] = val
+            if key not in scrape_keys:      # 스크랩 안 하는 트랙 → 저장소 장르로 바로 보정
+                genre.setdefault(key, known.at[key, "Genre"] if key in known.index else "")
+            if key in genre:
+                finish_bpm(key)
+        elif kind == "error":
+            bars["scan"].update(1, failed=1)
+            failed.append(f"{key}\tscan-error\t{val}")
+
+        now = time.monotonic()
+        if now - last_flush >= FLUSH_SEC:
+            flush(force=True)
+            last_flush = now
+        else:
+            flush()
+
+    for key in list(waiting):       # 스크랩 결과가 없는 트랙 → 저장소 장르로 보정
+        genre.setdefault(key, known.at[key, "Genre"] if key in known.index else "")
+        finish_bpm(key)
+    flush(force=True)
+    for bar in bars.values():
+        bar.close()
+
+    store.retain(k for k, r in plan["rows"].items() if r is not None or k in scanned)
+    save_manifest(plan["root"], plan["manifest"])
+    FAILLOG.write_text("".join(f"{ln}\n" for ln in failed), encoding="utf-8")
+    print(f"✅ 파이프라인 완료 → {store.path}  "
+          f"(트랙 {len(titles)} · 새로 스캔 {len(scanned)} · 스크랩 {bars['scrap'].done} · "
+          f"BPM {bars['bpm'].done} · 실패 {len(failed)})  {time.monotonic() - t0:.1f}초")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="스캔 → 스크랩 → BPM 동시 실행 파이프라인")
+    ap.add_argument("root", help="음악 루트 폴더")
+    ap.add_argument("--store", default=str(STORE_DB), metavar="FILE",
+                    help=f"라이브러리 저장소 (기본 {STORE_DB})")
+    ap.add_argument("--full", action="store_true",
+                    help="매니페스트를 무시하고 전체 파일 태그를 다시 읽음")
+    ap.add_argument("--hash", action="store_true",
+                    help="mtime 만 바뀐 파일은 빠른 내용 해시로 변경 여부 확인")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help=f"BPM 분석 프로세스 수 (0 = 자동, {default_workers()}개)")
+    ap.add_argument("--cache", default=str(CACHE_DB), metavar="FILE",
+                    help="분석 결과 캐시 (bpm.py · build_tag_csv.py 와 공유)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="분석 캐시를 쓰지 않고 항상 새로 분석")
+    ap.add_argument("--concurrency", type=int, default=8, metavar="N",
+                    help="동시 스크랩 트랙 수 (기본 8)")
+    ap.add_argument("--rate", type=float, default=4.0, metavar="RPS",
+                    help="tango.info 초당 요청 수 상한 (기본 4)")
+    ap.add_argument("--retries", type=int, default=3, metavar="N",
+                    help="연결 오류·429·5xx 재시도 횟수 (기본 3)")
+    ap.add_argument("--http-cache", default=str(HTTP_CACHE_DB), metavar="FILE",
+                    help=f"HTTP 응답 캐시 파일 (기본 {HTTP_CACHE_DB})")
+    ap.add_argument("--no-http-cache", action="store_true",
+                    help="응답 캐시 사용 안 함")
+    ap.add_argument("--base-url", default=scrap.BASE_URL, metavar="URL",
+                    help="tango.info 대신 쓸 주소 (로컬 시험 서버 등)")
+    ap.add_argument("--queue-size", type=int, default=QUEUE_SIZE, metavar="N",
+                    help=f"단계 사이 큐 크기 (기본 {QUEUE_SIZE})")
+    args = ap.parse_args()
+
+    if not os.path.isdir(args.root):
+        sys.exit(f"❌ {args.root} 이(가) 존재하지 않습니다")
+    scrap.BASE_URL = args.base_url.rstrip("/")
+    if not args.no_http_cache:
+        scrap.HTTP_CACHE = HttpCache(args.http_cache, ttl=DEFAULT_TTL)
+    cache = None if args.no_cache else AnalysisCache(args.cache)
+
+    run_pipeline(args.root, LibraryStore(args.store),
+                 full=args.full, use_hash=args.hash,
+                 workers=args.workers or default_workers(),
+                 detect=partial(detect_bpm, cache=cache),
+                 concurrency=args.concurrency, rate=args.rate, retries=args.retries,
+                 queue_size=args.queue_size)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# preview.py – 미리듣기 클립 (2페이지용)
+#   · 원본 전체를 읽지 않고 offset 초부터 length 초만 디코딩 → 모노 22.05kHz OGG Vorbis
+#   · preview_cache/ 에 저장, 키 = 파일 내용 fingerprint + 구간 → 한 번 만들면 재사용
+#     (30초 클립 ≈ 40KB, 원본 FLAC 수십 MB 를 매번 읽던 것 대신)
+#   · 페이지는 st.audio(클립 경로) → Streamlit 이 클립 바이트를 미디어 저장소(메모리)에 올려
+#     미디어 주소로 재생 (메모리에 올라가는 건 원본이 아니라 작은 클립뿐)
+#   · 캐시가 MAX_CACHE_MB 를 넘으면 오래 안 쓴 클립부터 삭제
+#
+#   python preview.py "C:/DJMUSIC/.../01 - La Cumparsita.flac" --offset 30 --length 30
+
+from __future__ import annotations
+import argparse, hashlib, mimetypes, os, sys, threading, time
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from analysis_cache import fingerprint
+
+PREVIEW_DIR  = Path("preview_cache")
+PREVIEW_SR   = 22050
+MAX_CACHE_MB = 300
+MIME         = "audio/ogg"
+AUDIO_MIMES  = {".mp3": "audio/mpeg", ".flac": "audio/flac", ".wav": "audio/wav",
+                ".m4a": "audio/mp4", ".aac": "audio/aac", ".ogg": "audio/ogg",
+                ".aif": "audio/aiff", ".aiff": "audio/aiff"}
+
+
+def mime_for(path: str | Path) -> str:
+    """원본 파일 확장자 → mime 타입 (클립을 못 만들어 원본을 재생할 때)."""
+    ext = Path(path).suffix.lower()
+    return AUDIO_MIMES.get(ext) or mimetypes.guess_type(str(path))[0] or "audio/mpeg"
+
+
+def clip_path(src: str | Path, offset: float, length: float,
+              cache_dir: str | Path = PREVIEW_DIR) -> Path:
+    key = f"{fingerprint(src)}|{offset:g}|{length:g}|{PREVIEW_SR}"
+    return Path(cache_dir) / (hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + ".ogg")
+
+
+def _decode(src: str | Path, offset: float, length: float) -> tuple[np.ndarray, int]:
+    """구간만 디코딩 → (모노 float32, 샘플레이트). 곡이 짧으면 끝에서 length 초."""
+    try:
+        with sf.SoundFile(str(src)) as fh:
+            sr    = fh.samplerate
+            n     = int(length * sr)
+            start = max(0, min(int(offset * sr), fh.frames - n)) if fh.frames > 0 else 0
+            fh.seek(start)
+            y = fh.read(n, dtype="float32", always_2d=True).mean(axis=1)
+            return y, sr
+    except (sf.LibsndfileError, RuntimeError):       # m4a 등 → librosa(audioread) 로
+        import librosa
+        dur = librosa.get_duration(path=str(src))
+        y, sr = librosa.load(str(src), sr=None, mono=True,
+                             offset=max(0.0, min(offset, dur - length)), duration=length)
+        return y.astype("float32"), sr
+
+
+def make_clip(src: str | Path, offset: float = 30.0, length: float = 30.0,
+              cache_dir: str | Path = PREVIEW_DIR) -> Path:
+    """미리듣기 클립 경로 (없으면 만들어 저장)."""
+    out = clip_path(src, offset, length, cache_dir)
+    if out.exists():
+        os.utime(out)                         # 최근 사용 표시 (prune 기준)
+        return out
+    y, sr = _decode(src, offset, length)
+    if sr != PREVIEW_SR and len(y):
+        import soxr
+        y = soxr.resample(y, sr, PREVIEW_SR)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+    sf.write(tmp, y, PREVIEW_SR, format="OGG", subtype="VORBIS")
+    os.replace(tmp, out)                      # 다른 세션이 동시에 만들어도 안전
+    prune(cache_dir)
+    return out
+
+
+def prune(cache_dir: str | Path = PREVIEW_DIR, max_mb: float = MAX_CACHE_MB) -> int:
+    """캐시가 max_mb 를 넘으면 오래 안 쓴 클립부터 삭제 → 지운 개수."""
+    files = []
+    for p in Path(cache_dir).glob("*.ogg"):
+        try:
+            st = p.stat()
+        except FileNotFoundError:             # 다른 세션이 방금 지운 클립
+            continue
+        files.append((st.st_mtime, st.st_size, p))
+    total = sum(s for _, s, _ in files)
+    removed = 0
+    for _, size, p in sorted(files):
+        if total <= max_mb * 2**20:
+            break
+        p.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="미리듣기 클립 만들기")
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--offset", type=float, default=30.0, help="시작 위치(초, 기본 30)")
+    ap.add_argument("--length", type=float, default=30.0, help="길이(초, 기본 30)")
+    ap.add_argument("--cache", default=str(PREVIEW_DIR), metavar="DIR")
+    args = ap.parse_args()
+
+    for f in args.files:
+        t0 = time.perf_counter()
+        try:
+            out = make_clip(f, args.offset, args.length, args.cache)
+        except Exception as e:
+            print(f"❌ {f}: {e}", file=sys.stderr)
+            continue
+        print(f"✅ {out}  {out.stat().st_size / 1024:.0f} KB  "
+              f"(원본 {os.path.getsize(f) / 2**20:.1f} MB, {time.perf_counter() - t0:.2f}초)")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# progress.py – 진행률 표시 (build_tag_csv.py · scrap.py · bpm.py · pipeline.py 공용)
+#   · 터미널에서는 기존처럼 tqdm 막대
+#   · 환경 변수 POCO_PROGRESS=json 이면 tqdm 대신 stdout 에 JSON 한 줄씩 출력
+#       @@progress {"stage": "bpm", "done": 120, "total": 800, "rate": 2.4, "eta": 283.3, "failures": 3}
+#     → 1페이지가 읽어서 단계별 진행 막대 + 초당 처리량 + 남은 시간으로 표시
+#   · JSON 줄은 interval 초에 한 번 + 시작·끝에 한 번씩만 (출력 폭주 방지)
+
+from __future__ import annotations
+import json, os, time
+
+from tqdm import tqdm
+
+PREFIX = "@@progress "
+ENV    = "POCO_PROGRESS"
+
+
+def json_mode() -> bool:
+    return os.environ.get(ENV, "").lower() == "json"
+
+
+def parse(line: str) -> dict | None:
+    """출력 한 줄 → 진행 이벤트 dict (진행 줄이 아니면 None)."""
+    if not line.startswith(PREFIX):
+        return None
+    try:
+        return json.loads(line[len(PREFIX):])
+    except ValueError:
+        return None
+
+
+class Progress:
+    """tqdm 과 같은 방식으로 쓰는 진행률 (update / close / with 문)."""
+
+    def __init__(self, stage: str, total: int, desc: str | None = None,
+                 unit: str = "trk", interval: float = 1.0, position: int | None = None):
+        self.stage    = stage
+        self.total    = total
+        self.unit     = unit
+        self.interval = interval
+        self.done = self.failures = 0
+        self.t0 = self._last = self._t_upd = time.monotonic()
+        self.bar = None if json_mode() else tqdm(total=total, desc=desc or stage,
+                                                 unit=unit, position=position)
+        if self.bar is None:
+            self._emit()
+
+    def update(self, n: int = 1, failed: int = 0) -> None:
+        self.done     += n
+        self.failures += failed
+        self._t_upd    = time.monotonic()
+        if self.bar is not None:
+            self.bar.update(n)
+            if failed:
+                self.bar.set_postfix(fail=self.failures, refresh=False)
+        elif time.monotonic() - self._last >= self.interval:
+            self._emit()
+
+    def close(self) -> None:
+        if self.bar is not None:
+            self.bar.close()
+        else:
+            self._emit()
+
+    def __enter__(self) -> "Progress":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _emit(self) -> None:
+        now     = time.monotonic()
+        elapsed = self._t_upd - self.t0        # 마지막 완료 시각 기준 (끝난 단계의 속도 유지)
+        rate    = self.done / elapsed if self.done and elapsed > 0 else 0.0
+        eta     = (self.total - self.done) / rate if rate else None
+        self._last = now
+        print(PREFIX + json.dumps({
+            "stage": self.stage, "done": self.done, "total": self.total,
+            "rate": round(rate, 2), "eta": None if eta is None else round(eta, 1),
+            "failures": self.failures, "unit": self.unit,
+        }), flush=True)
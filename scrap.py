@@ -3,14 +3,19 @@
 # 2025-06-24
 
 from __future__ import annotations
-import argparse, re, sys, time
+import argparse, asyncio, random, re, sys, time
 from pathlib import Path
 
+import httpx
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 from rapidfuzz import fuzz
-from tqdm import tqdm
+
+from checkpoint import Checkpoint
+from http_cache import DEFAULT_TTL, HTTP_CACHE_DB, HttpCache, cache_key
+from library_store import KEY, LibraryStore, frame_keys
+from progress import Progress
 
 
 ##############################################################################
@@ -19,6 +24,21 @@ from tqdm import tqdm
 CSV_IN  = Path("music_library_tags.csv")
 CSV_OUT = Path("music_library_tags_updated.csv")
 
+CKPT    = Path("scrap_checkpoint.csv")   # 실행 도중 끝난 행 (정상 종료 시 삭제)
+
+SCRAP_COLS = ["RecordingDate", "Genre", "Vocalist", "Leader", "ScrapNote"]
+FAILED_NOTES = ("no-work", "no-perf")    # --retry-failed 대상
+
+# 로컬 대역 서버(저장해 둔 tango.info 페이지)로 시험할 때 --base-url 로 교체
+BASE_URL = "https://tango.info"
+
+# 디스크 응답 캐시 (main 에서 설정, None 이면 매번 네트워크)
+HTTP_CACHE: HttpCache | None = None
+
+# 한 번 실행하는 동안의 중복 제거: 정리된 제목 → TIWC 링크, TIWC URL → 페이지 HTML
+_SEARCH_MEMO: dict[str, str | None] = {}
+_PAGE_MEMO:   dict[str, str] = {}
+
 S = requests.Session()
 S.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -42,47 +62,99 @@ def clean_title(t: str) -> str:
     return t.strip()
 
 
-##############################################################################
-# tango.info work 검색 → TIWC 링크 하나
-##############################################################################
-def find_tiwc_link(work_query: str) -> str | None:
-    url    = "https://tango.info/search"
-    params = {"q": work_query, "c": "work"}
+def get_text(url: str, params: dict | None = None, timeout: float = 20) -> str | None:
+    """GET → 본문 (캐시 우선: TTL 안이면 그대로, 지나면 조건부 요청)."""
+    key   = cache_key(url, params)
+    entry = HTTP_CACHE.get(key) if HTTP_CACHE else None
+    if entry and HTTP_CACHE.is_fresh(entry):
+        HTTP_CACHE.hits += 1
+        return entry.body
 
     try:
-        r = S.get(url, params=params, timeout=15)
+        r = S.get(url, params=params, timeout=timeout,
+                  headers=HttpCache.conditional_headers(entry))
+        if r.status_code == 304 and entry:
+            HTTP_CACHE.touch(key)
+            HTTP_CACHE.revalidated += 1
+            return entry.body
         r.raise_for_status()
     except requests.RequestException:
         return None
 
-    a = BeautifulSoup(r.text, "lxml").select_one(
-        "table.listing tbody a[href^='/T']"
-    )
-    return f"https://tango.info{a['href']}" if a else None
+    if HTTP_CACHE:
+        HTTP_CACHE.put(key, r.text, r.headers)
+        HTTP_CACHE.misses += 1
+    return r.text
 
 
 ##############################################################################
-# TIWC 페이지 → Performance 행 하나 파싱
+# listing 표만 잘라 파싱 (페이지 전체 트리를 만들지 않음)
 ##############################################################################
-_DATE_FULL = re.compile(r"\b(19|20)\d{2}-\d{2}-\d{2}\b")
-_DATE_YEAR = re.compile(r"\b(19|20)\d{2}\b")
+_LISTING_OPEN  = re.compile(r"""<table\b[^>]*\bclass\s*=\s*["']?[^"'>]*\blisting\b""", re.I)
+_TABLE_CLOSE   = re.compile(r"</table\s*>", re.I)
+_LISTING_XPATH = ("//table[contains(concat(' ', normalize-space(@class), ' '),"
+                  " ' listing ')]")
 
-def parse_performance(tiwc_url: str,
-                      orchestra_hint: str,
-                      vocalist_hint: str | None = None
-                      ) -> tuple[str, str, str] | None:
-    """return (recording_date, genre, vocalist) 또는 None"""
+
+def listing_table(html: str):
+    """첫 table.listing 요소 (없으면 None). 표 부분 문자열만 lxml 로 파싱."""
+    m = _LISTING_OPEN.search(html)
+    if not m:
+        return None
+    end  = _TABLE_CLOSE.search(html, m.end())
+    frag = html[m.start(): end.end() if end else len(html)]
     try:
-        r = S.get(tiwc_url, timeout=20)
-        r.raise_for_status()
-    except requests.RequestException:
+        return lxml_html.fragment_fromstring(frag)
+    except etree.ParserError:   # 잘린 표가 이상하면 페이지 전체로 한 번 더
+        found = lxml_html.document_fromstring(html).xpath(_LISTING_XPATH)
+        return found[0] if found else None
+
+
+def listing_rows(html: str) -> list[tuple[str, ...]]:
+    """listing 표의 데이터 행 → 칸 텍스트 튜플 목록 (머리글 행 제외)."""
+    table = listing_table(html)
+    if table is None:
+        return []
+    return [tuple(td.text_content().strip() for td in tr.xpath("./td"))
+            for tr in table.xpath(".//tr[td]")]
+
+
+##############################################################################
+# tango.info work 검색 → TIWC 링크 하나
+##############################################################################
+def parse_search(html: str) -> str | None:
+    table = listing_table(html)
+    if table is None:
+        return None
+    hrefs = table.xpath(".//tr[td]//a[starts-with(@href, '/T')]/@href")
+    return f"{BASE_URL}{hrefs[0]}" if hrefs else None
+
+
+def find_tiwc_link(work_query: str) -> str | None:
+    if work_query in _SEARCH_MEMO:          # 같은 제목은 실행당 한 번만 검색
+        return _SEARCH_MEMO[work_query]
+
+    html = get_text(f"{BASE_URL}/search", {"q": work_query, "c": "work"}, timeout=15)
+    if html is None:                        # 네트워크 실패는 기억하지 않음
         return None
+    link = _SEARCH_MEMO[work_query] = parse_search(html)
+    return link
+
 
-    rows = BeautifulSoup(r.text, "lxml").select("table.listing tbody tr")
+##############################################################################
+# TIWC 페이지 → Performance 행 하나 파싱
+##############################################################################
+_DATE_FULL = re.compile(r"\b(19|20)\d{2}-\d{2}-\d{2}\b")
+_DATE_YEAR = re.compile(r"\b(19|20)\d{2}\b")
+
+def parse_listing(html: str,
+                  orchestra_hint: str,
+                  vocalist_hint: str | None = None
+                  ) -> tuple[str, str, str] | None:
+    """TIWC 페이지 HTML → (recording_date, genre, vocalist) 또는 None"""
     best, best_score = None, -1.0
 
-    for tr in rows:
-        tds = [td.get_text(strip=True) for td in tr.select("td")]
+    for tds in listing_rows(html):
         if len(tds) < 7:
             continue
 
@@ -108,9 +180,42 @@ def parse_performance(tiwc_url: str,
     return best
 
 
+def parse_performance(tiwc_url: str,
+                      orchestra_hint: str,
+                      vocalist_hint: str | None = None
+                      ) -> tuple[str, str, str] | None:
+    """return (recording_date, genre, vocalist) 또는 None"""
+    html = _PAGE_MEMO.get(tiwc_url)         # 같은 TIWC 페이지는 실행당 한 번만 받음
+    if html is None:
+        html = get_text(tiwc_url, timeout=20)
+        if html is None:
+            return None
+        _PAGE_MEMO[tiwc_url] = html
+
+    return parse_listing(html, orchestra_hint, vocalist_hint)
+
+
 ##############################################################################
 # 행 보강
 ##############################################################################
+def scrap_values(tiwc: str | None,
+                 perf: tuple[str, str, str] | None,
+                 orchestra_hint: str) -> dict:
+    """검색·파싱 결과 → 채울 열 값들 (동기/비동기 공용)."""
+    if not tiwc:
+        return {"ScrapNote": "no-work"}
+    if not perf:
+        return {"ScrapNote": "no-perf"}
+    rec_date, genre, vocalist = perf
+    return {
+        "RecordingDate": rec_date,
+        "Genre":         genre,
+        "Vocalist":      vocalist,
+        "Leader":        orchestra_hint,
+        "ScrapNote":     "✓",
+    }
+
+
 def enrich_row(row: pd.Series) -> pd.Series:
     row = row.copy()  # SettingWithCopy 경고 방지
 
@@ -119,56 +224,264 @@ def enrich_row(row: pd.Series) -> pd.Series:
     vocalist_hint  = row.get("TrackArtist", "")
 
     tiwc = find_tiwc_link(title)
-    if not tiwc:
-        row["ScrapNote"] = "no-work"
-        return row
+    perf = parse_performance(tiwc, orchestra_hint, vocalist_hint) if tiwc else None
+    for col, val in scrap_values(tiwc, perf, orchestra_hint).items():
+        row[col] = val
+    return row
 
-    perf = parse_performance(tiwc, orchestra_hint, vocalist_hint)
-    if not perf:
-        row["ScrapNote"] = "no-perf"
-        return row
 
-    rec_date, genre, vocalist = perf
-    row["RecordingDate"] = rec_date
-    row["Genre"]         = genre
-    row["Vocalist"]      = vocalist
-    row["Leader"]        = orchestra_hint
-    row["ScrapNote"]     = "✓"
-    return row
+##############################################################################
+# 비동기 모드 (httpx) – 동시 요청 + 호스트별 속도 제한 + 재시도
+##############################################################################
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    """호스트마다 요청 시작 간격을 1/rate 초 이상으로 유지."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at: dict[str, float] = {}
+        self.lock = asyncio.Lock()
+
+    async def wait(self, host: str) -> None:
+        async with self.lock:
+            now  = time.monotonic()
+            at   = max(now, self.next_at.get(host, now))
+            self.next_at[host] = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+async def fetch_text(client: httpx.AsyncClient,
+                     limiter: HostRateLimiter,
+                     url: str,
+                     params: dict | None = None,
+                     retries: int = 3,
+                     backoff: float = 1.0) -> str | None:
+    """GET → 본문. 캐시 우선 (get_text 와 같은 규칙).
+    연결 오류·429·5xx 는 지수 백오프로 재시도, 그 외 4xx 는 None."""
+    key   = cache_key(url, params)
+    entry = HTTP_CACHE.get(key) if HTTP_CACHE else None
+    if entry and HTTP_CACHE.is_fresh(entry):
+        HTTP_CACHE.hits += 1
+        return entry.body
+
+    host    = httpx.URL(url).host
+    headers = HttpCache.conditional_headers(entry)
+    for attempt in range(retries + 1):
+        await limiter.wait(host)
+        try:
+            r = await client.get(url, params=params, headers=headers)
+            if r.status_code == 304 and entry:
+                HTTP_CACHE.touch(key)
+                HTTP_CACHE.revalidated += 1
+                return entry.body
+            if r.status_code not in RETRY_STATUS:
+                r.raise_for_status()
+                if HTTP_CACHE:
+                    HTTP_CACHE.put(key, r.text, r.headers)
+                    HTTP_CACHE.misses += 1
+                return r.text
+        except httpx.HTTPStatusError:
+            return None
+        except httpx.TransportError:
+            pass
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt * (0.5 + random.random()))
+    return None
+
+
+async def _once(memo: dict, key: str, make) -> str | None:
+    """같은 key 요청은 하나만 띄우고 나머지는 그 결과를 기다림 (실행 중 중복 제거).
+
+    네트워크 실패(None)는 기억하지 않음 → 다음 요청은 다시 받음 (동기 경로의 _SEARCH_MEMO 와 같음)."""
+    if key not in memo:
+        memo[key] = asyncio.ensure_future(make())
+    fut  = memo[key]
+    text = await fut
+    if text is None and memo.get(key) is fut:
+        del memo[key]
+    return text
+
+
+async def enrich_track_async(client: httpx.AsyncClient,
+                             limiter: HostRateLimiter,
+                             title: str,
+                             orchestra_hint: str,
+                             vocalist_hint: str,
+                             retries: int,
+                             searches: dict,
+                             pages: dict) -> dict:
+    query = clean_title(title)
+    html  = await _once(searches, query, lambda: fetch_text(
+        client, limiter, f"{BASE_URL}/search", {"q": query, "c": "work"}, retries))
+    tiwc = parse_search(html) if html else None
+    perf = None
+    if tiwc:
+        html = await _once(pages, tiwc, lambda: fetch_text(
+            client, limiter, tiwc, retries=retries))
+        perf = parse_listing(html, orchestra_hint, vocalist_hint) if html else None
+    return scrap_values(tiwc, perf, orchestra_hint)
+
+
+def async_client(concurrency: int = 8) -> httpx.AsyncClient:
+    """연결 풀 크기 = 동시 트랙 수인 httpx 클라이언트 (pipeline.py 와 공용)."""
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(headers=dict(S.headers), limits=limits,
+                             timeout=httpx.Timeout(20.0, connect=15.0),
+                             follow_redirects=True)
+
+
+async def enrich_frame_async(df: pd.DataFrame,
+                             concurrency: int = 8,
+                             rate: float = 4.0,
+                             retries: int = 3,
+                             on_result=None) -> list[dict]:
+    """행마다 채울 값 dict 목록 (df 행 순서 그대로).
+    on_result(i, values) 는 i 번째 행이 끝날 때마다 호출 (체크포인트용)."""
+    sem     = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(rate)
+    bar     = Progress("scrap", len(df), desc="Tracks", unit="trk")
+    searches: dict[str, asyncio.Future] = {}    # 정리된 제목 → 검색 페이지
+    pages:    dict[str, asyncio.Future] = {}    # TIWC URL  → work 페이지
+
+    async with async_client(concurrency) as client:
+        async def one(i, title, orch, voc) -> dict:
+            async with sem:
+                res = None
+                try:
+                    res = await enrich_track_async(client, limiter, title, orch,
+                                                   voc if isinstance(voc, str) else "",
+                                                   retries, searches, pages)
+                    if on_result:
+                        on_result(i, res)
+                    return res
+                finally:
+                    bar.update(1, failed=res is None or res["ScrapNote"] in FAILED_NOTES)
+
+        tasks = [one(i, t, o, v) for i, (t, o, v) in enumerate(zip(
+            df["Title"], df["Orchestra"],
+            df["TrackArtist"] if "TrackArtist" in df.columns else [""] * len(df)))]
+        results = await asyncio.gather(*tasks)
+
+    bar.close()
+    return list(results)
 
 
 ##############################################################################
 # 메인
 ##############################################################################
 def main() -> None:
+    global BASE_URL, HTTP_CACHE
     ap = argparse.ArgumentParser(description="tango.info 태그 자동 보강기")
     ap.add_argument("--single", metavar="TITLE",
                     help="제목이 포함된 첫 트랙만 테스트")
+    ap.add_argument("--store", metavar="FILE",
+                    help="CSV 대신 라이브러리 저장소(SQLite)를 읽고 씀")
+    ap.add_argument("--async", dest="use_async", action="store_true",
+                    help="httpx 비동기 모드 (여러 트랙 동시 요청)")
+    ap.add_argument("--concurrency", type=int, default=8, metavar="N",
+                    help="비동기 모드 동시 트랙 수 = 연결 풀 크기 (기본 8)")
+    ap.add_argument("--rate", type=float, default=4.0, metavar="RPS",
+                    help="비동기 모드 호스트당 초당 요청 수 상한 (기본 4)")
+    ap.add_argument("--retries", type=int, default=3, metavar="N",
+                    help="비동기 모드 연결 오류·429·5xx 재시도 횟수 (기본 3)")
+    ap.add_argument("--base-url", default=BASE_URL, metavar="URL",
+                    help="tango.info 대신 쓸 주소 (로컬 시험 서버 등)")
+    ap.add_argument("--resume", action="store_true",
+                    help=f"중단된 실행 이어서 ({CKPT} 에 있는 행은 건너뜀)")
+    ap.add_argument("--retry-failed", action="store_true",
+                    help="no-work / no-perf 행만 다시 시도 (지난 결과 위에 덮어씀)")
+    ap.add_argument("--http-cache", default=str(HTTP_CACHE_DB), metavar="FILE",
+                    help=f"HTTP 응답 캐시 파일 (기본 {HTTP_CACHE_DB})")
+    ap.add_argument("--no-http-cache", action="store_true",
+                    help="응답 캐시 사용 안 함 (매번 새로 받음)")
+    ap.add_argument("--ttl", type=float, default=DEFAULT_TTL / 86400, metavar="DAYS",
+                    help="캐시 유효 기간, 지나면 ETag 로 재검증 (기본 30일)")
     args = ap.parse_args()
-
-    if not CSV_IN.exists():
-        sys.exit(f"❌ {CSV_IN} not found")
-
-    df = pd.read_csv(CSV_IN)
+    BASE_URL = args.base_url.rstrip("/")
+    if not args.no_http_cache:
+        HTTP_CACHE = HttpCache(args.http_cache, ttl=args.ttl * 86400)
+
+    store = LibraryStore(args.store) if args.store else None
+    src   = CSV_OUT if args.retry_failed else CSV_IN   # 실패만 다시 = 지난 결과 위에서
+    if store is not None:
+        df = store.read(["Title", "Orchestra", "TrackArtist"] + SCRAP_COLS)
+    elif not src.exists():
+        sys.exit(f"❌ {src} not found")
+    else:
+        df = pd.read_csv(src)
 
     # 새 컬럼 확보
-    for col in ("RecordingDate", "Genre", "Vocalist", "Leader", "ScrapNote"):
+    for col in SCRAP_COLS:
         if col not in df.columns:
             df[col] = ""
 
-    if args.single:
-        mask = df["Title"].str.contains(args.single, case=False, regex=False)
-        if mask.sum() == 0:
-            sys.exit("❌ 해당 제목 없음")
-        idx = mask.idxmax()
-        print(f"🎧 TEST » {df.at[idx,'Title']} | {df.at[idx,'Orchestra']}")
-        df.loc[idx] = enrich_row(df.loc[idx])
-    else:
-        for idx in tqdm(df.index, desc="Tracks", unit="trk"):
-            df.loc[idx] = enrich_row(df.loc[idx])
+    # 처리할 행 고르기 (--resume: 체크포인트에 있는 행 제외 / --retry-failed: 실패 행만)
+    keys   = frame_keys(df)
+    ckpt   = Checkpoint(CKPT, KEY, SCRAP_COLS)
+    record = not (args.single or args.retry_failed)     # 체크포인트는 전체 실행에서만
+    todo   = pd.Series(True, index=df.index)
+    if args.retry_failed:
+        todo = df["ScrapNote"].isin(FAILED_NOTES)
+        if HTTP_CACHE is not None:      # 캐시된 빈 검색 결과도 다시 확인 (ETag 재검증)
+            HTTP_CACHE.ttl = 0
+        print(f"🔁 실패 행 {int(todo.sum())}개 다시 시도")
+    elif args.resume and record:
+        n = ckpt.load()
+        todo = ~ckpt.apply(df, keys)
+        print(f"⏯️ 체크포인트 {n}곡 반영 → 남은 {int(todo.sum())}곡")
+    elif record:
+        ckpt.clear()
 
-    df.to_csv(CSV_OUT, index=False)
-    print(f"✅ Saved → {CSV_OUT}")
+    try:
+        if args.single:
+            mask = df["Title"].str.contains(args.single, case=False, regex=False)
+            if mask.sum() == 0:
+                sys.exit("❌ 해당 제목 없음")
+            idx = mask.idxmax()
+            print(f"🎧 TEST » {df.at[idx,'Title']} | {df.at[idx,'Orchestra']}")
+            df.loc[idx] = enrich_row(df.loc[idx])
+            todo = df.index == idx
+        elif args.use_async:
+            index = df.index[todo]
+            def on_result(i: int, values: dict) -> None:
+                if record:
+                    ckpt.add(keys[index[i]], values)
+            results = asyncio.run(enrich_frame_async(
+                df.loc[index], concurrency=args.concurrency, rate=args.rate,
+                retries=args.retries, on_result=on_result))
+            # 결과를 원래 행 순서대로 열 단위로 반영
+            upd = pd.DataFrame(results, index=index)
+            for col in upd.columns:
+                df[col] = df[col].astype(object)
+                df.loc[index, col] = upd[col].where(upd[col].notna(), df.loc[index, col])
+        else:
+            with Progress("scrap", int(todo.sum()), desc="Tracks", unit="trk") as bar:
+                for idx in df.index[todo]:
+                    df.loc[idx] = enrich_row(df.loc[idx])
+                    if record:
+                        ckpt.add(keys[idx], {c: df.at[idx, c] for c in SCRAP_COLS})
+                    bar.update(1, failed=df.at[idx, "ScrapNote"] in FAILED_NOTES)
+    except KeyboardInterrupt:
+        ckpt.flush()
+        sys.exit(f"⏸️ 중단 – 끝난 {len(ckpt.rows)}곡은 {CKPT} 에 저장, --resume 으로 이어서")
+    ckpt.flush()
+
+    if HTTP_CACHE is not None:
+        print(f"🗄️ {HTTP_CACHE.summary()}")
+
+    if store is not None:   # 스크랩 열만 upsert (이어서 실행이면 체크포인트 행 포함)
+        done = df if args.resume and record else df[todo]
+        store.upsert(done, SCRAP_COLS)
+        print(f"✅ Saved → {store.path}  ({len(done)} 곡)")
+    else:
+        df.to_csv(CSV_OUT, index=False)
+        print(f"✅ Saved → {CSV_OUT}")
+    if record:
+        ckpt.clear()
 
 
 if __name__ == "__main__":
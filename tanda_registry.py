@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# tanda_registry.py – 탄다 목록을 고정 ID 로 관리 (3페이지 스케줄러용)
+#   · ID = 탄다 내용(이름·종류·곡 목록) 해시 → 같은 파일을 다시 올려도 같은 ID
+#     (목록 안에 내용이 똑같은 탄다가 또 있으면 n번째는 'ID-n' → 합치지 않고 따로 표시)
+#   · 스케줄 칸에는 ID 만 저장, 탄다 찾기는 dict 조회 (O(1))
+#   · 선택지 목록·라벨은 한 번만 만들어 모든 칸이 같이 씀
+#   · 탄다 길이 = 라이브러리 CSV 의 Duration 열 (스캔 때 mutagen 헤더에서 읽은 값)
+#     → 스케줄 타임라인 계산 때 음악 파일을 열지 않음
+
+from __future__ import annotations
+import hashlib, json, re
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+EMPTY = "(empty)"
+
+
+def tanda_id(tg: dict) -> str:
+    """탄다 dict → 12자리 ID ('id' 키가 있으면 그대로)."""
+    if tg.get("id"):
+        return str(tg["id"])
+    key = json.dumps([tg.get("name"), tg.get("type"), tg.get("tracks", [])],
+                     ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+
+
+class TandaRegistry:
+    def __init__(self, tandas: Iterable[dict] = ()):
+        self.by_id: Dict[str, dict] = {}
+        self._options: List[str] | None = None
+        self.lengths: Dict[str, tuple] = {}      # ID → (초, 곡 수, 길이 모르는 곡 수)
+        self._seen:   Dict[str, int] = {}        # 내용 해시 → 목록 안 등장 횟수
+        self._obj:    Dict[int, str] = {}        # id(탄다 dict) → ID (예전 세션 칸 복원용)
+        for tg in tandas:
+            self.add(tg, keep_duplicates=True)
+
+    def add(self, tg: dict, keep_duplicates: bool = False) -> str:
+        """탄다 등록 → ID. keep_duplicates 면 내용이 같은 탄다도 'ID-n' 으로 따로 등록."""
+        tid = tanda_id(tg)
+        if keep_duplicates:
+            n = self._seen[tid] = self._seen.get(tid, 0) + 1
+            if n > 1:
+                tid = f"{tid}-{n}"
+        if tid not in self.by_id:
+            self.by_id[tid] = tg
+            self._obj[id(tg)] = tid
+            self._options = None
+        return tid
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, tid) -> bool:
+        return tid in self.by_id
+
+    def get(self, tid: str | None) -> dict | None:
+        return self.by_id.get(tid) if tid else None
+
+    def _build(self) -> None:
+        if self._options is None:
+            self._options = [EMPTY] + list(self.by_id)
+            self._pos     = {t: i for i, t in enumerate(self._options)}
+            self._labels  = {EMPTY: EMPTY}
+            self._labels.update((t, f"{i}. {tg.get('name', t)}")
+                                for i, (t, tg) in enumerate(self.by_id.items(), 1))
+
+    @property
+    def options(self) -> List[str]:
+        """selectbox 선택지 [EMPTY, ID…] – 모든 칸이 같은 리스트를 씀."""
+        self._build()
+        return self._options
+
+    def index(self, tid: str | None) -> int:
+        """선택지 안 위치 (없거나 빈 칸이면 0)."""
+        self._build()
+        return self._pos.get(tid or EMPTY, 0)
+
+    def label(self, tid: str) -> str:
+        self._build()
+        return self._labels.get(tid, tid)
+
+    def normalise(self, slot) -> str | None:
+        """칸 값 → ID (예전 세션의 dict 는 등록 후 ID, 모르는 ID 는 빈 칸)."""
+        if isinstance(slot, dict):
+            return self._obj.get(id(slot)) or self.add(slot)
+        return slot if slot in self.by_id else None
+
+    def set_durations(self, durations: pd.Series) -> None:
+        """durations = {'악단/앨범/파일': 초} → 탄다별 길이를 한 번에 계산."""
+        tids  = [t for t, tg in self.by_id.items() for _ in tg.get("tracks", [])]
+        keys  = [path_key(p) for tg in self.by_id.values() for p in tg.get("tracks", [])]
+        sec   = pd.Series(keys, dtype=object).map(durations).to_numpy(dtype=float)
+        sec[~(sec > 0)] = np.nan
+        flat  = pd.DataFrame({"tid": tids, "sec": sec})
+        agg   = flat.groupby("tid", sort=False)["sec"].agg(["sum", "size", "count"])
+        self.lengths = {t: (0.0, 0, 0) for t in self.by_id}
+        self.lengths.update((t, (float(r["sum"]), int(r["size"]), int(r["size"] - r["count"])))
+                            for t, r in agg.iterrows())
+
+
+def path_key(path: str) -> str:
+    """곡 경로 → '악단/앨범/파일' (라이브러리 TrackKey 와 같은 형태, 구분자 무관)."""
+    return "/".join(re.split(r"[\\/]+", str(path).strip())[-3:])
+
+
+def duration_lookup(df: pd.DataFrame) -> pd.Series:
+    """라이브러리 표 → {'악단/앨범/파일': Duration} (열이 없으면 빈 Series)."""
+    if "Duration" not in df.columns:
+        return pd.Series(dtype=float)
+    keys = (df["Orchestra"].astype(str) + "/" + df["AlbumFolder"].astype(str)
+            + "/" + df["FileName"].astype(str))
+    dur  = pd.to_numeric(df["Duration"], errors="coerce")
+    return pd.Series(dur.to_numpy(), index=keys.to_numpy()).groupby(level=0).first()
+
+
+def schedule_timeline(reg: TandaRegistry, slots: Sequence[str],
+                      start: float = 0.0, gap: float = 0.0) -> pd.DataFrame:
+    """스케줄 순서의 탄다 ID 목록 → 탄다별 시작·끝(초, 자정 기준) 표.
+
+    gap = 탄다 사이 간격(꼬르띠나 등, 초). 길이는 reg.set_durations 로 미리 계산된 값."""
+    info  = np.array([reg.lengths.get(t, (0.0, 0, 0)) for t in slots], dtype=float).reshape(-1, 3)
+    sec   = info[:, 0]
+    gaps  = np.full(len(sec), float(gap))
+    if len(gaps):
+        gaps[-1] = 0.0                         # 마지막 탄다 뒤에는 간격 없음
+    ends  = start + np.cumsum(sec + gaps) - gaps
+    return pd.DataFrame({
+        "tid":     list(slots),
+        "name":    [reg.get(t)["name"] for t in slots],
+        "tracks":  info[:, 1].astype(int),
+        "missing": info[:, 2].astype(int),
+        "length":  sec,
+        "start":   ends - sec,
+        "end":     ends,
+    })
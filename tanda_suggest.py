@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# tanda_suggest.py – 탄다 자동 제안 (2페이지용)
+#   · 제안 = 같은 장르 · 같은 악단 3~4곡, 녹음 연도 차 ≤ year_window, BPM 차 ≤ bpm_tol
+#   · 후보 행을 악단 안에서 (연도) / (BPM) / (연도 구간, BPM) 순으로 정렬 → 연속 k곡 창을
+#     sliding_window_view 로 한꺼번에 만들고 조건 확인·점수 계산을 배열 연산으로 처리
+#   · 점수 높은 창부터 곡이 겹치지 않게 고름 (악단당 최대 per_orchestra 개)
+#   · 결과는 tanda_groups 와 같은 dict {"name", "type", "tracks"} (+ "ids", "score")
+#
+#   python tanda_suggest.py music_library_full.csv C:/DJMUSIC --genre vals
+
+from __future__ import annotations
+import argparse, sys, time
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+TANDA_TYPES = {"tango": "탱고", "vals": "발스", "milonga": "밀롱가"}
+TANDA_SIZES = {"tango": 4, "vals": 3, "milonga": 3}
+
+
+def _windows(keys: List[np.ndarray], cols: Dict[str, np.ndarray], k: int) -> Dict[str, np.ndarray]:
+    """keys 순으로 정렬한 뒤 연속 k곡 창 → {열: (창 수, k) 배열}, "rows" = 원래 위치."""
+    order = np.lexsort(keys[::-1])
+    out = {name: sliding_window_view(a[order], k) for name, a in cols.items()}
+    out["rows"] = sliding_window_view(order, k)
+    return out
+
+
+def candidates(orch: np.ndarray, year: np.ndarray, bpm: np.ndarray, voc: np.ndarray,
+               k: int, year_window: float, bpm_tol: float) -> tuple[np.ndarray, np.ndarray]:
+    """조건을 만족하는 모든 k곡 창 → (행 위치 (n, k), 점수 (n,)). 점수 1 = BPM·연도 완전 일치."""
+    if len(orch) < k:
+        return np.empty((0, k), dtype=np.int64), np.empty(0)
+    cols = {"orch": orch, "year": year, "bpm": bpm, "voc": voc}
+    span = max(year_window, 1e-9)
+    parts = [_windows([orch, year, bpm], cols, k),      # 연도가 가까운 곡끼리
+             _windows([orch, bpm, year], cols, k),      # BPM 이 가까운 곡끼리
+             # 연도 구간(폭 = year_window, 반 칸 어긋난 것 포함) 안에서 BPM 이 가까운 곡끼리
+             _windows([orch, np.floor(year / span), bpm], cols, k),
+             _windows([orch, np.floor(year / span + 0.5), bpm], cols, k)]
+    w = {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+
+    year_span = np.ptp(w["year"], axis=1)
+    bpm_span  = np.ptp(w["bpm"], axis=1)
+    ok = (np.ptp(w["orch"], axis=1) == 0) & (year_span <= year_window) & (bpm_span <= bpm_tol)
+    rows = np.sort(w["rows"][ok], axis=1)
+    same_voc = np.ptp(w["voc"][ok], axis=1) == 0
+    score = (1.0 - 0.6 * bpm_span[ok] / max(bpm_tol, 1e-9)
+                 - 0.4 * year_span[ok] / span) * 0.9 + 0.1 * same_voc
+
+    rows, first = np.unique(rows, axis=0, return_index=True)  # 두 정렬에서 같은 창 제거
+    return rows, score[first]
+
+
+def pick(rows: np.ndarray, score: np.ndarray, orch: np.ndarray, n: int,
+         per_orchestra: int) -> List[int]:
+    """점수 순으로 곡이 겹치지 않는 창을 최대 n 개."""
+    used  = np.zeros(len(orch), dtype=bool)
+    count: Dict[int, int] = {}
+    out: List[int] = []
+    for i in np.argsort(-score, kind="stable"):
+        r = rows[i]
+        o = int(orch[r[0]])
+        if used[r].any() or count.get(o, 0) >= per_orchestra:
+            continue
+        used[r] = True
+        count[o] = count.get(o, 0) + 1
+        out.append(int(i))
+        if len(out) >= n:
+            break
+    return out
+
+
+def suggest(df: pd.DataFrame, genre: str, pool: np.ndarray | None = None,
+            exclude: Iterable[str] = (), size: int | None = None,
+            year_window: float = 5, bpm_tol: float = 4.0,
+            n: int = 20, per_orchestra: int = 3) -> List[dict]:
+    """탄다 제안 목록 (점수 높은 순).
+
+    df = LibraryFrame.df (Orchestra · GenreKey · RecordingYear · BPM · Vocalist · TrackID · Path),
+    pool = 후보 행 번호 (None = 전체), exclude = 이미 쓴 곡 경로."""
+    k    = size or TANDA_SIZES.get(genre, 4)
+    rows = np.arange(len(df)) if pool is None else np.asarray(pool)
+    orch = pd.factorize(df["Orchestra"])[0][rows]          # category 면 코드만 꺼냄
+    voc  = pd.factorize(df["Vocalist"])[0][rows] if "Vocalist" in df.columns else np.zeros(len(rows), int)
+    year = df["RecordingYear"].to_numpy(dtype=float)[rows]
+    bpm  = df["BPM"].to_numpy(dtype=float)[rows]
+    keep = ((df["GenreKey"] == genre).to_numpy()[rows] & (orch >= 0)
+            & ~np.isnan(bpm) & ~np.isnan(year))
+    excluded = set(exclude)
+    if excluded:
+        keep &= ~df["Path"].isin(excluded).to_numpy()[rows]
+    rows, orch, voc, year, bpm = rows[keep], orch[keep], voc[keep], year[keep], bpm[keep]
+    win, score = candidates(orch, year, bpm, voc, k, year_window, bpm_tol)
+
+    picked = pick(win, score, orch, n, per_orchestra)
+    if not picked:
+        return []
+    names, paths, ids = (df[c].to_numpy() for c in ("Orchestra", "Path", "TrackID"))
+    out = []
+    for i in picked:
+        w = win[i][np.lexsort((bpm[win[i]], year[win[i]]))]   # 탄다 안 = 녹음 연도 → BPM 순
+        r = rows[w]
+        out.append({
+            "name":   f"{names[r[0]]} {TANDA_TYPES.get(genre, genre)} · {round(float(bpm[w].mean())):d} BPM",
+            "type":   TANDA_TYPES.get(genre, "탱고"),
+            "tracks": paths[r].tolist(),
+            "ids":    ids[r].tolist(),
+            "score":  round(float(score[i]), 3),
+        })
+    return out
+
+
+if __name__ == "__main__":
+    from library_frame import load_library
+
+    ap = argparse.ArgumentParser(description="탄다 자동 제안")
+    ap.add_argument("csv")
+    ap.add_argument("root")
+    ap.add_argument("--genre", default="tango", choices=list(TANDA_TYPES))
+    ap.add_argument("--size", type=int, choices=[3, 4])
+    ap.add_argument("--years", type=float, default=5, help="녹음 연도 차 (기본 5년)")
+    ap.add_argument("--bpm-tol", type=float, default=4.0, help="BPM 차 (기본 4)")
+    ap.add_argument("-n", type=int, default=20, help="제안 수 (기본 20)")
+    args = ap.parse_args()
+
+    lib = load_library(args.csv, args.root)
+    t0  = time.perf_counter()
+    res = suggest(lib.df, args.genre, size=args.size, year_window=args.years,
+                  bpm_tol=args.bpm_tol, n=args.n)
+    print(f"✅ {len(lib):,} 곡 → 제안 {len(res)}개 ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+    for t in res:
+        print(f"  {t['score']:.2f}  {t['name']}  ({len(t['tracks'])}곡)")
+    if not res:
+        sys.exit(1)